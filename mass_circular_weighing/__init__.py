@@ -4,6 +4,16 @@ __author__ = 'Measurement Standards Laboratory of New Zealand'
 __copyright__ = '\xa9 2025, ' + __author__
 __version__ = '2.1.1'
 
-from .gui.gui import show_gui
-from .utils.poll_omega_logger import poll_omega_logger
-from .utils.poll_balance import find_balance
+# the gui and the equipment-polling utilities need Qt, so are only imported when first used
+_lazy_imports = {
+    'show_gui': '.gui.gui',
+    'poll_omega_logger': '.utils.poll_omega_logger',
+    'find_balance': '.utils.poll_balance',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        import importlib
+        return getattr(importlib.import_module(_lazy_imports[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
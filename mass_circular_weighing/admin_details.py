@@ -3,18 +3,47 @@ This class requires an .xlsx file in the correct template
 """
 import os
 import io
-import string
+import threading
 import numpy as np
 from time import time
-
-from openpyxl import load_workbook, Workbook
+from typing import TYPE_CHECKING
 
 from .log import log
 from .constants import config_default, client_default, job_default, MU_STR
-from .gui.threads.prompt_thread import PromptThread
-pt = PromptThread()
+from .utils.xlsx_cache import load_cached, save_cached, signature
+from .weight_set import WeightSet, nan_to_none
+from .routine_classes.group_volumes import GroupVolumes
 
 header_row = 14
+client_columns = 'ABCDEFGHIJ'   # columns of the client weight table
+admin_cells = ['B2', 'B3', 'B4', 'B5', 'B9', 'B10', 'B11', 'E7', 'E8', 'E9', 'E11', 'I8', 'J8', 'I9', 'J9']
+
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
+
+def load_workbook(*args, **kwargs):
+    """Loads a workbook using openpyxl, which is only imported when first needed
+    (the admin details and weight sets are usually read from the cache)"""
+    from openpyxl import load_workbook
+    return load_workbook(*args, **kwargs)
+
+
+class PromptNeededError(RuntimeError):
+    """Raised when the operator needs to be prompted while the admin details are loaded in a background thread"""
+
+
+def prompt_operator(*args, **kwargs):
+    """Shows a prompt using a PromptThread (with the arguments of :meth:`PromptThread.show`) and returns the reply.
+    The prompt needs the event loop of the main thread, so if the admin details are being loaded in a background
+    thread (e.g. behind a splash screen) a PromptNeededError is raised instead, and the details should be loaded
+    again in the main thread."""
+    if threading.current_thread() is not threading.main_thread():
+        raise PromptNeededError('The operator can only be prompted from the main thread')
+    from .gui.threads.prompt_thread import PromptThread
+    pt = PromptThread()
+    pt.show(*args, **kwargs)
+    return pt.wait_for_prompt_reply()
 
 
 class AdminDetails(object):
@@ -30,61 +59,56 @@ class AdminDetails(object):
             an .xlsx file in the correct template. Use examples/Admin.xlsx as the template.
         """
         self.path = path
-
+        self._signature = signature(path)
         with open(path, "rb") as f:         # so that the file remains available to be edited after being read
-            self.wb = load_workbook(f, data_only=True)
-            # save original file to backups folder
-            backup_folder = os.path.join(os.path.dirname(path), 'backups')
-            if not os.path.exists(backup_folder):
-                os.makedirs(backup_folder)
-            backup_file = os.path.basename(path).strip(".xlsx")+f"_backup{int(time()-1733104000)}.xlsx"
-            self.wb.save(os.path.join(backup_folder, backup_file))
+            self._xlsx = f.read()
+        self._wb = None
+        self._edits = {}   # cell: value, for the values updated in memory before the workbook is loaded
 
-        log.info(f"Found Admin file at {self.path}")
+        admin = self.read_admin()
 
-        self.ds = self.wb["Admin"]  # note that this will raise an error if the sheet Admin doesn't exist
+        log.info(f"Found Admin file at {self.path}")
 
-        self.operator = self.ds['B2'].value
+        cells = admin['Cells']
+        self.operator = cells['B2']
 
         # Client
         try:
             # remove any spaces if present
-            self.client = self.ds['B3'].value.replace(" ", "")
+            self.client = cells['B3'].replace(" ", "")
         except AttributeError:
             # no spaces present to remove
-            self.client = self.ds['B3'].value
+            self.client = cells['B3']
         if not self.client:
             self.client = client_default
-            self.ds['B3'] = self.client  # update value in memory
+            self.set_cell('B3', self.client)  # update value in memory
             log.warning(f"No client name specified. Defaulting to {self.client}.")
 
         # Job
-        self.job = self.ds['B4'].value
+        self.job = cells['B4']
         if not self.job:
             self.job = job_default
-            self.ds['B4'] = self.job
+            self.set_cell('B4', self.job)
             log.warning(f"No job number specified. Defaulting to {self.job}.")
 
         # Save Folder
         try:
-            self.folder = self.ds['B5'].value.encode('unicode-escape').decode()  # convert to raw string
+            self.folder = cells['B5'].encode('unicode-escape').decode()  # convert to raw string
             if not os.path.exists(self.folder):
                 os.makedirs(self.folder)
         except AttributeError:  # no folder specified
             # get folder information from where the Admin.xlsx file is coming from
             self.folder = os.path.dirname(self.path)  # save_folder_default
-            self.ds['B5'] = self.folder
+            self.set_cell('B5', self.folder)
             log.warning(f"No save folder specified. Defaulting to {self.folder}.")
 
         # Configuration File
-        self.config_xml = self.ds['E11'].value
+        self.config_xml = cells['E11']
         if not self.config_xml:
             # look for a config file in the same folder as the Admin.xlsx file
             xml_files = [f for f in os.listdir(self.folder) if f.endswith(".xml")]
             if xml_files:
-                pt = PromptThread()
-                pt.show('item', "Select your config.xml file if present", xml_files)
-                config_xml = pt.wait_for_prompt_reply()
+                config_xml = prompt_operator('item', "Select your config.xml file if present", xml_files)
                 if config_xml:
                     self.config_xml = os.path.join(self.folder, config_xml)
                     log.warning(f"No config.xml file path specified in {self.path}.")
@@ -93,16 +117,16 @@ class AdminDetails(object):
                 log.warning(f"No config.xml file path specified. Defaulting to {self.config_xml}.")
         if not os.path.isfile(self.config_xml):
             raise FileNotFoundError(f"Cannot find the configuration file at {self.config_xml}.")
-        self.ds['E11'] = self.config_xml
+        self.set_cell('E11', self.config_xml)
 
         # Circular Weighing Analysis Parameters
-        self.drift_text = self.ds['E7'].value
-        self.timed_text = self.ds['E8'].value
-        self.ad_corr = self.ds['E9'].value
+        self.drift_text = cells['E7']
+        self.timed_text = cells['E8']
+        self.ad_corr = cells['E9']
 
         # correlations are included as a 2x2 matrix - if no values are found, the identity matrix is used
         try:
-            self.correlations = np.array([[float(i.value) for i in j] for j in self.ds['I8:J9']])
+            self.correlations = np.array([[float(cells[c]) for c in j] for j in [['I8', 'J8'], ['I9', 'J9']]])
             # print(self.correlations)
             log.info(f'Using matrix of correlations:\n{self.correlations}')
         except TypeError:
@@ -115,24 +139,99 @@ class AdminDetails(object):
 
         self.all_stds = None
         self.all_checks = None
-        self.massref_path = self.ds['B9'].value
+        self._group_volumes = None
+        self.massref_path = cells['B9']
         if not os.path.isfile(self.massref_path):
             # open a browser to find the MASSREF file
-            pt = PromptThread()
-            pt.show('filename', title="Please select a valid MASSREF file", filters='XLSX files (*.xlsx)', multiple=False)
-            self.massref_path = pt.wait_for_prompt_reply()
+            self.massref_path = prompt_operator(
+                'filename', title="Please select a valid MASSREF file", filters='XLSX files (*.xlsx)', multiple=False
+            )
 
             if not os.path.isfile(self.massref_path):
                 raise FileNotFoundError(f"Cannot find the MASSREF file at {self.massref_path}.")
         log.info(f"Found MassRef file at {self.massref_path}")
 
-        self.std_set = self.ds['B10'].value
+        # save original file to backups folder, once the operator has been prompted for any files
+        # (so that it is saved once if the details are loaded again in the main thread to prompt)
+        backup_folder = os.path.join(os.path.dirname(path), 'backups')
+        if not os.path.exists(backup_folder):
+            os.makedirs(backup_folder)
+        backup_file = os.path.basename(path).strip(".xlsx")+f"_backup{int(time()-1733104000)}.xlsx"
+        with open(os.path.join(backup_folder, backup_file), "wb") as f:
+            f.write(self._xlsx)
+
+        self.std_set = cells['B10']
         if not self.std_set:
             log.error("No reference mass set specified!")
-        self.check_set_text = self.ds['B11'].value
+        self.check_set_text = cells['B11']
 
         self.scheme = self.load_scheme()
 
+    @property
+    def wb(self) -> 'Workbook':
+        """The Admin workbook, which is only loaded in full when needed (e.g. to save it)"""
+        if self._wb is None:
+            self._wb = load_workbook(io.BytesIO(self._xlsx), data_only=True)
+            for cell, value in self._edits.items():
+                self._wb["Admin"][cell] = value
+        return self._wb
+
+    @property
+    def ds(self):
+        """The Admin sheet of the Admin workbook"""
+        return self.wb["Admin"]
+
+    def set_cell(self, cell: str, value) -> None:
+        """Updates the value of a cell of the Admin sheet in memory, to be saved by :meth:`.save_admin`"""
+        self._edits[cell] = value
+        if self._wb is not None:
+            self._wb["Admin"][cell] = value
+
+    def read_admin(self) -> dict:
+        """Reads the cells of the Admin sheet which hold the admin details, the client weight table and the scheme,
+        from the Admin file at self.path. Each sheet is read in a single pass over its rows, and the result is cached
+        until the file changes.
+
+        :return: A dictionary with keys 'Cells' (cell: value), 'Client table' (a list of column header and values
+            for each column of the client weight table) and 'Scheme' (header and rows, or None if there is no scheme)
+        """
+        sig = signature(self.path)
+        if sig != self._signature:  # e.g. the scheme has been saved since the file was read
+            with open(self.path, "rb") as f:
+                self._xlsx = f.read()
+            self._signature = sig
+        admin = load_cached(self.path, 'Admin')
+        if admin is not None:
+            return admin
+
+        from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+        wb = load_workbook(io.BytesIO(self._xlsx), read_only=True, data_only=True)
+        ds = wb["Admin"]  # note that this will raise an error if the sheet Admin doesn't exist
+        rows = list(ds.iter_rows(min_row=1, max_col=len(client_columns), values_only=True))
+        cells = {}
+        for cell in admin_cells:
+            col, row = coordinate_from_string(cell)
+            try:
+                cells[cell] = rows[row - 1][column_index_from_string(col) - 1]
+            except IndexError:
+                cells[cell] = None
+        header = rows[header_row - 1] if len(rows) >= header_row else (None,) * len(client_columns)
+        # the client weight table is read to the row before the last row of the sheet
+        table = list(zip(*rows[header_row:len(rows) - 1])) or [()] * len(client_columns)
+        admin = {
+            'Cells': cells,
+            'Client table': [[key, list(val)] for key, val in zip(header, table)],
+            'Scheme': None,
+        }
+
+        if "Scheme" in wb.sheetnames:
+            values = [list(row) for row in wb["Scheme"].iter_rows(values_only=True)]
+            admin['Scheme'] = [values[0] if values else [], values[1:]]
+        wb.close()
+
+        save_cached(self.path, 'Admin', admin, sig)
+        return admin
+
     @property
     def drift(self) -> str | None:
         """Allowed options for returned string are: 'no drift', 'linear drift', 'quadratic drift', 'cubic drift'.
@@ -155,22 +254,26 @@ class AdminDetails(object):
             return None
         return self.check_set_text
 
+    @property
+    def group_volumes(self) -> GroupVolumes:
+        """Volumes of the weight groups of scheme entries, from the client, standard and check sets.
+        Made when first needed (after :meth:`.init_ref_mass_sets`), with the volumes for the scheme worked out
+        in advance, and made again if the sets change."""
+        sets = (self.all_client_wts, self.all_stds, self.all_checks)
+        if self._group_volumes is None or not self._group_volumes.uses(*sets):
+            self._group_volumes = GroupVolumes(*sets)
+            if self.scheme:
+                self._group_volumes.precompute(row[0] for row in self.scheme[1] if row)
+        return self._group_volumes
+
     def load_scheme(self):
         """Loads the weighing scheme from the 'Scheme' sheet of an .xlsx file if present"""
-        try:
-            sheet = self.wb["Scheme"]
-        except KeyError:
+        scheme = self.read_admin()['Scheme']
+        if scheme is None:
             log.info('Scheme worksheet does not yet exist in {}'.format(self.path))
             return None
 
-        header = []
-        rows = []
-        for i, row in enumerate(sheet.values):
-            if i == 0:
-                header = [item for item in row]
-            else:
-                rows.append([item for item in row])
-
+        header, rows = scheme
         return header, rows
 
     def load_client_set(self):
@@ -184,12 +287,12 @@ class AdminDetails(object):
                 'u_mag (mg)', 'Density (kg/m3)', 'u_density (kg/m3)', 'Expansion coeff (ppm/degC)',
                 'Num weights', 'Vol (mL)'
         """
-        wt_dict = {
+        wt_dict = WeightSet({
             'Set identifier': None,
             'Set type': 'Client',
             'Client': self.client,
             'Weight ID': []
-        }
+        })
 
         col_name_keys = {
             "weight id": 'Weight ID', "nom": 'Nominal (g)', 'mark': 'Shape/Mark', "container": 'Container',
@@ -197,8 +300,7 @@ class AdminDetails(object):
             'expans': 'Expansion coeff (ppm/degC)', 'centre height': 'Centre Height (mm)', 'u_height': 'u_height (mm)'
         }   # warning: 'u_density' contains 'density' so always use 'u_dens' in xlsx file instead.
 
-        for i in string.ascii_uppercase[:10]:  # go across a row ;)
-            key = self.ds[i+str(header_row)].value
+        for key, column in self.read_admin()['Client table']:  # go across a row ;)
             # do a look up to make sure the column name is a valid key, and use the valid key instead
             valid = False
             for code, real_key in col_name_keys.items():
@@ -208,20 +310,17 @@ class AdminDetails(object):
             if not valid:
                 raise ValueError(f'Error in parsing client weight set: {key} not recognised as a known column header')
             # key is valid so we can parse the data in that column
-            val = []
-            for row in range(header_row + 1, self.ds.max_row):
-                v = self.ds[i + str(row)].value
-                if key == 'Weight ID':
+            if key == 'Weight ID':
+                # ensure all weight IDs are strings
+                val = []
+                for v in column:
                     if v is None:
                         break
-                    else:
-                        # ensure all weight IDs are strings
-                        val.append(str(v))
-                else:
-                    # keep whatever data type makes sense
-                    val.append(v)
-
-                wt_dict[key] = val
+                    val.append(str(v))
+            else:
+                # keep whatever data type makes sense
+                val = column
+            wt_dict[key] = val
 
         if not wt_dict['Weight ID']:
             log.error("No weights in client weight set!")
@@ -237,20 +336,41 @@ class AdminDetails(object):
         return wt_dict
 
     def init_ref_mass_sets(self) -> None:
-        """Collects relevant weight info for all reference and check sets following ':meth:`.load_set_from_massref
+        """Collects relevant weight info for all reference and check sets following ':meth:`.load_set_from_massref`.
+        Sets are taken from the cache if the MASSREF file hasn't changed since they were cached, so that the MASSREF
+        file is only opened (once, for all sets) if needed.
         """
-        with open(self.massref_path, "rb") as f:  # so that the file remains available to be edited after being read
-            massrefwb = load_workbook(io.BytesIO(f.read()), read_only=True, data_only=True)
-
-            self.all_stds = self.load_set_from_massref(massrefwb, sheet=self.std_set, set_ID="Standard")
-
-            if self.check_set is not None:
-                self.all_checks = self.load_set_from_massref(massrefwb, sheet=self.check_set, set_ID='Check')
+        sets = [(self.std_set, "Standard")]
+        if self.check_set is not None:
+            sets.append((self.check_set, 'Check'))
+
+        loaded = {}
+        massrefwb = None
+        sig = None
+        for sheet, set_ID in sets:
+            wt_dict = load_cached(self.massref_path, sheet)
+            if wt_dict is not None:
+                wt_dict = WeightSet(wt_dict)
             else:
-                self.all_checks = None
-
-    def load_set_from_massref(self, massrefwb: Workbook, sheet: str, set_ID: str) -> dict:
-        """Makes a dictionary of the relevant weight info from a MASSREF.xlsx file for all weights in set
+                if massrefwb is None:
+                    sig = signature(self.massref_path)
+                    with open(self.massref_path, "rb") as f:  # so that the file remains available to be edited
+                        massrefwb = load_workbook(io.BytesIO(f.read()), read_only=True, data_only=True)
+                wt_dict = self.load_set_from_massref(massrefwb, sheet=sheet, set_ID=set_ID)
+                save_cached(self.massref_path, sheet, wt_dict, sig)
+            # the same sheet may be cached for a different role, or from a different path to the same file
+            wt_dict['MASSREF file'] = self.massref_path
+            wt_dict['Set type'] = set_ID
+            loaded[set_ID] = wt_dict
+
+        if massrefwb is not None:
+            massrefwb.close()
+        self.all_stds = loaded["Standard"]
+        self.all_checks = loaded.get('Check')
+
+    def load_set_from_massref(self, massrefwb: 'Workbook', sheet: str, set_ID: str) -> dict:
+        """Makes a dictionary of the relevant weight info from a MASSREF.xlsx file for all weights in set.
+        The sheet is read in a single pass over its rows.
 
         :param massrefwb: The mass set data
         :param sheet: The sheet name for the specific mass set
@@ -262,9 +382,11 @@ class AdminDetails(object):
             'centre height': 'Centre Height (mm)', 'u_height': 'u_height (mm)'
         """
         std_sheet = massrefwb[sheet]
-        all_stds = {'MASSREF file': self.massref_path, 'Sheet name': sheet, "Set type": set_ID,
-                    'Set name': std_sheet['B1'].value, 'Set identifier': std_sheet['D1'].value.strip(),
-                    'Calibrated': str(std_sheet['F1'].value)}
+        rows = std_sheet.iter_rows(min_row=1, max_col=14, values_only=True)  # columns A to N
+        first_row = next(rows, None) or (None,) * 14
+        all_stds = WeightSet({'MASSREF file': self.massref_path, 'Sheet name': sheet, "Set type": set_ID,
+                              'Set name': first_row[1], 'Set identifier': first_row[3].strip(),
+                              'Calibrated': str(first_row[5])})
 
         # use parsing of nominal values to determine last non-empty row
         for key in [
@@ -276,8 +398,10 @@ class AdminDetails(object):
 
         start_row = 4
         i = 0
-        while True:
-            nom = std_sheet[f'B{start_row+i}'].value
+        for row_num, row in enumerate(rows, start=2):
+            if row_num < start_row:
+                continue
+            mark, nom, ident, mv, u_cal, _, dens, u_dens, expans, _, height, u_height, _, u_drift = row
             if nom is None:
                 break
             if type(nom) is str:
@@ -290,30 +414,26 @@ class AdminDetails(object):
                         log.warning(f"Nominal mass {nom} not included in mass set.")
             else:
                 all_stds['Nominal (g)'].append(nom)
-            all_stds['Shape/Mark'].append(std_sheet[f'A{start_row + i}'].value)
+            all_stds['Shape/Mark'].append(mark)
 
             # Create weight IDs from nominal, any identifiers like d, and the set identifier.
             # Note here we are forcing k --> K
             try:
-                wt_id = str(nom).upper() + std_sheet[f'C{start_row + i}'].value + all_stds['Set identifier']
+                wt_id = str(nom).upper() + ident + all_stds['Set identifier']
             except TypeError:
-                wt_id = str(nom).upper()  + all_stds['Set identifier']
+                wt_id = str(nom).upper() + all_stds['Set identifier']
 
             all_stds['Weight ID'].append(wt_id)
             # mass value
-            mv = std_sheet[f'D{start_row + i}'].value
             all_stds['mass values (g)'].append(mv)
             # all values for uncertainty should be in micrograms
-            u_cal = float(std_sheet[f'E{start_row + i}'].value)
-            u_drift = float(std_sheet[f'N{start_row + i}'].value)
+            u_cal = float(u_cal)
+            u_drift = float(u_drift)
             u_tot = round((u_cal**2 + u_drift**2)**0.5, 3)
             all_stds['u_cal'].append(u_cal)
             all_stds['u_drift'].append(u_drift)
             all_stds['uncertainties (' + MU_STR + 'g)'].append(u_tot)
             # density and its uncertainty
-            dens = std_sheet[f'G{start_row + i}'].value
-            u_dens =std_sheet[f'H{start_row + i}'].value
-            expans = std_sheet[f'I{start_row + i}'].value
             all_stds['Density (kg/m3)'].append(dens)
             try:    # allow u_density to be missing
                 all_stds['u_density (kg/m3)'].append(float(u_dens))
@@ -328,13 +448,13 @@ class AdminDetails(object):
 
             # allow height information to be missing
             try:
-                all_stds['Centre Height (mm)'].append(float(std_sheet[f'K{start_row + i}'].value))
+                all_stds['Centre Height (mm)'].append(float(height))
             except TypeError:
                 log.debug(f"No Centre Height data found in the {set_ID} mass set. "
                             f"Please check column K of the appropriate MASSREF file is 'Centre Height (mm)'.")
                 all_stds['Centre Height (mm)'].append(None)
             try:
-                all_stds['u_height (mm)'].append(float(std_sheet[f'L{start_row + i}'].value))
+                all_stds['u_height (mm)'].append(float(u_height))
             except TypeError:
                 log.debug(f"No Centre Height uncertainty data found in the {set_ID} mass set. "
                             f"Please check column L of the appropriate MASSREF file has the heading 'u_height (mm)'.")
@@ -368,26 +488,6 @@ def add_volumes(wt_dict: dict) -> None:
 
     :param wt_dict: weight set dictionary with keys as per :meth:`.load_set_from_massref` and :meth:`.load_client_set`.
     """
-    vols = []
-    u_vols = []
-    for i in range(wt_dict['Num weights']):
-        try:
-            m = float(wt_dict['Nominal (g)'][i])
-            d = float(wt_dict['Density (kg/m3)'][i])
-            vol = 1000 * m / d
-            vols.append(vol)
-        except TypeError:
-            vols += [None]
-        try:
-            m = float(wt_dict['Nominal (g)'][i])
-            d = float(wt_dict['Density (kg/m3)'][i])
-            u_d = float(wt_dict['u_density (kg/m3)'][i])
-            rel_unc_d = u_d/d
-            u_vol = rel_unc_d * 1000 * m / d
-            u_vols.append(u_vol)
-        except TypeError:
-            u_vols += [None]
-
-    wt_dict['Vol (mL)'] = vols
-    wt_dict['Vol unc (mL)'] = u_vols
-
+    wt_set = wt_dict if isinstance(wt_dict, WeightSet) else WeightSet(wt_dict)
+    wt_dict['Vol (mL)'] = nan_to_none(wt_set.volumes())
+    wt_dict['Vol unc (mL)'] = nan_to_none(wt_set.volume_uncertainties())
@@ -5,16 +5,15 @@ Configuration loads and stores connection information for all balances in the co
 as well as ambient logger details and acceptance criteria for each balance.
 """
 import os
+from bisect import bisect_right
 
 from msl.equipment import Config, utils
 from msl.io import read_table
 
-from .equip import Balance, MettlerToledo, AWBalCarousel, AWBalLinear, AT106
-from .equip import Vaisala
-
 from .constants import MU_STR
 from .log import log
 from .admin_details import AdminDetails
+from .utils.xlsx_cache import signature
 
 
 class Configuration(AdminDetails):
@@ -51,15 +50,6 @@ class Configuration(AdminDetails):
 
         self.equipment = self.db.equipment      # loads subset of database with equipment being used
 
-        self.bal_class = {
-            'mde': Balance,
-            'mw': MettlerToledo,
-            'aw_c': AWBalCarousel,
-            'aw_l': AWBalLinear,
-            'aw_106': AT106,
-            'aw_d': Balance,
-        }
-
         self.bal_list = []
         # NOTE: This script only adds Mettler Toledo or Sartorius balances to the drop-down list
         for alias, equip in self.equipment.items():
@@ -71,7 +61,29 @@ class Configuration(AdminDetails):
         self.EXCL = float(self.cfg.root.find('acceptance_criteria/EXCL').text)
         # criterion for excluding a single weighing within an automatic weighing sequence, default set arbitrarily at 3
 
-    def get_bal_instance(self, alias, strict=True, **kwargs):
+        # optional criteria for stopping an automatic weighing early, or extending a borderline weighing by extra cycles
+        early_stop = self.cfg.root.find('acceptance_criteria/EARLY_STOP')
+        self.early_stop = float(early_stop.text) if early_stop is not None else None
+        extra_cycles = self.cfg.root.find('acceptance_criteria/EXTRA_CYCLES')
+        self.extra_cycles = int(extra_cycles.text) if extra_cycles is not None else 0
+
+        self._acceptance_index = None   # (path, sheet, signature), index, as read by acceptance_index
+
+    @property
+    def bal_class(self):
+        """Balance class for each weighing mode.
+        The balance classes (and Qt) are only imported when needed, so that data can be analysed without them."""
+        from .equip import Balance, MettlerToledo, AWBalCarousel, AWBalLinear, AT106
+        return {
+            'mde': Balance,
+            'mw': MettlerToledo,
+            'aw_c': AWBalCarousel,
+            'aw_l': AWBalLinear,
+            'aw_106': AT106,
+            'aw_d': Balance,
+        }
+
+    def get_bal_instance(self, alias, strict=True, simulate=None, session_folder=None, **kwargs):
         """Selects balance class and returns balance instance.
         Also adds the ambient monitor details to the balance instance
 
@@ -81,13 +93,31 @@ class Configuration(AdminDetails):
             alias for balance in config file
         strict : bool
             not currently used
+        simulate : dict, optional
+            keyword arguments for :func:`~mass_circular_weighing.equip.simulator.simulate_record`, to use
+            a simulated balance and weight handler in place of the hardware, with constant ambient conditions
+        session_folder : str, optional
+            folder in which to record the serial communication with the balance (and weight handler),
+            for replay with :func:`~mass_circular_weighing.equip.session.replay_balance`
 
         Returns
         -------
         Balance instance, mode
         """
         mode = self.equipment[alias].user_defined['weighing_mode']
-        bal = self.bal_class[mode](self.equipment[alias], **kwargs)
+        record = self.equipment[alias]
+        handler_record = None
+        if simulate is not None:
+            from .equip.simulator import simulate_record
+            if mode in ['aw_l', 'aw_106']:
+                handler_record = self.get_handler_record(bal_alias=alias)
+            record, handler_record = simulate_record(record, handler_record=handler_record, **simulate)
+        elif session_folder is not None:
+            from .equip.session import RecordingRecord
+            record = RecordingRecord(record, session_folder)
+            if mode in ['aw_l', 'aw_106']:
+                handler_record = RecordingRecord(self.get_handler_record(bal_alias=alias), session_folder)
+        bal = self.bal_class[mode](record, **kwargs)
         log.debug(
             'Connection information for balance:'
             '\nBalance mode: {} \nEquip record: {} \nBalance instance: {}'.format(
@@ -95,10 +125,14 @@ class Configuration(AdminDetails):
         )
 
         if "aw" in mode:
-            bal.handler = self.get_handler_record(bal_alias=alias)
+            bal.handler = handler_record or self.get_handler_record(bal_alias=alias)
             bal.identify_handler()
 
-        bal._ambient_details = self.get_ambientlogger_info(bal_alias=alias)
+        if simulate is not None:
+            from .equip.simulator import SIMULATED_AMBIENT
+            bal._ambient_details = dict(SIMULATED_AMBIENT)
+        else:
+            bal._ambient_details = self.get_ambientlogger_info(bal_alias=alias)
 
         # if 'vaisala' in bal.ambient_details['Type'].lower():
         #     vai_record = self.equipment.get(bal.ambient_details['Alias'])
@@ -189,6 +223,48 @@ class Configuration(AdminDetails):
 
         return ambient_details
 
+    def acceptance_index(self):
+        """Index of the acceptance criteria in the balance register. The register is read when first needed and then
+        only again if the file (or the path or sheet in the config file) changes.
+
+        Returns
+        -------
+        dict of {(manufacturer, model, serial): list of (load min, load max, row, acceptable, residuals)},
+        with the list sorted by load min
+        """
+        path = self.cfg.root.find('acceptance_criteria/path').text
+        sheet = self.cfg.root.find('acceptance_criteria/sheet').text
+        key = (path, sheet, signature(path))
+        if self._acceptance_index is not None and self._acceptance_index[0] == key:
+            return self._acceptance_index[1]
+
+        dataset = read_table(path, sheet=sheet)
+        header = dataset.metadata.get('header')
+
+        index_map = {}
+        for col_name in {'model', 'manufacturer', 'serial',
+                         'load max', 'load min', 'acceptable', 'residuals'}:
+            for i, name in enumerate(header):
+                if col_name in name.lower():
+                    index_map[col_name] = i
+
+        index = {}
+        for order, row in enumerate(dataset.data):
+            try:
+                criteria = (float(row[index_map['load min']]), float(row[index_map['load max']]), order,
+                            float(row[index_map['acceptable']]), float(row[index_map['residuals']]))
+            except (TypeError, ValueError):
+                log.warning(f'Row {order + 2} of the acceptance criteria in {path} is incomplete')
+                continue
+            balance = (row[index_map['manufacturer']], row[index_map['model']], str(row[index_map['serial']]))
+            index.setdefault(balance, []).append(criteria)
+        for ranges in index.values():
+            ranges.sort()
+
+        log.debug(f'Read acceptance criteria for {len(index)} balances from {path}')
+        self._acceptance_index = key, index
+        return index
+
     def acceptance_criteria(self, alias, nominal_mass):
         """Calculates acceptance criteria for a circular weighing
 
@@ -208,39 +284,22 @@ class Configuration(AdminDetails):
         record = self.equipment.get(alias)
         if not record:
             raise ValueError('No equipment record')
-        man = record.manufacturer
-        model = record.model
-        serial = record.serial
-
-        path = self.cfg.root.find('acceptance_criteria/path').text
-        sheet = self.cfg.root.find('acceptance_criteria/sheet').text
-
-        dataset = read_table(path, sheet=sheet)
-        header = dataset.metadata.get('header')
-        data = dataset.data
-
-        index_map = {}
-        for col_name in {'model', 'manufacturer', 'serial',
-                         'load max', 'load min', 'acceptable', 'residuals'}:
-            for i, name in enumerate(header):
-                if col_name in name.lower():
-                    index_map[col_name] = i
-
-        store = []
-        for row in data:
-            if model == row[index_map['model']] \
-                and man == row[index_map['manufacturer']] \
-                    and str(serial) == str(row[index_map['serial']]):
-                store.append(row)
 
-        if not store:
+        ranges = self.acceptance_index().get((record.manufacturer, record.model, str(record.serial)))
+        if not ranges:
             raise ValueError('No acceptance criteria for balance')
 
-        for row in store:
-            if float(row[index_map['load min']]) <= nominal_mass <= float(row[index_map['load max']]):
-                return {
-                    'Max stdev from CircWeigh ('+MU_STR+'g)': float(row[index_map['acceptable']]),
-                    'Stdev for balance ('+MU_STR+'g)': float(row[index_map['residuals']])/2,
-                }
+        # ranges are sorted by load min, so only those up to the nominal mass can contain it.
+        # Where ranges overlap, the first in the balance register is used
+        load_mins = [r[0] for r in ranges]
+        found = None
+        for load_min, load_max, order, acceptable, residuals in ranges[:bisect_right(load_mins, nominal_mass)]:
+            if nominal_mass <= load_max and (found is None or order < found[0]):
+                found = order, acceptable, residuals
+        if found is not None:
+            return {
+                'Max stdev from CircWeigh ('+MU_STR+'g)': found[1],
+                'Stdev for balance ('+MU_STR+'g)': found[2]/2,
+            }
 
         raise ValueError('Nominal mass out of range of balance')
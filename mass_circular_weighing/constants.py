@@ -32,6 +32,8 @@ commercial_year_folder = os.path.join(commercial_folder, year)
 save_folder_default = os.path.join(commercial_year_folder, 'DEFAULT_SAVE_FOLDER')
 
 local_backup = os.path.join(r'C:\CircularWeighingData', year)
+move_times_folder = os.path.dirname(local_backup)   # for the cached move times of each weight handler
+xlsx_cache_folder = os.path.join(move_times_folder, 'cache')   # for the weight sets parsed from .xlsx files
 
 job_default = 100000
 client_default = "Client"
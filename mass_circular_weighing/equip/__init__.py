@@ -1,11 +1,37 @@
-# Environmental monitoring equipment
-from .ambient_fromwebapp import get_t_rh_now, get_t_rh_during, get_aliases
-from .ambient_checks import check_ambient_pre, check_ambient_post
-from .vaisala import Vaisala
-
-# Hierarchy of balance classes which each inherit from each other
-from .mdebalance import Balance
-from .mettler import MettlerToledo
-from .aw_carousel import AWBalCarousel
-from .aw_linear import AWBalLinear
-from .at106 import AT106
+# The equipment layer: each name is imported from its module when first used, so that importing one piece
+# of equipment (e.g. the connection manager or the simulator) doesn't import the balance classes or Qt
+_lazy_imports = {
+    # Environmental monitoring equipment
+    'get_t_rh_now': '.ambient_fromwebapp',
+    'get_t_rh_during': '.ambient_fromwebapp',
+    'get_aliases': '.ambient_fromwebapp',
+    'check_ambient_pre': '.ambient_checks',
+    'check_ambient_post': '.ambient_checks',
+    'Vaisala': '.vaisala',
+
+    # Hierarchy of balance classes which each inherit from each other
+    'Balance': '.mdebalance',
+    'MettlerToledo': '.mettler',
+    'AWBalCarousel': '.aw_carousel',
+    'AWBalLinear': '.aw_linear',
+    'AT106': '.at106',
+
+    # balances are kept connected across scheme entries
+    'connections': '.connection_manager',
+    'BalanceInUseError': '.connection_manager',
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        import importlib
+        value = getattr(importlib.import_module(_lazy_imports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
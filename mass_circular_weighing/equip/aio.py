@@ -0,0 +1,107 @@
+"""
+asyncio interface to the balance and ambient monitoring classes, so that commands to different equipment
+(e.g. ambient queries and the handler moves and readings of two balances) can overlap in one event loop.
+The synchronous classes do the work: each balance has a worker thread which runs its commands one at a time,
+so that commands on the same serial connection never overlap, and a single weighing is no faster.
+do_circ_weighing does not use this interface.
+
+Only automatic weighing is supported, as the commands of a manual balance (and the ambient checks of a manual
+weighing) prompt the operator, which needs the Qt event loop of the GUI. The set-up of an automatic balance
+(connection, initialisation, centring and scale adjustment) may also prompt, so is done beforehand.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .ambient_fromwebapp import get_t_rh_now, get_t_rh_during
+from .ambient_checks import check_ambient_pre, check_ambient_post
+
+
+class AsyncBalance(object):
+
+    def __init__(self, bal):
+        """Wraps a balance instance with coroutines for its commands. Attributes which are not coroutines
+        (e.g. positions, mode, unit) are those of the balance.
+
+        Parameters
+        ----------
+        bal : :class:`~mass_circular_weighing.equip.mdebalance.Balance`
+            or any of its subclasses for automatic weighing
+        """
+        _check_automatic(bal.mode)
+        self.bal = bal
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=str(bal.record.alias))
+
+    def __getattr__(self, name):
+        return getattr(self.bal, name)
+
+    async def run(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) in the worker thread of the balance and returns its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def query(self, command):
+        return await self.run(self.bal._query, command)
+
+    async def zero_bal(self):
+        return await self.run(self.bal.zero_bal)
+
+    async def get_mass_instant(self):
+        return await self.run(self.bal.get_mass_instant)
+
+    async def get_mass_stable(self, mass):
+        return await self.run(self.bal.get_mass_stable, mass)
+
+    async def load_bal(self, mass, pos):
+        return await self.run(self.bal.load_bal, mass, pos)
+
+    async def unload_bal(self, mass, pos):
+        return await self.run(self.bal.unload_bal, mass, pos)
+
+    async def get_status(self):
+        return await self.run(self.bal.get_status)
+
+    async def move_to(self, pos, wait=True):
+        return await self.run(self.bal.move_to, pos, wait=wait)
+
+    async def lift_to(self, lift_position, hori_pos=None, wait=True):
+        return await self.run(self.bal.lift_to, lift_position, hori_pos=hori_pos, wait=wait)
+
+    async def close_connection(self):
+        """Closes the connection to the balance and then stops its worker thread"""
+        await self.run(self.bal.close_connection)
+        self._executor.shutdown(wait=False)
+
+
+def _check_automatic(mode):
+    if not mode.startswith('aw'):
+        raise ValueError(f"Only automatic weighing is supported, not {mode!r}, as the operator may be prompted")
+
+
+async def _in_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+async def t_rh_now(ithx_name, sensor=""):
+    """Coroutine for :func:`~mass_circular_weighing.equip.ambient_fromwebapp.get_t_rh_now`"""
+    return await _in_thread(get_t_rh_now, ithx_name, sensor=sensor)
+
+
+async def t_rh_during(ithx_name, sensor="", start=None, end=None):
+    """Coroutine for :func:`~mass_circular_weighing.equip.ambient_fromwebapp.get_t_rh_during`"""
+    return await _in_thread(get_t_rh_during, ithx_name, sensor=sensor, start=start, end=end)
+
+
+async def ambient_now(ambient_details, mode):
+    """Coroutine for :func:`~mass_circular_weighing.equip.ambient_checks.check_ambient_pre`,
+    for any type of ambient monitoring during automatic weighing"""
+    _check_automatic(mode)
+    return await _in_thread(check_ambient_pre, ambient_details, mode)
+
+
+async def ambient_during(ambient_pre, ambient_details, mode):
+    """Coroutine for :func:`~mass_circular_weighing.equip.ambient_checks.check_ambient_post`,
+    for any type of ambient monitoring during automatic weighing"""
+    _check_automatic(mode)
+    return await _in_thread(check_ambient_post, ambient_pre, ambient_details, mode)
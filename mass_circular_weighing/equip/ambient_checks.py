@@ -4,14 +4,22 @@ from time import sleep
 
 from ..log import log
 from ..constants import FONTSIZE, IN_DEGREES_C
-from ..gui.threads.prompt_thread import PromptThread
-pt = PromptThread()
-
-from ..equip import get_t_rh_now, get_t_rh_during
+from .ambient_fromwebapp import get_t_rh_now, get_t_rh_during
 from .ambient_fromdatabase import (get_cal_temp_now, get_cal_temp_during,
                                    get_rh_p_now, get_rh_p_during, get_p_rh_t_now, get_p_rh_t_during)
 from ..utils.airdens_calculator import AirDens2009
 
+_prompt_thread = None
+
+
+def prompt_thread():
+    """The PromptThread for prompting the operator, which is made when first needed as it needs Qt"""
+    global _prompt_thread
+    if _prompt_thread is None:
+        from ..gui.threads.prompt_thread import PromptThread
+        _prompt_thread = PromptThread()
+    return _prompt_thread
+
 
 def check_ambient_pre(ambient_details, mode):
     """Check ambient conditions meet quality criteria (in config.xml file) for commencing weighing
@@ -68,6 +76,10 @@ def check_ambient_pre(ambient_details, mode):
         probe_sn = ambient_details['probe']
         date_start, p_start, rh_start, t_start = get_p_rh_t_now(transmitter_sn, probe_sn)
 
+    elif ambient_details["Type"] == "Simulated":  # constant conditions for a simulated balance
+        date_start = datetime.now().replace(microsecond=0).isoformat(sep=' ')
+        t_start, rh_start = ambient_details['T'], ambient_details['RH']
+
     else:
         log.error("Unrecognised ambient monitoring sensor")
         return False
@@ -177,6 +189,9 @@ def check_ambient_post(ambient_pre, ambient_details, mode):
         probe_sn = ambient_details['probe']
         p_data, rh_data, t_data = get_p_rh_t_during(transmitter_sn, probe_sn, start=start)
 
+    elif ambient_details["Type"] == "Simulated":
+        t_data, rh_data = [ambient_details['T']], [ambient_details['RH']]
+
     else:
         log.error("Unrecognised ambient monitoring sensor")
         return False
@@ -264,6 +279,7 @@ def prompt_t_rh(timepoint):
 
             message = '<html>Please enter the temperature and humidity values<br>as at {}, ' \
                       'separated by a space</html>'.format(tp)
+            pt = prompt_thread()
             pt.show('text', message, font=FONTSIZE, title='Ambient Monitoring')
             reply = pt.wait_for_prompt_reply()
             temperature, humidity = reply.split()
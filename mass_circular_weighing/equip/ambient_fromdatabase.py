@@ -4,7 +4,6 @@ Functions to interrogate an SQLite database and return the appropriate values
 import os
 from datetime import datetime, timedelta
 import numpy as np
-import sqlite3
 
 from ..log import log
 from ..constants import database_dir
@@ -43,6 +42,7 @@ def data(path, start=None, end=None, as_datetime=True, select='*'):
     if not os.path.isfile(path):
         raise IOError('Cannot find {}'.format(path))
 
+    import sqlite3  # only needed once a database is read, so as not to slow down startup
     detect_types = sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES if as_datetime else 0
     db = sqlite3.connect(path, timeout=10.0, detect_types=detect_types,
                          isolation_level=None)  # Open database in Autocommit mode by setting isolation_level to None
@@ -5,7 +5,6 @@ import re
 from datetime import datetime
 from subprocess import check_output
 
-import requests
 import numpy as np
 
 from ..log import log
@@ -18,6 +17,7 @@ server_add = ":".join(['http://' + host, port])
 
 
 def get(route, params=None):
+    import requests  # only needed once the server is asked for data, so as not to slow down startup
     return requests.get(server_add + route, params=params, timeout=10)
 
 
@@ -2,12 +2,11 @@
 Class for the AT106 Mettler Toledo balance with computer interface and linear weight changer
 Note: all movement commands check first if self.want_abort is True, in which case no movement occurs.
 """
-from time import perf_counter
 
 from msl.equipment import MSLTimeoutError
-from msl.qt import application
 
-from . import AWBalLinear, MettlerToledo
+from .aw_linear import AWBalLinear
+from .mettler import MettlerToledo
 from ..log import log
 
 
@@ -28,6 +27,7 @@ class AT106(AWBalLinear, MettlerToledo):
         super().__init__(record, reset)
         self.internal_weights = None  # options: 0, 1 or 2; each weight is 10 g
         self.cal_pos = 0
+        self.continuous_output = None  # the AT106 does not use MT-SICS
 
     @property
     def mode(self):
@@ -197,15 +197,15 @@ class AT106(AWBalLinear, MettlerToledo):
 
         m = self._query("CA").split()  # initiates
         if m[1] == 'BEGIN':
-            app = application()
             log.info('Balance self-calibration commencing')
-            t0 = perf_counter()
+            t0 = self.clock()
             while True:
-                app.processEvents()
+                if self.idle is not None:  # the read below waits for the connection timeout
+                    self.idle()
                 try:
                     c = self.connection.read().split()
                     if c[1] == 'END':
-                        cal_time = int(perf_counter() - t0)
+                        cal_time = int(self.clock() - t0)
                         log.info(f'Balance self-calibration completed successfully in {cal_time} seconds')
                         self._is_adjusted = True
                         if self.internal_weights is None:
@@ -221,7 +221,7 @@ class AT106(AWBalLinear, MettlerToledo):
                         log.error('The calibration cycle was aborted as result of an error condition.')
                         return False
                 except MSLTimeoutError:
-                    if perf_counter() - t0 > self.intcaltimeout:
+                    if self.clock() - t0 > self.intcaltimeout:
                         raise TimeoutError(f"Internal calibration took longer than {self.intcaltimeout} seconds.")
                     else:
                         log.info('Waiting for internal calibration to complete')
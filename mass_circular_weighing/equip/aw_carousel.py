@@ -2,16 +2,17 @@
 Class for a Mettler Toledo balance with computer interface and carousel weight changer
 Note: all movement commands check first if self.want_abort is True, in which case no movement occurs.
 """
-from time import perf_counter
 import numpy as np
 
 from msl.equipment import MSLTimeoutError
-from msl.qt import application
 
+import os
+
+from ..constants import move_times_folder
 from ..log import log
 from .mettler import MettlerToledo, ERRORCODES
-
-from ..gui.widgets import AllocatorDialog
+from .handler_reader import HandlerReader
+from .move_planner import MovePlanner, MOVE_TIMES_SUFFIX
 
 
 class AWBalCarousel(MettlerToledo):
@@ -42,10 +43,12 @@ class AWBalCarousel(MettlerToledo):
         self.hori_pos = None    # horizontal position (string of integer)
 
         self._move_time = False
+        self._move_planner = None
         self.cycle_duration = 0
         self._is_centred = False
 
         self.handler = None
+        self.handler_reader = HandlerReader(self.clock)  # reads the reply to each movement command
 
     @property
     def mode(self):
@@ -61,6 +64,18 @@ class AWBalCarousel(MettlerToledo):
         """Longest time taken to move between positions in circular weighing. Integer value, in seconds, or None."""
         return self._move_time
 
+    @property
+    def move_planner(self):
+        """The :class:`MovePlanner` with the move times of this balance, which are cached in the folder
+        given by the move_times_folder property of the connection (or constants.move_times_folder)"""
+        if self._move_planner is None:
+            folder = self.record.connection.properties.get('move_times_folder', move_times_folder)
+            self._move_planner = MovePlanner(
+                self.num_pos, carousel=self.mode == 'aw_c',
+                path=os.path.join(folder, self.record.alias + MOVE_TIMES_SUFFIX),
+            )
+        return self._move_planner
+
     def identify_handler(self):
         """Reports handler model and software version.
         string returned of form: H1006, serial number #xxxx, software V x.xx. ready
@@ -171,7 +186,9 @@ class AWBalCarousel(MettlerToledo):
         self._weight_groups = wtgrps
 
         # allocate weight groups to positions, and specify which to centre
-        ad = AllocatorDialog(self.num_pos, wtgrps)
+        suggestion, cycle_time = self.move_planner.suggest(len(wtgrps))
+        from ..gui.widgets import AllocatorDialog
+        ad = AllocatorDialog(self.num_pos, wtgrps, suggestion=suggestion, cycle_time=cycle_time)
         ad.exec()
         self._positions = ad.positions
         self.pos_to_centre = ad.pos_to_centre
@@ -227,21 +244,25 @@ class AWBalCarousel(MettlerToledo):
 
         times = []
         lifting = []
-        for pos in np.roll(self.positions, -1):   # puts first position at end
+        for prev_pos, pos in zip(self.positions, np.roll(self.positions, -1)):   # puts first position at end
             if self.want_abort:
                 log.warning("Check loading aborted")
                 return self.move_time
-            t0 = perf_counter()
+            t0 = self.clock()
             self.move_to(pos)
             # note that move_to has a buffer time of 5 s by default (unless wait=False)
-            times.append(perf_counter() - t0)
+            times.append(self.clock() - t0)
+            self.move_planner.record(prev_pos, pos, times[-1])
 
             self.lift_to('weighing', hori_pos=pos, wait=False)
-            self.wait_for_elapse(20)
-            m = self.get_mass_instant()
+            if self.settle_detector is not None:
+                m, stable = self.wait_for_stable(str(pos))  # only to check the loading
+            else:
+                self.wait_for_elapse(20)
+                m = self.get_mass_instant()
             log.info("Mass value: {} {}".format(m, self.unit))
             self.lift_to('top', hori_pos=pos)
-            lifting.append(perf_counter() - t0)
+            lifting.append(self.clock() - t0)
 
         self.cycle_duration = np.ceil(len(self.positions)*(max(lifting) - 10 + self.stable_wait))
         # here cycle_duration includes waits at top and bottom as well as getting the mass value
@@ -249,6 +270,7 @@ class AWBalCarousel(MettlerToledo):
         self._move_time = np.ceil(max(times))
         print("Times: "+str(times))
         print("Longest time: "+str(self.move_time))
+        self.move_planner.save()
         log.info("Balance loading check complete")
 
         return self.move_time
@@ -290,7 +312,10 @@ class AWBalCarousel(MettlerToledo):
             for i in range(repeats):
                 log.info("Centring #{} of {} for position {}".format(i + 1, repeats, pos))
                 self.lift_to('weighing', hori_pos=pos, wait=False)
-                self.wait_for_elapse(20)
+                if self.settle_detector is not None:
+                    self.wait_for_stable(str(pos))
+                else:
+                    self.wait_for_elapse(20)
                 self.lift_to('top', hori_pos=pos)
 
         log.info("Centring complete")
@@ -364,11 +389,11 @@ class AWBalCarousel(MettlerToledo):
         log.debug(m)
 
         if m[1] == 'B':
-            app = application()
             log.info('Balance self-calibration commencing')
-            t0 = perf_counter()
+            t0 = self.clock()
             while True:
-                app.processEvents()
+                if self.idle is not None:
+                    self.idle()
                 if self.want_abort:
                     log.warning('Balance self-calibration aborted')
                     return None
@@ -390,7 +415,7 @@ class AWBalCarousel(MettlerToledo):
                         self.connection.write("")
                         continue
                     elif c[1] == 'A':
-                        cal_time = int(perf_counter() - t0) + 1
+                        cal_time = int(self.clock() - t0) + 1
                         print(f'Balance self-calibration completed successfully in {cal_time} seconds')
                         log.info(f'Balance self-calibration completed successfully in {cal_time} seconds')
                         self._is_adjusted = True
@@ -424,7 +449,7 @@ class AWBalCarousel(MettlerToledo):
                         self.wait_for_elapse(1)
                         continue
                 except MSLTimeoutError:
-                    if perf_counter() - t0 > self.intcaltimeout:
+                    if self.clock() - t0 > self.intcaltimeout:
                         self.raise_handler()
                         self.raise_handler()
                         raise TimeoutError(f"Internal calibration took longer than {self.intcaltimeout} seconds.")
@@ -607,11 +632,14 @@ class AWBalCarousel(MettlerToledo):
                 self.lower_handler()
                 self.get_status()
                 if wait:
+                    self._phase('settle')
                     if self.lift_pos == 'panbraking':
                         self.wait_for_elapse(self.stable_wait)
-                    elif self.lift_pos == 'weighing':
+                    elif self.lift_pos == 'weighing' and self.settle_detector is None:
+                        # otherwise the wait for a stable reading is in get_mass_stable
                         self.wait_for_elapse(self.stable_wait)
                     # at present these waits are the same time, but we can allow different times here.
+                    self._phase('lift')
 
         self.get_status()
         log.info("Handler in position {}, {} position".format(self.hori_pos, self.lift_pos))
@@ -637,16 +665,29 @@ class AWBalCarousel(MettlerToledo):
         if not self.want_abort:
             log.info("Loading balance with {} in position {}".format(mass, pos))
             # start clock
-            t0 = perf_counter()
+            t0 = self.clock()
 
             # do move
             self.move_to(pos, wait=False)
 
-            # wait for some time to make all moves same
-            self.wait_for_elapse(self._move_time, start_time=t0)
+            # wait for some time to make the move the same in each cycle
+            self.wait_for_elapse(self.segment_move_time(pos), start_time=t0)
+            self._phase('lift')
 
             return self.lift_to('weighing', hori_pos=pos)  # this raises an error if it fails to get to the weighing position
 
+    def segment_move_time(self, pos):
+        """Time in s to allow for the move to position pos from the position before it in the cycle,
+        which is the same for every cycle. If the move has not been timed, this is the longest move time.
+        """
+        if self.positions is None or pos not in self.positions or len(self.positions) < 2:
+            return self._move_time
+        prev_pos = self.positions[self.positions.index(pos) - 1]
+        segment = self.move_planner.times.get((int(prev_pos), int(pos)))
+        if segment is None:
+            return self._move_time
+        return min(np.ceil(segment), self._move_time)
+
     def unload_bal(self, mass, pos):
         """Unloads mass from pan"""
         if not self.want_abort:
@@ -691,13 +732,20 @@ class AWBalCarousel(MettlerToledo):
 
         Returns
         -------
-        float of the average of five instantaneous balance readings over 2 s
+        float of the average of five instantaneous balance readings over 2 s,
+        or of the readings found stable by the settle detector, if configured
         """
+        if self.settle_detector is not None:
+            m, stable = self.wait_for_stable(mass)
+            if m is not None and not stable:  # an unsettled reading is never taken as a mass value
+                self._raise_error_loaded('US')
+            return m
+
         if not self.want_abort:
             log.info('Reading mass values for '+mass)
             readings = []
-            t0 = perf_counter()
-            time = perf_counter() - t0
+            t0 = self.clock()
+            time = self.clock() - t0
             while time < self.stable_wait:
                 b = self.get_mass_instant()
                 if type(b) == float:
@@ -716,7 +764,7 @@ class AWBalCarousel(MettlerToledo):
                     log.info('Mass reading: ' + str(sum(readings)/len(readings)) + ' ' + str(self._unit))
                     return sum(readings)/len(readings)
 
-                time = perf_counter() - t0
+                time = self.clock() - t0
 
             self._raise_error_loaded('U')
 
@@ -724,6 +772,9 @@ class AWBalCarousel(MettlerToledo):
         """Utility function for movement commands MOVE, SINK and LIFT.
         Waits for string returned by these commands.
 
+        The reply is read by the handler reader thread, which posts its completion,
+        and self.idle (if set) is called while waiting.
+
         Returns
         -------
         The string from the handler
@@ -731,23 +782,26 @@ class AWBalCarousel(MettlerToledo):
         if cxn is None:
             cxn = self.connection
 
-        app = application()
-        t0 = perf_counter()
-
-        while True:  # wait for handler to finish task
-            app.processEvents()
-            try:
-                r = cxn.read().strip().strip('\r')
-                if r:
-                    log.debug(r)  # for debugging only
-                    return r
-            except MSLTimeoutError:
-                if perf_counter() - t0 > self.intcaltimeout:
-                    self.raise_handler()
-                    self.raise_handler()
-                    raise TimeoutError("Movement took longer than expected")
-                else:
-                    log.info('Waiting for movement to end')
+        self.handler_reader.expect(cxn, self.intcaltimeout)
+        r = self.handler_reader.wait(idle=self.idle)
+        if r is None:
+            self.raise_handler()
+            self.raise_handler()
+            raise TimeoutError("Movement took longer than expected")
+        return r
+
+    def clear_entry_state(self):
+        super().clear_entry_state()
+        self._weight_groups = None
+        self.pos_to_centre = []
+        self.repeats = 0
+        self._move_time = False
+        self.cycle_duration = 0
+        self._is_centred = False
+
+    def close_connection(self):
+        self.handler_reader.close()
+        super().close_connection()
 
     def _raise_error_loaded(self, errorkey):
         if errorkey:
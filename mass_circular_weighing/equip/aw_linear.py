@@ -2,9 +2,7 @@
 Class for a Mettler Toledo balance with computer interface and linear weight changer
 Note: all movement commands check first if self.want_abort is True, in which case no movement occurs.
 """
-from time import sleep
-
-from . import AWBalCarousel
+from .aw_carousel import AWBalCarousel
 from ..log import log
 
 
@@ -178,7 +176,6 @@ class AWBalLinear(AWBalCarousel):
 
         move_str = 'MOVE TO '+str(pos)+'U'   # Leaves handler in the unloaded position after move
         self.arduino.write(move_str)
-        sleep(1)
         reply = self.wait_for_reply(cxn=self.arduino)
         if self.parse_reply(reply):
             log.info("Handler in position {}, {} position".format(self.hori_pos, self.lift_pos))
@@ -217,7 +214,6 @@ class AWBalLinear(AWBalCarousel):
         log.info("Sinking mass to weighing position")
         move_str = 'MOVE TO '+str(self.hori_pos)+'W'
         self.arduino.write(move_str)
-        sleep(1)
         return self.handle_lift_reply('W')
 
     def raise_handler(self, pos=None):
@@ -241,7 +237,6 @@ class AWBalLinear(AWBalCarousel):
         log.info("Lifting mass")
         move_str = 'MOVE TO ' + str(pos) + 'U'
         self.arduino.write(move_str)
-        sleep(1)
         return self.handle_lift_reply('U')
 
     def loading_position(self, pos=None):
@@ -266,7 +261,6 @@ class AWBalLinear(AWBalCarousel):
         log.info("Going to loading lift position")
         move_str = 'MOVE TO ' + str(pos) + 'L'
         self.arduino.write(move_str)
-        sleep(1)
         return self.handle_lift_reply('L')
 
     def lift_to(self, lift_position, hori_pos=None, wait=True):
@@ -291,7 +285,8 @@ class AWBalLinear(AWBalCarousel):
         elif lift_position == 'weighing':
             ok = self.lower_handler(pos=hori_pos)
             if ok:
-                if wait:
+                if wait and self.settle_detector is None:  # otherwise the wait is in get_mass_stable
+                    self._phase('settle')
                     self.wait_for_elapse(self.stable_wait)
                 return True
 
@@ -313,7 +308,32 @@ class AWBalLinear(AWBalCarousel):
                 raise ValueError(f"Failed to get to {lift_pos} lift position")
             return True
 
+    def arduino_is_connected(self):
+        """Cheap check that the Arduino still replies with its status"""
+        try:
+            self.arduino.serial.flush()
+            status = self.arduino.query("STATUS").lower()
+        except Exception as e:
+            log.warning(f'No reply from the Arduino: {e}')
+            return False
+        return 'ready' in status or 'idle' in status
+
+    def is_connected(self):
+        return super().is_connected() and self.arduino_is_connected()
+
+    def reconnect(self):
+        ok = super().reconnect()
+        if not self.arduino_is_connected():
+            try:
+                self.arduino.disconnect()
+            except Exception as e:
+                log.debug(f'Error on disconnecting from the Arduino: {e}')
+            ok = self.identify_handler() and ok
+        return ok
+
     def close_connection(self):
+        self.handler_reader.close()
+        self.stop_stream()
         self.arduino.query("END")
         self.arduino.disconnect()
         self.connection.disconnect()
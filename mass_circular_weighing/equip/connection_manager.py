@@ -0,0 +1,122 @@
+"""
+Keeps the connections to balances (and their weight handlers) open across scheme entries,
+so that moving on to the next scheme entry doesn't repeat the connection and identification of the balance.
+"""
+import atexit
+import threading
+
+from ..log import log
+
+
+class BalanceInUseError(RuntimeError):
+    """Raised when a balance is asked for while it is in use for another weighing"""
+
+
+class ConnectionManager(object):
+
+    def __init__(self):
+        """Holds one balance instance for each balance alias used in this process. A balance is checked with a
+        cheap query each time it is reused, and is reconnected (or failing that, recreated) if the check fails.
+        A balance is checked out to one weighing at a time, from :meth:`get_bal_instance` until :meth:`release`.
+        """
+        self._sessions = {}  # alias: (balance instance, mode)
+        self._in_use = set()  # aliases of the balances which are checked out
+        self._lock = threading.RLock()
+        self._released = threading.Condition(self._lock)
+
+    @property
+    def aliases(self):
+        """Aliases of the balances with open connections"""
+        return list(self._sessions)
+
+    def get_bal_instance(self, cfg, alias, timeout=0., **kwargs):
+        """Checks out the open balance instance for alias, ready for a new scheme entry,
+        or a new instance from :meth:`Configuration.get_bal_instance` if there is none.
+        The balance must be given back with :meth:`release` when the scheme entry is finished.
+
+        Parameters
+        ----------
+        cfg : :class:`~mass_circular_weighing.configuration.Configuration`
+        alias : str
+            alias for balance in config file
+        timeout : float or None, optional
+            time in seconds to wait for the balance if it is in use for another weighing, or None to wait until
+            it is released
+        kwargs
+            passed to :meth:`Configuration.get_bal_instance` if a new instance is needed
+
+        Returns
+        -------
+        Balance instance, mode
+
+        Raises
+        ------
+        BalanceInUseError
+            if the balance is still in use at the end of the timeout
+        """
+        with self._released:
+            if not self._released.wait_for(lambda: alias not in self._in_use, timeout):
+                raise BalanceInUseError(f'{alias} is in use for another weighing')
+            session = self._sessions.get(alias)
+            if session is not None:
+                bal, mode = session
+                if bal.is_connected() or self._reconnect(bal):
+                    log.info(f'Using the open connection to {alias}')
+                    bal.clear_entry_state()
+                    if bal.ambient_details.get('Type') != 'Simulated':
+                        bal._ambient_details = cfg.get_ambientlogger_info(bal_alias=alias)  # limits may have changed
+                    self._in_use.add(alias)
+                    return bal, mode
+                self.close(alias)
+
+            bal, mode = cfg.get_bal_instance(alias, **kwargs)
+            self._sessions[alias] = (bal, mode)
+            self._in_use.add(alias)
+            return bal, mode
+
+    @staticmethod
+    def _reconnect(bal):
+        try:
+            return bal.reconnect()
+        except Exception as e:
+            log.error(f'Unable to reconnect to {bal.record.alias}: {e}')
+            return False
+
+    def release(self, bal):
+        """Gives back a balance from :meth:`get_bal_instance`. Anything the balance is doing is stopped,
+        but its connection is kept open for the next scheme entry."""
+        alias = bal.record.alias
+        with self._released:
+            session = self._sessions.get(alias)
+            if session is None or session[0] is not bal:  # not managed, so nothing else will close it
+                bal._want_abort = True
+                bal.close_connection()
+                return
+            if alias not in self._in_use:  # e.g. released twice, so it may now belong to another weighing
+                log.warning(f'{alias} has already been released')
+                return
+            bal._want_abort = True
+            self._in_use.discard(alias)
+            self._released.notify_all()
+
+    def close(self, alias):
+        """Closes the connection to the balance with this alias"""
+        with self._released:
+            session = self._sessions.pop(alias, None)
+            self._in_use.discard(alias)
+            self._released.notify_all()
+        if session is None:
+            return
+        try:
+            session[0].close_connection()
+        except Exception as e:
+            log.debug(f'Error on closing the connection to {alias}: {e}')
+        log.info(f'Connection to {alias} closed')
+
+    def close_all(self):
+        for alias in self.aliases:
+            self.close(alias)
+
+
+connections = ConnectionManager()
+atexit.register(connections.close_all)
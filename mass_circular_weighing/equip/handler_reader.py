@@ -0,0 +1,137 @@
+"""
+A serial reader thread for a weight handler, which reads the reply to each movement command
+and posts its completion to the caller waiting for it.
+"""
+import threading
+from time import perf_counter
+
+from msl.equipment import MSLTimeoutError
+
+from ..log import log
+
+
+class HandlerReader(object):
+
+    def __init__(self, clock=perf_counter, poll=0.05, grace=10.):
+        """Reads the replies of a weight handler in a dedicated thread. After a movement command is written,
+        expect() hands the read over to the thread, which reads until the handler replies or the deadline passes,
+        and then sets the completion event that wait() is waiting on.
+
+        Parameters
+        ----------
+        clock : callable, optional
+            returns the time in seconds, e.g. the clock of the balance
+        poll : float, optional
+            time in seconds between calls to the idle function while waiting
+        grace : float, optional
+            time in seconds after the deadline that wait() allows for the last read of the connection to time out
+        """
+        self.clock = clock
+        self.poll = poll
+        self.grace = grace
+
+        self._lock = threading.Lock()
+        self._request = None  # (connection, deadline) of the expected reply; a new tuple for each command
+        self._reply = None
+        self._error = None
+        self._armed = threading.Event()
+        self._done = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    @property
+    def is_waiting(self):
+        """True while a reply is expected from the handler"""
+        return self._armed.is_set() and not self._done.is_set()
+
+    def expect(self, connection, timeout):
+        """Starts reading for the reply to a command which has just been written to the handler
+
+        Parameters
+        ----------
+        connection : msl.equipment connection
+            the connection to the handler
+        timeout : float
+            time in seconds allowed for the handler to reply
+        """
+        if self._closed:
+            raise RuntimeError('The reader of the weight handler has been closed')
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        with self._lock:  # any read still in progress for an earlier command no longer posts its reply
+            self._request = (connection, self.clock() + timeout)
+            self._reply = None
+            self._error = None
+            self._done.clear()
+            self._armed.set()
+
+    def wait(self, idle=None):
+        """Waits for the completion of the expected reply, for no longer than the deadline plus the grace time
+
+        Parameters
+        ----------
+        idle : callable, optional
+            called repeatedly while waiting, e.g. to keep a user interface responsive
+
+        Returns
+        -------
+        str reply from the handler, or None if there was no reply before the deadline or the reader was closed
+        """
+        request = self._request
+        while not self._done.wait(self.poll):
+            if idle is not None:
+                idle()
+            if request is None or self.clock() > request[1] + self.grace:
+                log.warning('No reply was read from the weight handler')
+                return None
+        if self._error is not None:
+            raise self._error
+        return self._reply
+
+    def close(self, timeout=5.):
+        """Stops the reader thread, abandoning any read in progress, and releases any caller waiting for a reply
+
+        Parameters
+        ----------
+        timeout : float, optional
+            time in seconds to wait for the thread to end, e.g. while a read of the connection times out
+        """
+        with self._lock:
+            self._closed = True
+            self._reply = None
+            self._done.set()
+            self._armed.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                log.warning('The reader of the weight handler did not stop within {} s'.format(timeout))
+
+    def _run(self):
+        while True:
+            self._armed.wait()
+            request = self._request
+            if self._closed:
+                return
+            reply = error = None
+            try:
+                reply = self._read(*request)
+            except Exception as e:  # passed on to the waiting caller
+                error = e
+            with self._lock:
+                if request is self._request and not self._closed:
+                    self._reply, self._error = reply, error
+                    self._armed.clear()
+                    self._done.set()
+
+    def _read(self, connection, deadline):
+        while True:
+            try:
+                r = connection.read().strip().strip('\r')
+                if r:
+                    log.debug(r)  # for debugging only
+                    return r
+            except MSLTimeoutError:
+                if self._closed or self.clock() > deadline:
+                    return None
+                log.info('Waiting for movement to end')
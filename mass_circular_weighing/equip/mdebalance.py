@@ -2,17 +2,11 @@
 Class for any balance without a computer interface.
 Each Balance class instance also holds connection information for the associated ambient monitoring device.
 """
-import winsound
-from time import perf_counter
-
-from msl.qt import application
+from time import perf_counter, sleep
 
 from ..constants import SUFFIX, FONTSIZE
 from ..log import log
 
-from ..gui.threads.prompt_thread import PromptThread
-# prompt_thread = PromptThread()
-
 
 class Balance(object):
 
@@ -29,16 +23,21 @@ class Balance(object):
             Requires an MSL.equipment config.xml file
         """
         self.record = record
+        self.clock = getattr(record, 'clock', perf_counter)
+        # a simulated balance runs in virtual time, otherwise the clock is time.perf_counter
         self._ambient_instance = None
         self._ambient_details = None
         self._want_abort = False
+        self.timer = None  # a PhaseTimer, while the phases of each reading are timed
+        self.idle = None  # called while waiting for a weight handler, e.g. to process the events of a GUI
+        self.idle_interval = 0.05  # time in seconds between calls to self.idle while waiting
 
         self._positions = None
         self.cal_pos = 1
         self.want_adjust = False
         self._is_adjusted = False
 
-        self._pt = PromptThread()
+        self._prompt_thread = None  # made when the operator is first prompted, as it needs Qt
 
         self._unit = record.user_defined['unit']
         if not self._unit:
@@ -54,6 +53,14 @@ class Balance(object):
         self.stable_wait = record.user_defined['stable_wait']
         # wait time in seconds for balance reading to stabilise
 
+    @property
+    def _pt(self):
+        """The PromptThread used to prompt the operator"""
+        if self._prompt_thread is None:
+            from ..gui.threads.prompt_thread import PromptThread
+            self._prompt_thread = PromptThread()
+        return self._prompt_thread
+
     @property
     def mode(self):
         return 'mde'
@@ -185,7 +192,11 @@ class Balance(object):
     def unload_bal(self, mass, pos):
         """Prompts user to remove specified mass from balance"""
         if not self.want_abort:
-            winsound.Beep(880, 300)
+            try:
+                import winsound
+                winsound.Beep(880, 300)
+            except ImportError:  # not available on Linux or macOS
+                pass
             print('Unload '+mass+' (position '+str(pos+1)+')')
 
     def get_mass_instant(self):
@@ -219,11 +230,45 @@ class Balance(object):
             log.info('Mass reading: ' + str(reading) + ' ' + str(self._unit))
             return reading
 
+    def is_connected(self):
+        """Cheap check that the balance still responds, e.g. before reusing an open connection"""
+        return True
+
+    def reconnect(self):
+        """Closes and reopens the connection to the balance, keeping the state of this instance"""
+        return True
+
+    def clear_entry_state(self):
+        """Clears the state which belongs to a scheme entry, so that the balance can be used for the next one"""
+        self._want_abort = False
+        self._positions = None
+        self.want_adjust = False
+        self._is_adjusted = False
+        self.timer = None
+
     def close_connection(self):
         pass
 
-    @staticmethod
-    def wait_for_elapse(elapse_time, start_time=None):
+    def _phase(self, name):
+        """Marks the start of a phase of a reading, if the phases are being timed"""
+        if self.timer is not None:
+            self.timer.start(name)
+
+    def idle_sleep(self, seconds):
+        """Calls self.idle (if set), then sleeps for the given time on the clock of the balance,
+        or for self.idle_interval if that is shorter, so that the wait does not keep a processor busy
+
+        Parameters
+        ----------
+        seconds : float
+            time to sleep in seconds
+        """
+        if self.idle is not None:
+            self.idle()
+        # a simulated balance sleeps in virtual time
+        getattr(self.clock, 'sleep', sleep)(min(seconds, self.idle_interval))
+
+    def wait_for_elapse(self, elapse_time, start_time=None):
         """Wait for a specified time while allowing other events to be processed
 
         Parameters
@@ -231,16 +276,15 @@ class Balance(object):
         elapse_time : float
             time to wait in seconds
         start_time : float
-            perf_counter value at start time.
+            clock value at start time.
             If not specified, the timer begins when the function is called.
         """
-        app = application()
         if start_time is None:
-            start_time = perf_counter()
-        time = perf_counter() - start_time
+            start_time = self.clock()
+        time = self.clock() - start_time
         wait_time = elapse_time - time
         log.info("Waiting for {} s...".format(round(wait_time, 1)))
         while time < elapse_time:
-            app.processEvents()
-            time = perf_counter() - start_time
+            self.idle_sleep(elapse_time - time)
+            time = self.clock() - start_time
         log.debug('Wait over, ready for next task')
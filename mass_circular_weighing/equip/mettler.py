@@ -1,14 +1,14 @@
 """
 Class for a Mettler Toledo balance with a computer interface
 """
-from time import perf_counter
 
 from msl.equipment import MSLTimeoutError, MSLConnectionError
-from msl.qt import application
 
 from ..log import log
 from ..constants import SUFFIX
 from .mdebalance import Balance
+from .stability import SettleDetector
+from .stream import ReadingStream
 
 
 class MettlerToledo(Balance):
@@ -30,6 +30,15 @@ class MettlerToledo(Balance):
 
         self.intcaltimeout = self.record.connection.properties.get('intcaltimeout', 30)
 
+        # if configured, stable readings are detected from a series of instantaneous readings
+        self.settle_detector = SettleDetector.from_properties(self.record.connection.properties, self.resolution)
+        self.settle_time = None  # time taken to reach a stable reading, if detected
+
+        # if configured (as SIR or SR), readings are taken from the continuous output of the balance
+        self.continuous_output = self.record.connection.properties.get('continuous_output')
+        self.stream = None
+        self.sr_wait = 1.  # time in seconds to wait for a new weight value with SR, after which it is unchanged
+
     @property
     def mode(self):
         return 'mw'
@@ -89,16 +98,16 @@ class MettlerToledo(Balance):
         """Adjusts scale using internal weights"""
         m = self._query("C3").split()
         if m[1] == 'B':
-            app = application()
             print('Balance self-calibration commencing')
             log.info('Balance self-calibration commencing')
-            t0 = perf_counter()
+            t0 = self.clock()
             while True:
-                app.processEvents()
+                if self.idle is not None:  # the read below waits for the connection timeout
+                    self.idle()
                 try:
                     c = self.connection.read().split()
                     if c[1] == 'A':
-                        cal_time = int(perf_counter() - t0)
+                        cal_time = int(self.clock() - t0)
                         print(f'Balance self-calibration completed successfully in {cal_time} seconds')
                         log.info(f'Balance self-calibration completed successfully in {cal_time} seconds')
                         self._is_adjusted = True
@@ -108,7 +117,7 @@ class MettlerToledo(Balance):
                         return False
                         # self._raise_error('CAL C')
                 except MSLTimeoutError:
-                    if perf_counter() - t0 > self.intcaltimeout:
+                    if self.clock() - t0 > self.intcaltimeout:
                         raise TimeoutError(f"Internal calibration took longer than {self.intcaltimeout} seconds.")
                     else:
                         log.info('Waiting for internal calibration to complete')
@@ -140,9 +149,64 @@ class MettlerToledo(Balance):
         error code
             if balance read correctly but error raised
         """
+        if self.continuous_output and self.stream is None:
+            self.start_stream()
+        if self.stream is not None:
+            return self._parse_streamed(self.stream.latest())
+
         m = self._query("SI").split()
         return self.parse_mass_reading(m)
 
+    def start_stream(self, command=None):
+        """Starts the continuous output of weight values, which a thread reads into a ring buffer.
+        While streaming, get_mass_instant and get_mass_stable take readings from the buffer,
+        and any other replies are read through the stream in place of the connection.
+
+        Parameters
+        ----------
+        command : str, optional
+            SIR to send all weight values, or SR to send a weight value after each change.
+            If not specified, the continuous_output property of the connection is used, or SIR.
+
+        Returns
+        -------
+        :class:`ReadingStream`
+        """
+        if self.stream is None:
+            maxlen = self.record.connection.properties.get('stream_buffer', 10000)
+            self.stream = ReadingStream(self.connection, self.clock, maxlen=maxlen)
+            self.stream.start(command or self.continuous_output or 'SIR')
+            self.connection = self.stream
+        return self.stream
+
+    def stop_stream(self):
+        """Stops the continuous output of weight values"""
+        if self.stream is not None:
+            self.stream.stop()
+            self.connection = self.stream.connection
+            self.stream = None
+
+    def _parse_streamed(self, reading):
+        """Returns the mass value of a (time, reply) reading from the stream, or None if no reading"""
+        if reading is None:
+            return None
+        m = reading[1].split()
+        if m[1] in ['S', 'D'] and self.check_reading(m) is True:
+            return float(m[2])  # without logging each nonstable value
+        return self.parse_mass_reading(m)
+
+    def _next_streamed(self, after):
+        """The first (time, reply) reading from the stream read after the time after, or None if none arrived.
+        As SR only sends a weight value after a change, with SR the last reading is returned (at the current time)
+        if there is no new reading within sr_wait seconds, as the weight is unchanged."""
+        if self.stream.command != 'SR':
+            return self.stream.next_reading(after=after)
+        reading = self.stream.next_reading(after=after, timeout=self.sr_wait)
+        if reading is None:
+            last = self.stream.latest()
+            return None if last is None else (self.clock(), last[1])
+        return reading
+
     def parse_mass_reading(self, m):
         """Handle any errors or return the mass reading as a float
 
@@ -180,20 +244,39 @@ class MettlerToledo(Balance):
         float
             mass in unit set for balance
         """
+        if self.settle_detector is not None:
+            m, stable = self.wait_for_stable(mass)
+            if m is not None and not stable:  # an unsettled reading is never taken as a mass value
+                self._raise_error('US')
+            return m
+
         if not self.want_abort:
             log.info('Waiting for stable reading for '+mass)
             readings = []
-            t0 = perf_counter()
+            t0 = self.clock()
 
-            m = self._query("S")
+            t_prev = None  # the time of the last reading taken from the stream
+            if self.stream is not None:
+                reading = self.stream.latest(stable=True, timeout=self.stable_wait)
+                m = reading[1] if reading else None
+                t_prev = reading[0] if reading else None
+            else:
+                m = self._query("S")
             if m:
                 a = self.parse_mass_reading(m.split())  # handles any errors if not a valid mass value
                 if type(a) == float:
                     readings.append(a)
 
-            while perf_counter() - t0 < self.stable_wait:
-                while len(readings) < 3:
-                    b = self.get_mass_instant()
+            while self.clock() - t0 < self.stable_wait:
+                while len(readings) < 3 and self.clock() - t0 < self.stable_wait:
+                    if self.stream is not None:  # a new reading each time, rather than the same one again
+                        reading = self._next_streamed(t_prev)
+                        if reading is None:
+                            continue
+                        t_prev = reading[0]
+                        b = self._parse_streamed(reading)
+                    else:
+                        b = self.get_mass_instant()
                     if type(b) == float:
                         readings.append(b)
                     elif not b:
@@ -201,6 +284,8 @@ class MettlerToledo(Balance):
                     else:
                         return b
 
+                if len(readings) < 3:
+                    break
                 if max(readings) - min(readings) <= 2*self.resolution:
                     log.info('Mass reading: ' + str(sum(readings)/len(readings)) + ' ' + str(self._unit))
                     return sum(readings)/len(readings)
@@ -211,6 +296,42 @@ class MettlerToledo(Balance):
 
             self._raise_error('U')
 
+    def wait_for_stable(self, mass=''):
+        """Takes instantaneous readings until the settle detector finds them stable, or until its timeout.
+        The time taken is kept as self.settle_time.
+
+        Parameters
+        ----------
+        mass : str, optional
+            the name of the weight group being weighed
+
+        Returns
+        -------
+        tuple of (float, bool)
+            mean of the readings in the detector window, in unit set for balance, or None if aborted,
+            and whether the readings were found stable (False if the detector timed out)
+        """
+        sd = self.settle_detector
+        sd.resolution = self.resolution
+        log.info('Waiting for stable reading for ' + mass)
+        self._phase('settle')
+        sd.reset(self.clock())
+        while not self.want_abort:
+            t = self.clock()
+            m = self.get_mass_instant()
+            if type(m) == float and sd.add(t, m):
+                self.settle_time = sd.settle_time
+                log.info(f'Reading stable after {round(sd.settle_time, 1)} s. Mass reading: {sd.mean} {self.unit}')
+                self._phase('read')
+                return sd.mean, True
+            if sd.timed_out(self.clock()):
+                self.settle_time = None
+                log.warning(f'Readings not stable after {sd.timeout} s: {sd.readings}')
+                self._phase('read')
+                return sd.mean, False
+            self.wait_for_elapse(sd.interval, start_time=t)
+        return None, False
+
     def check_reading(self, m, index=3):
         """Checks that the reading is a valid mass value by determining the unit returned in position index"""
         try:
@@ -232,7 +353,30 @@ class MettlerToledo(Balance):
         if errorkey:
             raise ValueError(ERRORCODES.get(errorkey, 'Unknown serial communication error: {}'.format(errorkey)))
 
+    def is_connected(self):
+        try:
+            return str(self.get_serial()) == str(self.record.serial)
+        except Exception as e:
+            log.warning(f'No reply from {self.record.alias}: {e}')
+            return False
+
+    def reconnect(self):
+        if self.stream is not None:
+            try:
+                self.stop_stream()
+            except Exception:  # the connection has already gone
+                self.connection, self.stream = self.stream.connection, None
+        try:
+            self.connection.disconnect()
+        except Exception as e:
+            log.debug(f'Error on disconnecting from {self.record.alias}: {e}')
+        log.info(f'Reconnecting to {self.record.alias}')
+        self.wait_for_elapse(2)
+        self.connect_bal()
+        return self.is_connected()
+
     def close_connection(self):
+        self.stop_stream()
         self.connection.disconnect()
 
 
@@ -261,6 +405,7 @@ ERRORCODES = {
     'SI+':  'Balance in overload range.',
     'SI-':  'Balance in underload range.',
     'U':    'Timed out while trying to obtain three close readings from get_mass_stable ',
+    'US':   'Timed out while waiting for the settle detector to find the readings stable ',
     'POS':  'Selected position invalid',
     'ET':   'Error Transmission: At least one character of the command has a parity error. The command will be ignored.',
     'FE 1': 'FATAL ERROR: Top Position, but light barrier (lift) open!',
@@ -0,0 +1,167 @@
+"""
+Travel times of a weight handler between each pair of positions, for planning the allocation of weight groups
+to positions and the padding of each move in a circular weighing.
+"""
+import os
+import json
+from itertools import permutations
+from math import perm
+
+import numpy as np
+
+from ..log import log
+
+MOVE_TIMES_SUFFIX = '_move_times.json'
+MAX_ORDERS = 40320   # number of orders of weight groups to try when suggesting an allocation
+
+
+class MovePlanner(object):
+
+    def __init__(self, num_pos, carousel=True, path=None):
+        """Keeps the time taken to move between each pair of positions, as measured during check_loading.
+        The time for a pair which has not been measured is estimated from a linear fit of the measured times
+        against the number of steps between positions.
+
+        Parameters
+        ----------
+        num_pos : int
+            number of positions on the weight handler
+        carousel : bool, optional
+            True for a carousel, on which the handler takes the shortest way round, or False for a linear handler
+        path : str, optional
+            path to the json file in which the times are cached for the balance
+        """
+        self.num_pos = int(num_pos)
+        self.carousel = carousel
+        self.path = path
+        self.times = {}   # (from, to): longest time measured in s
+        self._model = None  # the fit of the times, until another time is recorded
+        if path is not None and os.path.isfile(path):
+            self.load()
+
+    @property
+    def all_positions(self):
+        """Position numbers of the handler, which start from 0 if there are more than 9 positions"""
+        if self.num_pos > 9:
+            return list(range(self.num_pos))
+        return list(range(1, self.num_pos + 1))
+
+    def steps(self, a, b):
+        """Number of steps the handler travels between positions a and b"""
+        d = abs(int(a) - int(b))
+        if self.carousel:
+            return min(d, self.num_pos - d)
+        return d
+
+    def load(self):
+        with open(self.path, mode='r', encoding='utf-8') as fp:
+            saved = json.load(fp)
+        if saved.get('Number of positions') != self.num_pos:
+            log.warning(f'Move times in {self.path} are for a different number of positions')
+            return
+        self.times = {(int(a), int(b)): t for a, b, t in saved['Move times']}
+        self._model = None
+
+    def save(self):
+        """Saves the move times to the cache file, if the folder for the file exists"""
+        if self.path is None or not os.path.isdir(os.path.dirname(self.path)):
+            return False
+        with open(self.path, mode='w', encoding='utf-8') as fp:
+            json.dump({
+                'Number of positions': self.num_pos,
+                'Move times': [[a, b, t] for (a, b), t in sorted(self.times.items())],
+            }, fp, indent=2)
+        return True
+
+    def record(self, a, b, seconds):
+        """Records a measured time for the move from position a to position b"""
+        key = (int(a), int(b))
+        seconds = max(self.times.get(key, 0.), float(seconds))
+        if self.times.get(key) != seconds:
+            self.times[key] = seconds
+            self._model = None
+
+    def model(self):
+        """Least squares fit of the measured times to a fixed time plus a time per step.
+        The fit is kept until another time is recorded.
+
+        Returns
+        -------
+        tuple of (fixed time, time per step) in s, or None if there are no measured times
+        """
+        if self._model is None and self.times:
+            self._model = self._fit()
+        return self._model
+
+    def _fit(self):
+        steps = np.array([self.steps(a, b) for a, b in self.times])
+        times = np.array(list(self.times.values()))
+        if len(set(steps)) < 2:
+            # not enough to separate the fixed time from the time per step
+            return 0., float(np.max(times / np.maximum(steps, 1)))
+        per_step, fixed = np.polyfit(steps, times, 1)
+        return max(float(fixed), 0.), max(float(per_step), 0.)
+
+    def move_time(self, a, b):
+        """Time in s for the move from position a to position b: the longest measured time if the move
+        has been measured, otherwise the time estimated from the model, or None if nothing has been measured
+        """
+        key = (int(a), int(b))
+        if key in self.times:
+            return self.times[key]
+        model = self.model()
+        if model is None:
+            return None
+        return model[0] + model[1] * self.steps(a, b)
+
+    def segment_times(self, positions, move_times=None):
+        """Times in s for the move to each position in a cycle of the circular weighing, from the position before
+
+        Parameters
+        ----------
+        positions : list of int
+            positions of the weight groups in the order of weighing
+        move_times : dict, optional
+            move time for each (from, to) pair of positions, if already known
+
+        Returns
+        -------
+        list of float, or None if the times are not known
+        """
+        if move_times is None:
+            times = [self.move_time(positions[i - 1], pos) for i, pos in enumerate(positions)]
+        else:
+            times = [move_times[(positions[i - 1], pos)] for i, pos in enumerate(positions)]
+        if None in times:
+            return None
+        return times
+
+    def suggest(self, num_wtgrps):
+        """Suggests positions for the weight groups which minimise the time spent moving in each cycle,
+        and then the longest move in the cycle
+
+        Parameters
+        ----------
+        num_wtgrps : int
+            number of weight groups in the circular weighing
+
+        Returns
+        -------
+        tuple of (positions, cycle move time in s), or (None, None) if the times are not known
+        """
+        if self.model() is None or not 1 < num_wtgrps <= self.num_pos:
+            return None, None
+        if perm(self.num_pos, num_wtgrps) <= MAX_ORDERS:
+            candidates = permutations(self.all_positions, num_wtgrps)
+        else:
+            # too many orders to try them all: adjacent positions in turn are the fewest steps per cycle
+            candidates = [self.all_positions[i:i + num_wtgrps] for i in range(self.num_pos - num_wtgrps + 1)]
+        # each move time is worked out once, rather than for each order in which it occurs
+        move_times = {(a, b): self.move_time(a, b) for a in self.all_positions for b in self.all_positions}
+        best, best_key = None, None
+        for candidate in candidates:
+            times = self.segment_times(candidate, move_times)
+            key = (round(sum(times), 1), round(max(times), 1))
+            if best_key is None or key < best_key:
+                best, best_key = list(candidate), key
+        return best, best_key[0]
@@ -0,0 +1,252 @@
+"""
+Recording and replay of the serial traffic between a balance class and a balance or weight handler.
+A recorded session is saved as gzipped JSON lines: a header with the equipment record details,
+then one line for each command written and each reply read (or read timeout), with the time in seconds
+since the connection was made. Replaying a session answers the same sequence of commands with the same replies,
+at the original timing or faster, so that real weighing sessions can be rerun without the hardware.
+"""
+import os
+import gzip
+import json
+from datetime import datetime
+from time import perf_counter
+
+from msl.equipment import MSLTimeoutError
+
+from ..log import log
+from .simulator import VirtualClock, SimulatedRecord, SIMULATED_AMBIENT
+
+WRITE = 'w'
+READ = 'r'
+
+
+class RecordingConnection(object):
+
+    def __init__(self, connection, path, header):
+        """Wraps an msl.equipment connection to record every command, reply and timestamp to a session file
+
+        Parameters
+        ----------
+        connection : msl.equipment connection
+        path : str
+            path to the session file (.jsonl.gz)
+        header : dict
+            equipment record details, saved as the first line of the session file
+        """
+        self._connection = connection
+        self.path = path
+        self._clock = getattr(connection, 'clock', perf_counter)  # a simulated connection runs in virtual time
+        self._t0 = self._clock()
+        header['t0'] = self._t0  # to align the sessions of a balance and its weight handler
+        self._fp = gzip.open(path, mode='wt', encoding='utf-8')
+        self._add(header)
+
+    def __getattr__(self, item):
+        return getattr(self._connection, item)
+
+    @property
+    def rstrip(self):
+        return self._connection.rstrip
+
+    @rstrip.setter
+    def rstrip(self, value):
+        self._connection.rstrip = value
+
+    def _add(self, entry):
+        self._fp.write(json.dumps(entry, default=str) + '\n')
+        self._fp.flush()
+
+    def _event(self, kind, text):
+        self._add([round(self._clock() - self._t0, 4), kind, text])
+
+    def write(self, msg):
+        self._event(WRITE, msg)
+        return self._connection.write(msg)
+
+    def read(self):
+        try:
+            reply = self._connection.read()
+        except MSLTimeoutError:
+            self._event(READ, None)
+            raise
+        self._event(READ, reply)
+        return reply
+
+    def query(self, msg):
+        self.write(msg)
+        return self.read()
+
+    def disconnect(self):
+        self._connection.disconnect()
+        self._fp.close()
+        log.info('Session saved to ' + self.path)
+
+
+class RecordingRecord(object):
+
+    def __init__(self, record, folder):
+        """Stands in for an msl.equipment EquipmentRecord, so that each connection made to the equipment
+        is recorded to a new session file in folder
+
+        Parameters
+        ----------
+        record : equipment record object
+        folder : str
+        """
+        self._record = record
+        self.folder = folder
+
+    def __getattr__(self, item):
+        return getattr(self._record, item)
+
+    def __repr__(self):
+        return repr(self._record)
+
+    def connect(self):
+        r = self._record
+        filename = f"{r.alias}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        header = {
+            'alias': r.alias, 'manufacturer': r.manufacturer, 'model': r.model, 'serial': r.serial,
+            'user_defined': dict(r.user_defined),
+            'properties': dict(r.connection.properties) if r.connection is not None else {},
+            'Timestamp': datetime.now().isoformat(sep=' ', timespec='seconds'),
+        }
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, filename)
+        log.info(f'Recording the session with {r.alias} to {path}')
+        return RecordingConnection(r.connect(), path, header)
+
+
+def read_session(path):
+    """Reads a session file
+
+    Returns
+    -------
+    tuple of (header, events) where header is a dict and events is a list of [time, kind, text]
+    """
+    with gzip.open(path, mode='rt', encoding='utf-8') as fp:
+        header = json.loads(fp.readline())
+        events = [json.loads(line) for line in fp if line.strip()]
+    return header, events
+
+
+class ReplayConnection(object):
+
+    class _Port(object):
+        def flush(self):
+            pass
+
+    def __init__(self, path, clock, origin=None):
+        """Replays a session file: each command written must match the recorded command, and each read returns the
+        recorded reply (or raises MSLTimeoutError) once the recorded time has elapsed on the clock
+
+        Parameters
+        ----------
+        path : str
+            path to the session file
+        clock : :class:`VirtualClock`
+            clock running at the replay speed, shared with any other connection replayed in the same session
+        origin : float, optional
+            clock value at the start of the session, if earlier than the start of this recording
+        """
+        self.path = path
+        self.clock = clock
+        self.header, self._events = read_session(path)
+        if origin is not None:
+            offset = self.header['t0'] - origin
+            self._events = [[t + offset, k, text] for t, k, text in self._events]
+        self._i = 0
+        self.rstrip = True
+        self.serial = self._Port()
+
+    @property
+    def remaining(self):
+        """Number of recorded events not yet replayed"""
+        return len(self._events) - self._i
+
+    def _next(self, kind):
+        if self._i >= len(self._events):
+            raise EOFError(f'End of the recorded session {self.path}')
+        t, k, text = self._events[self._i]
+        if not k == kind:
+            raise ValueError(f'Replay of {self.path} diverged at event {self._i}: '
+                             f'expected {"write" if k == WRITE else "read"} of {text!r}')
+        self._i += 1
+        return t, text
+
+    def write(self, msg):
+        t, text = self._next(WRITE)
+        if not msg == text:
+            raise ValueError(f'Replay of {self.path} diverged at event {self._i - 1}: '
+                             f'expected command {text!r} but received {msg!r}')
+
+    def read(self):
+        t, reply = self._next(READ)
+        self.clock.sleep(t - self.clock())
+        if reply is None:
+            raise MSLTimeoutError('Timeout in the recorded session')
+        return reply
+
+    def query(self, msg):
+        self.write(msg)
+        return self.read()
+
+    def disconnect(self):
+        log.info(f'Replay of {self.path} ended with {self.remaining} events remaining')
+
+
+def replay_records(path, handler_path=None, speedup=1.):
+    """Makes records for replaying a session, for initialising a balance class in place of the equipment records
+
+    Parameters
+    ----------
+    path : str
+        session file for the balance
+    handler_path : str, optional
+        session file for the Arduino of a linear weight handler, recorded at the same time as the balance session
+    speedup : float, optional
+        1 to replay at the original timing, or the ratio of the replay speed to the original speed
+
+    Returns
+    -------
+    tuple of the :class:`SimulatedRecord` for the balance and for the handler (or None)
+    """
+    clock = VirtualClock(speedup)
+    origin = read_session(path)[0]['t0']
+    records = []
+    for p in [path, handler_path]:
+        if p is None:
+            records.append(None)
+            continue
+        cxn = ReplayConnection(p, clock, origin=origin)
+        h = cxn.header
+        records.append(SimulatedRecord(
+            cxn, alias=h['alias'], manufacturer=h['manufacturer'], model=h['model'], serial=h['serial'],
+            user_defined=h['user_defined'], properties=h['properties'],
+        ))
+
+    return tuple(records)
+
+
+def replay_balance(path, handler_path=None, speedup=1.):
+    """Initialises a balance of the recorded weighing mode which replays a session
+
+    Parameters
+    ----------
+    path, handler_path, speedup
+        see :func:`replay_records`
+
+    Returns
+    -------
+    balance instance, with constant ambient conditions
+    """
+    from . import MettlerToledo, AWBalCarousel, AWBalLinear, AT106
+    bal_class = {'mw': MettlerToledo, 'aw_c': AWBalCarousel, 'aw_l': AWBalLinear, 'aw_106': AT106}
+
+    record, handler_record = replay_records(path, handler_path=handler_path, speedup=speedup)
+    bal = bal_class[record.user_defined['weighing_mode']](record)
+    if handler_record is not None:
+        bal.handler = handler_record
+    bal._ambient_details = dict(SIMULATED_AMBIENT)
+
+    return bal
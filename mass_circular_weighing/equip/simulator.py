@@ -0,0 +1,516 @@
+"""
+Simulated Mettler Toledo balances and weight handlers, for running the acquisition routines without hardware.
+A simulated connection replies to the subset of MT-SICS commands used by the balance classes
+(S, SI, SIR, SR, Z, T, C1, C3, I4, @) and to the commands of the carousel handlers (IDENTIFY, MOVE, SINK, LIFT, STATUS)
+and of the linear Arduino handlers.
+The balance and handler state evolves in virtual time, which may run faster than real time, so that check_loading,
+centring and do_circ_weighing can be run, benchmarked and profiled on any computer.
+"""
+from collections import deque
+from time import perf_counter, sleep
+
+import numpy as np
+from msl.equipment import MSLTimeoutError
+
+from ..log import log
+
+# handler identity expected by AWBalCarousel.identify_handler for each carousel balance model
+HANDLER_IDS = {
+    "AX10005": "H10005, serial number #0003",
+    "AX1006": "H1006, serial number #0040",
+    "AX107H": "H1006, serial number #0015",
+}
+
+# ambient monitoring details for a simulated balance: conditions are constant at T and RH
+SIMULATED_AMBIENT = {
+    'Type': 'Simulated', 'Alias': 'Simulated',
+    'T': 20.0, 'RH': 50.0,
+    'MIN_T': 18.1, 'MAX_T': 21.9, 'MAX_T_CHANGE': 0.5,
+    'MIN_RH': 33, 'MAX_RH': 67, 'MAX_RH_CHANGE': 15,
+}
+
+
+class VirtualClock(object):
+
+    def __init__(self, speedup=1.):
+        """A clock which runs speedup times faster than real time, in seconds since the clock was created.
+        An instance is used in place of time.perf_counter by a simulated balance.
+
+        Parameters
+        ----------
+        speedup : float, optional
+            ratio of virtual time to real time
+        """
+        self.speedup = float(speedup)
+        self._t0 = perf_counter()
+
+    def __call__(self):
+        return self.speedup * (perf_counter() - self._t0)
+
+    def sleep(self, seconds):
+        """Sleeps for a number of seconds of virtual time"""
+        if seconds > 0:
+            sleep(seconds / self.speedup)
+
+
+class WeightHandler(object):
+
+    def __init__(self, clock, masses=None, num_pos=4, lift_positions=('top', 'weighing'),
+                 move_time=5., lift_time=3.):
+        """State of a simulated weight handler: the position of the handler and the masses it carries
+
+        Parameters
+        ----------
+        clock : :class:`VirtualClock`
+        masses : dict, optional
+            mass in g (as a balance reading) of the weight group in each loading position, keyed by position
+        num_pos : int, optional
+            number of loading positions, numbered from 1
+        lift_positions : tuple of str, optional
+            lift positions from the top down; the weight is on the pan in the weighing position and below
+        move_time : float, optional
+            time in seconds to move between adjacent loading positions
+        lift_time : float, optional
+            time in seconds to move by one lift position
+        """
+        self.clock = clock
+        self.masses = masses if masses is not None else {}
+        self.num_pos = num_pos
+        self.lift_positions = list(lift_positions)
+        self.move_time = move_time
+        self.lift_time = lift_time
+
+        self.hori_pos = 1
+        self.lift_pos = self.lift_positions[0]
+        self.busy_until = 0.
+        self.loaded_at = 0.
+
+    @property
+    def load(self):
+        """Mass in g on the balance pan"""
+        if self.lift_positions.index(self.lift_pos) >= self.lift_positions.index('weighing'):
+            return self.masses.get(self.hori_pos, 0.)
+        return 0.
+
+    def _start(self, duration):
+        """Returns the time at which a movement of the given duration, starting once the handler is free, completes"""
+        self.busy_until = max(self.busy_until, self.clock()) + duration
+        return self.busy_until
+
+    def lift_to(self, lift_pos):
+        was_loaded = self.load
+        steps = abs(self.lift_positions.index(lift_pos) - self.lift_positions.index(self.lift_pos))
+        done = self._start(steps * self.lift_time)
+        self.lift_pos = lift_pos
+        if self.load != was_loaded:
+            self.loaded_at = done
+        return done
+
+    def move(self, pos, lift_pos=None, carousel=True):
+        """Lifts the weights off the pan then moves to pos, by the shortest route for a carousel.
+        Returns the time at which the movement is complete."""
+        self.lift_to(self.lift_positions[0])
+        steps = abs(pos - self.hori_pos)
+        if carousel:
+            steps = min(steps, self.num_pos - steps)
+        done = self._start(steps * self.move_time)
+        self.hori_pos = pos
+        if lift_pos is not None:
+            done = self.lift_to(lift_pos)
+        return done
+
+    def sink(self):
+        i = self.lift_positions.index(self.lift_pos)
+        if i == len(self.lift_positions) - 1:
+            return None
+        return self.lift_to(self.lift_positions[i + 1])
+
+    def lift(self):
+        """Raises by one lift position. The braking position is only passed through on the way down."""
+        i = self.lift_positions.index(self.lift_pos)
+        if i == 0:
+            return None
+        above = [pos for pos in self.lift_positions[:i] if not pos == 'panbraking']
+        return self.lift_to(above[-1])
+
+
+class SimulatedConnection(object):
+
+    class _Port(object):
+        """Stands in for the serial port of a connection"""
+        def flush(self):
+            pass
+
+    def __init__(self, clock, timeout=10.):
+        """Base class of a simulated serial connection, with the write, read and query methods of an msl.equipment
+        connection. Replies become available to read at a time in the virtual future, as set by the subclass.
+
+        Parameters
+        ----------
+        clock : :class:`VirtualClock`
+        timeout : float, optional
+            time in seconds of virtual time before a read raises MSLTimeoutError
+        """
+        self.clock = clock
+        self.timeout = timeout
+        self.rstrip = True
+        self.serial = self._Port()
+        self._replies = deque()
+
+    def handle(self, command):
+        """Returns a list of (time, reply) for the command"""
+        raise NotImplementedError
+
+    def write(self, msg):
+        for reply in self.handle(msg.strip()):
+            self._replies.append(reply)
+
+    def read(self):
+        if not self._replies:
+            self.clock.sleep(self.timeout)
+            raise MSLTimeoutError('No reply from the simulated connection')
+        t, reply = self._replies[0]
+        wait = t - self.clock()
+        if wait > self.timeout:
+            self.clock.sleep(self.timeout)
+            raise MSLTimeoutError('No reply from the simulated connection')
+        self.clock.sleep(wait)
+        self._replies.popleft()
+        return reply
+
+    def query(self, msg):
+        self.write(msg)
+        return self.read()
+
+    def disconnect(self):
+        self._replies.clear()
+
+
+class MettlerSimulator(SimulatedConnection):
+
+    def __init__(self, clock, serial, handler=None, carousel_id=None, unit='g', resolution=0.00001,
+                 drift=0., noise=0., settle_time=5., cal_time=60., seed=None, timeout=10., stream_interval=0.1):
+        """A simulated Mettler Toledo balance which uses MT-SICS, with an optional carousel weight handler
+        on the same connection.
+
+        The balance reading is the mass on the pan less the zero and tare values, plus a linear drift with time,
+        normally distributed noise, and a transient which decays over the settle time after each change of load.
+        Readings are dynamic (not stable) until the settle time has elapsed.
+
+        Parameters
+        ----------
+        clock : :class:`VirtualClock`
+        serial : str
+            serial number returned by I4
+        handler : :class:`WeightHandler`, optional
+            the weight handler which loads the balance
+        carousel_id : str, optional
+            the handler model and serial number returned by IDENTIFY, if the handler is a carousel
+        unit : str, optional
+        resolution : float, optional
+            in unit
+        drift : float, optional
+            linear drift in unit per second
+        noise : float, optional
+            standard deviation of the noise in unit
+        settle_time : float, optional
+            time in seconds for the reading to stabilise after a change of load
+        cal_time : float, optional
+            duration in seconds of an internal adjustment (C1 or C3)
+        seed : int, optional
+            seed for the random noise
+        timeout : float, optional
+        stream_interval : float, optional
+            time in seconds between weight values in continuous output (SIR or SR)
+        """
+        super().__init__(clock, timeout=timeout)
+        self.serial_number = str(serial)
+        self.handler = handler if handler is not None else WeightHandler(clock)
+        self.carousel_id = carousel_id
+        self.unit = unit
+        self.resolution = resolution
+        self.dp = max(0, int(-np.floor(np.log10(resolution))))
+        self.drift = drift
+        self.noise = noise
+        self.settle_time = settle_time
+        self.cal_time = cal_time
+        self.rng = np.random.default_rng(seed)
+
+        self.zero = 0.
+        self.tare = 0.
+
+        self.stream_interval = stream_interval
+        self._stream = None
+        self._stream_at = None
+        self._last_sent = None
+
+    def raw_reading(self, t):
+        """Balance reading in unit at virtual time t, before rounding"""
+        since_load = t - self.handler.loaded_at
+        transient = 0.
+        if since_load < self.settle_time:
+            transient = 50 * self.resolution * np.exp(-5 * since_load / self.settle_time)
+        return self.handler.load + self.drift * t + self.noise * self.rng.standard_normal() + transient
+
+    def is_stable(self, t):
+        return t - self.handler.loaded_at >= self.settle_time
+
+    def weight_value(self, t):
+        value = round(self.raw_reading(t) - self.zero - self.tare, self.dp)
+        return f"{value:>12.{self.dp}f} {self.unit}"
+
+    def read(self):
+        # while streaming, the next weight value is sent unless another reply is due first
+        while self._stream is not None and (not self._replies or self._replies[0][0] > self._stream_at):
+            t = max(self._stream_at, self.clock() - self.stream_interval)  # a reader which falls behind misses values
+            self._stream_at = t + self.stream_interval
+            self.clock.sleep(t - self.clock())
+            line = ('S S ' if self.is_stable(t) else 'S D ') + self.weight_value(t)
+            if self._stream == 'SR' and line == self._last_sent:
+                continue
+            self._last_sent = line
+            return line
+        return super().read()
+
+    def handle(self, command):
+        t = max(self.clock(), self.handler.busy_until)
+        cmd = command.upper()
+
+        # balance commands
+        if cmd in ('SIR', 'SR'):
+            self._stream_at = t
+            self._last_sent = None
+            self._stream = cmd
+            return []
+        if cmd == '@':
+            self._stream = None
+        if cmd in ('@', 'I4'):
+            return [(t, f'I4 A "{self.serial_number}"')]
+        if cmd == 'Z':
+            t = max(t, self.handler.loaded_at + self.settle_time)
+            self.zero = self.raw_reading(t) - self.tare
+            return [(t, 'Z A')]
+        if cmd == 'T':
+            t = max(t, self.handler.loaded_at + self.settle_time)
+            self.tare = self.raw_reading(t) - self.zero
+            return [(t, f'T S {self.tare:>12.{self.dp}f} {self.unit}')]
+        if cmd == 'S':
+            t = max(t, self.handler.loaded_at + self.settle_time)
+            return [(t, 'S S ' + self.weight_value(t))]
+        if cmd == 'SI':
+            return [(t, ('S S ' if self.is_stable(t) else 'S D ') + self.weight_value(t))]
+        if cmd in ('C1', 'C3'):
+            self.zero = self.tare = 0.
+            return [(t, cmd + ' B'), (t + self.cal_time, cmd + ' A')]
+
+        # carousel handler commands
+        if self.carousel_id is not None:
+            return self.handle_carousel(cmd, t)
+
+        return [(t, 'ES')]
+
+    def handle_carousel(self, cmd, t):
+        h = self.handler
+        if cmd == 'IDENTIFY':
+            return [(t, self.carousel_id + ', software V 1.00. ready')]
+        if cmd == 'STATUS':
+            return [(t, f'{h.hori_pos} in {h.lift_pos} position. ready')]
+        if cmd.startswith('MOVE'):
+            try:
+                pos = int(cmd[4:].replace(' ', ''))
+            except ValueError:
+                return [(t, 'ES')]
+            if not 0 < pos <= h.num_pos:
+                return [(t, 'Selected position invalid')]
+            return [(h.move(pos), 'ready')]
+        if cmd == 'SINK':
+            done = h.sink()
+            if done is None:
+                return [(t, f'ERROR: In {h.lift_pos} position already. ready')]
+            return [(done, 'ready')]
+        if cmd == 'LIFT':
+            done = h.lift()
+            if done is None:
+                return [(t, 'ERROR: In top position already. ready')]
+            return [(done, 'ready')]
+
+        return [(t, 'ES')]
+
+
+class AT106Simulator(MettlerSimulator):
+    """A simulated AT106 balance, which uses the older Mettler command set and replies to settings without
+    an acknowledgement. See :class:`MettlerSimulator` for the parameters."""
+
+    def handle(self, command):
+        t = max(self.clock(), self.handler.busy_until)
+        cmd = command.upper()
+        if cmd == 'IDX':
+            return [(t, self.serial_number)]
+        if cmd == 'SI':
+            return [(t, ('S  ' if self.is_stable(t) else 'SD ') + self.weight_value(t))]
+        if cmd == 'S':
+            t = max(t, self.handler.loaded_at + self.settle_time)
+            return [(t, 'S  ' + self.weight_value(t))]
+        if cmd == 'T':
+            t = max(t, self.handler.loaded_at + self.settle_time)
+            self.tare = self.raw_reading(t) - self.zero
+            return [(t, 'S  ' + self.weight_value(t))]
+        if cmd == 'CA':
+            self.zero = self.tare = 0.
+            return [(t, 'CA BEGIN'), (t + self.cal_time, 'CA END')]
+        if cmd == 'RG ?':
+            return [(t, 'RG F')]
+        if cmd.split()[0] in ('AD', 'CA', 'MZ', 'MI', 'ML', 'MS', 'RG', '%CMR', '%CMS'):
+            return []
+        return [(t, 'ES')]
+
+
+class ArduinoSimulator(SimulatedConnection):
+
+    def __init__(self, clock, serial, handler, timeout=10.):
+        """A simulated Arduino controller of a linear weight handler, with lift positions
+        U (top, unloaded), L (loading) and W (weighing).
+
+        Parameters
+        ----------
+        clock : :class:`VirtualClock`
+        serial : str
+            the board identity returned by ArduinoID
+        handler : :class:`WeightHandler`
+            the weight handler, shared with the simulated balance
+        timeout : float, optional
+        """
+        super().__init__(clock, timeout=timeout)
+        self.serial_number = str(serial)
+        self.handler = handler
+
+    @property
+    def status(self):
+        letter = {'top': 'U', 'loading': 'L', 'weighing': 'W'}[self.handler.lift_pos]
+        return f'IDLE {self.handler.hori_pos}{letter}'
+
+    def handle(self, command):
+        t = max(self.clock(), self.handler.busy_until)
+        cmd = command.upper()
+        if cmd == 'START':
+            return [(t, 'Linear weight changer started')]
+        if cmd == 'ARDUINOID':
+            return [(t, self.serial_number)]
+        if cmd == 'STATUS':
+            return [(t, self.status)]
+        if cmd == 'END':
+            return [(t, 'END')]
+        if cmd.startswith('MOVE TO '):
+            target = cmd[8:].strip()
+            lift_pos = {'U': 'top', 'L': 'loading', 'W': 'weighing'}.get(target[-1:])
+            try:
+                pos = int(target[:-1])
+            except ValueError:
+                pos = None
+            if lift_pos is None or pos is None or not 0 <= pos <= self.handler.num_pos:
+                return [(t, 'BAD COMMAND ' + target)]
+            if pos == self.handler.hori_pos:
+                done = self.handler.lift_to(lift_pos)
+            else:
+                done = self.handler.move(pos, lift_pos=lift_pos, carousel=False)
+            return [(done, self.status)]
+
+        return [(t, 'BAD COMMAND ' + command)]
+
+
+class SimulatedRecord(object):
+
+    class _ConnectionRecord(object):
+        def __init__(self, properties):
+            self.properties = properties
+
+    def __init__(self, connection, alias='Simulated', manufacturer='Mettler Toledo', model='', serial='',
+                 user_defined=None, properties=None):
+        """Stands in for the msl.equipment EquipmentRecord of a balance or handler, so that a balance class
+        may be initialised with a simulated connection
+
+        Parameters
+        ----------
+        connection : :class:`SimulatedConnection`
+            returned by connect()
+        """
+        self._connection = connection
+        self.clock = connection.clock
+        self.alias = alias
+        self.manufacturer = manufacturer
+        self.model = model
+        self.serial = serial
+        self.user_defined = user_defined if user_defined is not None else {}
+        self.connection = self._ConnectionRecord(properties if properties is not None else {})
+
+    def connect(self):
+        return self._connection
+
+    def __repr__(self):
+        return f'SimulatedRecord<{self.manufacturer}|{self.model}|{self.serial}>'
+
+
+def simulate_record(record, handler_record=None, masses=None, speedup=100., drift=0., noise=0., settle_time=5.,
+                    move_time=5., lift_time=3., cal_time=60., seed=None):
+    """Makes simulated records for a balance and its weight handler, with the same identity and user-defined
+    settings as the records in the config.xml file
+
+    Parameters
+    ----------
+    record : equipment record object
+        for the balance, from Configuration.equipment
+    handler_record : equipment record object, optional
+        for the Arduino of a linear weight handler
+    masses : dict, optional
+        mass in the balance unit of the weight group in each loading position, keyed by position.
+        Positions with no mass specified are empty.
+    speedup : float, optional
+        ratio of virtual time to real time
+    drift, noise, settle_time, cal_time, seed : optional
+        see :class:`MettlerSimulator`
+    move_time, lift_time : float, optional
+        see :class:`WeightHandler`
+
+    Returns
+    -------
+    tuple of the :class:`SimulatedRecord` for the balance and for the handler (or None)
+    """
+    clock = VirtualClock(speedup)
+    mode = record.user_defined.get('weighing_mode', 'mw')
+    num_pos = int(record.user_defined.get('pos') or 1)
+    resolution = record.user_defined.get('resolution', '0.00001 g').split()
+
+    if mode == 'aw_c' and record.model == 'AX10005':
+        lift_positions = ('top', 'panbraking', 'weighing', 'calibration')
+    elif mode in ('aw_l', 'aw_106'):
+        lift_positions = ('top', 'loading', 'weighing')
+    else:
+        lift_positions = ('top', 'weighing')
+    handler = WeightHandler(clock, masses=masses, num_pos=num_pos, lift_positions=lift_positions,
+                            move_time=move_time, lift_time=lift_time)
+    if mode not in ('aw_c', 'aw_l', 'aw_106'):  # a manually loaded balance is loaded with the first mass
+        handler.lift_pos = 'weighing'
+
+    simulator = AT106Simulator if mode == 'aw_106' else MettlerSimulator
+    connection = simulator(
+        clock, record.serial, handler=handler,
+        carousel_id=HANDLER_IDS.get(record.model) if mode == 'aw_c' else None,
+        unit=record.user_defined.get('unit') or 'g', resolution=float(resolution[0]),
+        drift=drift, noise=noise, settle_time=settle_time, cal_time=cal_time, seed=seed,
+    )
+    bal_record = SimulatedRecord(
+        connection, alias=record.alias, manufacturer=record.manufacturer, model=record.model,
+        serial=record.serial, user_defined=dict(record.user_defined),
+        properties=dict(record.connection.properties) if record.connection is not None else {},
+    )
+
+    handler_sim = None
+    if handler_record is not None:
+        handler_sim = SimulatedRecord(
+            ArduinoSimulator(clock, handler_record.serial, handler), alias=handler_record.alias,
+            manufacturer=handler_record.manufacturer, model=handler_record.model, serial=handler_record.serial,
+        )
+
+    log.info(f'Simulating {record.alias} at {speedup} times real time')
+
+    return bal_record, handler_sim
@@ -0,0 +1,112 @@
+"""
+Statistical detection of a stable balance reading from a series of instantaneous readings.
+"""
+from collections import deque
+
+import numpy as np
+
+
+class SettleDetector(object):
+
+    def __init__(self, resolution, window=5, max_stdev=2., max_slope=1., timeout=60., interval=0.5):
+        """Declares a series of readings stable once the standard deviation and the slope of the last window readings
+        are within limits set in multiples of the balance resolution
+
+        Parameters
+        ----------
+        resolution : float
+            balance resolution, in the balance unit
+        window : int, optional
+            number of readings in the rolling window
+        max_stdev : float, optional
+            limit on the standard deviation of the readings in the window, as a multiple of the resolution
+        max_slope : float, optional
+            limit on the magnitude of the slope of the readings in the window, in resolution per second
+        timeout : float, optional
+            time in seconds after which the readings are taken as they are
+        interval : float, optional
+            time in seconds between readings
+        """
+        self.resolution = resolution
+        self.window = int(window)
+        self.max_stdev = float(max_stdev)
+        self.max_slope = float(max_slope)
+        self.timeout = float(timeout)
+        self.interval = float(interval)
+
+        self._t0 = None
+        self._times = deque(maxlen=self.window)
+        self._readings = deque(maxlen=self.window)
+        self.settle_time = None
+
+    @classmethod
+    def from_properties(cls, properties, resolution):
+        """Creates a detector from the connection properties of a balance, if the properties include
+        settle_detector set to True. Any of settle_window, settle_stdev, settle_slope, settle_timeout and
+        settle_interval may also be specified.
+
+        Returns
+        -------
+        :class:`SettleDetector` or None
+        """
+        if str(properties.get('settle_detector', False)).lower() not in ['true', '1', 'yes']:
+            return None
+        kwargs = {}
+        for key in ['window', 'stdev', 'slope', 'timeout', 'interval']:
+            value = properties.get('settle_' + key)
+            if value is not None:
+                kwargs['max_' + key if key in ['stdev', 'slope'] else key] = float(value)
+        return cls(resolution, **kwargs)
+
+    def reset(self, t0):
+        """Starts a new series of readings at time t0"""
+        self._t0 = t0
+        self._times.clear()
+        self._readings.clear()
+        self.settle_time = None
+
+    @property
+    def readings(self):
+        """The readings in the current window"""
+        return list(self._readings)
+
+    @property
+    def mean(self):
+        return float(np.mean(self._readings)) if self._readings else None
+
+    @property
+    def stdev(self):
+        if len(self._readings) < 2:
+            return None
+        return float(np.std(self._readings, ddof=1))
+
+    @property
+    def slope(self):
+        """Least squares slope of the readings in the window, in balance unit per second"""
+        if len(self._readings) < 2:
+            return None
+        t = np.asarray(self._times) - self._times[0]
+        if not np.ptp(t):
+            return None
+        return float(np.polyfit(t, self._readings, 1)[0])
+
+    def timed_out(self, t):
+        return t - self._t0 > self.timeout
+
+    def add(self, t, reading):
+        """Adds a reading taken at time t
+
+        Returns
+        -------
+        bool
+            True if the readings in the window are stable
+        """
+        self._times.append(t)
+        self._readings.append(reading)
+        if len(self._readings) < self.window:
+            return False
+        if self.stdev <= self.max_stdev * self.resolution and abs(self.slope) <= self.max_slope * self.resolution:
+            if self.settle_time is None:
+                self.settle_time = t - self._t0
+            return True
+        return False
@@ -0,0 +1,179 @@
+"""
+Continuous output of weight values from a Mettler Toledo balance (MT-SICS commands SIR and SR),
+read by a thread into a ring buffer of timestamped readings.
+"""
+import queue
+import threading
+from collections import deque
+
+from msl.equipment import MSLTimeoutError
+
+from ..log import log
+
+
+class ReadingStream(object):
+
+    def __init__(self, connection, clock, maxlen=10000):
+        """Reads the continuous output of a balance in a thread. Weight values (replies of the form S S value unit
+        or S D value unit) are kept in a ring buffer with the time they were read. Any other reply, e.g. from
+        a weight handler on the same connection, is queued to be read as usual, so that while the balance is
+        streaming the ReadingStream stands in for the connection.
+
+        Parameters
+        ----------
+        connection : msl.equipment connection
+        clock : callable
+            returns the time in seconds, e.g. the clock of the balance
+        maxlen : int, optional
+            number of readings kept in the buffer
+        """
+        self.connection = connection
+        self.clock = clock
+        self.buffer = deque(maxlen=int(maxlen))
+        self.command = None
+
+        self._replies = queue.Queue()
+        self._new_reading = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def serial(self):
+        return self.connection.serial
+
+    @property
+    def rstrip(self):
+        return self.connection.rstrip
+
+    @rstrip.setter
+    def rstrip(self, value):
+        self.connection.rstrip = value
+
+    @property
+    def timeout(self):
+        """Timeout in seconds for a read from the connection"""
+        return getattr(self.connection, 'timeout', None) or 10
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, command='SIR'):
+        """Starts continuous output: SIR sends every weight value, SR sends a weight value after each change"""
+        self.command = command
+        self._stop.clear()
+        self.buffer.clear()
+        self.connection.write(command)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        log.info(f'Continuous output ({command}) started')
+
+    def stop(self):
+        """Cancels continuous output and stops the reader thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self.connection.write('@')  # the reset command cancels the repeat commands
+        self._thread.join()
+        self._thread = None
+        with self._new_reading:
+            self._new_reading.notify_all()
+        log.info(f'Continuous output ({self.command}) stopped')
+
+    def _run(self):
+        while True:
+            try:
+                line = self.connection.read()
+            except MSLTimeoutError:
+                if self._stop.is_set():
+                    break
+                continue
+            t = self.clock()
+            tokens = line.split()
+            if len(tokens) == 4 and tokens[0] == 'S':
+                with self._new_reading:
+                    self.buffer.append((t, line))
+                    self._new_reading.notify_all()
+            elif self._stop.is_set() and tokens[:1] == ['I4']:
+                break  # the reply to the reset command
+            else:
+                self._replies.put(line)
+
+    def next_reading(self, after=None, stable=False, timeout=None):
+        """Waits for a reading from the buffer
+
+        Parameters
+        ----------
+        after : float, optional
+            the reading must have been read after this time; if None, after the time of the call
+        stable : bool, optional
+            if True, only stable readings (S S value unit) are returned
+        timeout : float, optional
+            time in seconds (of real time) to wait for a reading, by default the connection timeout
+
+        Returns
+        -------
+        tuple of (time, reply) or None if no reading arrived in time
+        """
+        if after is None:
+            after = self.clock()
+        if timeout is None:
+            timeout = self.timeout
+
+        def find():
+            # the earliest matching reading after the given time
+            found = None
+            for t, line in reversed(self.buffer):
+                if t <= after:
+                    break
+                if not stable or line.split()[1] == 'S':
+                    found = (t, line)
+            return found
+
+        with self._new_reading:
+            self._new_reading.wait_for(lambda: find() is not None or not self.is_running, timeout=timeout)
+            return find()
+
+    def latest(self, stable=False, timeout=None):
+        """The current reading of the balance: the last reading in the buffer, or the next one if there is none yet.
+        As SR only sends a weight value after a change, the last reading stands for the current weight.
+
+        Parameters
+        ----------
+        stable : bool, optional
+            if True and the last reading is not stable, waits for the next stable reading
+        timeout : float, optional
+            as for next_reading
+
+        Returns
+        -------
+        tuple of (time, reply) or None if no reading arrived in time
+        """
+        with self._new_reading:
+            last = self.buffer[-1] if self.buffer else None
+        if last is not None and (not stable or last[1].split()[1] == 'S'):
+            return last
+        return self.next_reading(after=last[0] if last else float('-inf'), stable=stable, timeout=timeout)
+
+    def readings(self, since):
+        """All buffered readings read after the time since, as a list of (time, reply)"""
+        return [(t, line) for t, line in list(self.buffer) if t > since]
+
+    # methods of a connection, for other replies while streaming
+
+    def write(self, msg):
+        return self.connection.write(msg)
+
+    def read(self):
+        try:
+            return self._replies.get(timeout=self.timeout)
+        except queue.Empty:
+            raise MSLTimeoutError('No reply received while streaming')
+
+    def query(self, msg):
+        self.write(msg)
+        return self.read()
+
+    def disconnect(self):
+        self.stop()
+        self.connection.disconnect()
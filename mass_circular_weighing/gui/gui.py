@@ -62,6 +62,7 @@ class MCWGui(QtWidgets.QWidget):
         check_ses = Button(text='Check scheme entries', left_click=self.check_scheme, )
         save_ses = Button(text='Save scheme entries', left_click=self.save_scheme, )
         run_row = Button(text='Do weighing(s) for selected scheme entry', left_click=self.collect_n_good_runs, )
+        run_all = Button(text='Queue all scheme entries on automatic balances', left_click=self.run_weighing_queue, )
         reanalyse_row = Button(text='Reanalyse weighing(s) for selected scheme entry', left_click=self.reanalyse_weighings, )
         update_status = Button(text='Update status', left_click=self.check_good_run_status, )
         collate_data = Button(text='Display collated results', left_click=self.display_collated)
@@ -74,6 +75,7 @@ class MCWGui(QtWidgets.QWidget):
         button_group.addWidget(reanalyse_row, 1, 1)
         button_group.addWidget(update_status, 0, 2)
         button_group.addWidget(collate_data, 1, 2)
+        button_group.addWidget(run_all, 2, 1)
         buttons.setLayout(button_group)
 
         central_panel_group = QtWidgets.QGroupBox('Weighing Scheme Details')
@@ -154,6 +156,19 @@ class MCWGui(QtWidgets.QWidget):
                 close_fds=True,
             )
 
+    def run_weighing_queue(self, ):
+        self.save_scheme()
+
+        # run the weighing queue for the whole scheme as a separate process, with its own console window
+        try:
+            Popen(
+                ['mcw-queue', self.housekeeping.cfg.path, '--concurrent'],
+                close_fds=True,
+                creationflags=0x00000010  # creates new console for the process
+            )
+        except FileNotFoundError:
+            log.error('The weighing queue requires the mass_circular_weighing package to be installed')
+
     def reanalyse_weighings(self, ):
         row = self.schemetable.currentRow()
         if row < 0:
@@ -181,11 +196,17 @@ class MCWGui(QtWidgets.QWidget):
         self.mass_thread.show(data, self.housekeeping.cfg)
 
 
-def show_gui():
+def show_gui(splash=None, on_shown=None):
+    """Shows the main window, and closes the splash screen (if there is one) once the window is shown.
+    If given, on_shown is called with no arguments once the window is shown (e.g. to report the startup time)"""
     gui = application()
 
     mcw = MCWGui()
     mcw.show()
+    if splash is not None:
+        splash.finish(mcw)
+    if on_shown is not None:
+        on_shown()
 
     gui.exec()
 
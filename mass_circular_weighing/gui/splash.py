@@ -0,0 +1,66 @@
+"""
+A splash screen to show while the program starts up, e.g. while the modules of the main window are imported or
+while a Configuration is loaded in a background thread
+"""
+import threading
+
+from msl.qt import Qt, QtGui, QtWidgets, application
+
+from .. import __version__
+
+
+class Splash(object):
+
+    def __init__(self, message='Loading...'):
+        """A splash screen, which is shown straight away
+
+        Parameters
+        ----------
+        message : str
+            the message to show on the splash screen
+        """
+        self.app = application()
+        pixmap = QtGui.QPixmap(480, 140)
+        pixmap.fill(QtGui.QColor('white'))
+        self.screen = QtWidgets.QSplashScreen(pixmap)
+        self.screen.show()
+        self.message(message)
+
+    def message(self, message):
+        """Updates the message on the splash screen"""
+        self.screen.showMessage(
+            f'Mass Calibration Program (version {__version__})\n\n{message}',
+            Qt.AlignHCenter | Qt.AlignVCenter,
+        )
+        self.app.processEvents()
+
+    def run_in_background(self, func, *args, **kwargs):
+        """Calls func in a background thread, keeping the splash screen responsive until func returns
+
+        Returns
+        -------
+        The value returned by func. An error raised by func is raised again here.
+        """
+        result = {}
+
+        def target():
+            try:
+                result['value'] = func(*args, **kwargs)
+            except BaseException as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        while thread.is_alive():
+            self.app.processEvents()
+            thread.join(0.02)
+        if 'error' in result:
+            raise result['error']
+        return result['value']
+
+    def finish(self, widget=None):
+        """Closes the splash screen, once widget (the first window) is shown"""
+        if widget is None:
+            self.screen.close()
+        else:
+            self.screen.finish(widget)
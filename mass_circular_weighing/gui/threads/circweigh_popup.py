@@ -7,12 +7,13 @@ import sys
 import numpy as np
 import winsound
 
-from msl.qt import QtGui, QtWidgets, Button, Signal, Logger
+from msl.qt import QtGui, QtWidgets, Button, Signal, Logger, application
 from msl.qt.threading import Thread, Worker
 
 from ...log import log
 from ...constants import MAX_BAD_RUNS, FONTSIZE
 from ...routines.run_circ_weigh import do_circ_weighing, analyse_weighing, check_for_existing_weighdata, check_existing_runs
+from ...equip import connections, BalanceInUseError
 from ..widgets import label
 
 from .prompt_thread import PromptThread
@@ -225,7 +226,12 @@ class WeighingThread(Thread):
     def show(self, se_row_data, cfg):
         self.se_row_data = se_row_data
         self.cfg = cfg
-        self.bal, self.mode = self.cfg.get_bal_instance(self.se_row_data['bal_alias'])
+        try:
+            self.bal, self.mode = connections.get_bal_instance(self.cfg, self.se_row_data['bal_alias'])
+        except BalanceInUseError as e:
+            log.error(e)
+            return
+        self.bal.idle = application().processEvents  # keeps the window responsive while the handler moves
 
         self.scheme_entry.setText(self.se_row_data['scheme_entry'])
         self.nominal_mass.setText(se_row_data['nominal'])
@@ -298,8 +304,7 @@ class WeighingThread(Thread):
             self.start_weighing()
 
     def close_comms(self, *args):
-        self.bal._want_abort = True
-        self.bal.close_connection()
+        connections.release(self.bal)  # the connection stays open for the next scheme entry
         self.weighing_done.emit(self.se_row_data['row'])
 
     def check_for_existing(self):
@@ -10,7 +10,6 @@ from msl.qt.threading import Thread, Worker
 from ...constants import SIGMA_STR, MU_STR, NBC
 from ...utils import greg_format
 from ...routine_classes.final_mass_calc_class import FinalMassCalc, filter_mass_set
-from ...routines.report_results import export_results_summary
 from .prompt_thread import PromptThread
 
 
@@ -108,13 +107,14 @@ class DiffsTable(QtWidgets.QTableWidget):
 
     @Slot(object, object, name='update_resids')
     def update_resids(self, fmc_result):
-        resids = fmc_result['2: Matrix Least Squares Analysis']["Input data with least squares residuals"]
+        inputdatares = fmc_result['2: Matrix Least Squares Analysis']["Input data with least squares residuals"]
+        resids = inputdatares['residual (' + MU_STR + 'g)']
         num_stds = fmc_result["1: Mass Sets"]["Standard"].metadata.get("Number of masses")
         i = 0
-        while i < len(resids[:, 4]) - num_stds:     # this check is redundant but ok for now
+        while i < len(resids) - num_stds:     # this check is redundant but ok for now
             for row in range(self.rowCount()):
                 if self.cellWidget(row, self.columnCount() - 1).isChecked():
-                    self.cellWidget(row, 9).setText(str("{:+.3f}".format(resids[i, 4])))
+                    self.cellWidget(row, 9).setText(str("{:+.3f}".format(resids[i])))
                     self.cellWidget(row, 9).setAlignment(Qt.AlignRight | Qt.AlignVCenter)
                     i += 1
                 else:
@@ -150,7 +150,9 @@ class MassValuesTable(QtWidgets.QTableWidget):
         self.make_rows(lend)
         for i in range(lend):
             for j, item in enumerate(data[i]):
-                if j == 3:
+                if isinstance(item, float) and np.isnan(item):  # e.g. no reference value for a client weight
+                    self.cellWidget(i, j).setText("")
+                elif j == 3:
                     self.cellWidget(i, j).setText(greg_format(item))
                 elif j == 7:
                     self.cellWidget(i, j).setText(greg_format(item))
@@ -279,6 +281,7 @@ class MassCalcThread(Thread):
         else:
             check_set = None
 
+        from ...routines.report_results import export_results_summary  # needs openpyxl, so imported when needed
         export_results_summary(
             self.cfg,
             check_set,
@@ -7,7 +7,7 @@ from msl.qt import Qt, QtWidgets, Button
 
 class AllocatorDialog(QtWidgets.QDialog):
 
-    def __init__(self, num_pos, wtgrps, parent=None):
+    def __init__(self, num_pos, wtgrps, suggestion=None, cycle_time=None, parent=None):
         """This Dialog widget allows the assignment of weight groups to weighing positions
         for an automatic weight loading balance.
 
@@ -17,6 +17,10 @@ class AllocatorDialog(QtWidgets.QDialog):
             number of weighing positions available on the balance
         wtgrps : list
             list of weight groups as strings
+        suggestion : list, optional
+            suggested position for each weight group, e.g. from the move planner of the balance
+        cycle_time : float, optional
+            time in seconds spent moving in each cycle for the suggested positions
         parent
             application instance or parent widget from which the Dialog is opened
         """
@@ -39,8 +43,15 @@ class AllocatorDialog(QtWidgets.QDialog):
         self.pos_list.setMaximumWidth(int(1.5*self.pos_list.sizeHintForColumn(0)))
         self.pos_list.setMinimumWidth(self.pos_list.sizeHintForColumn(0))
 
+        loading = self.wtgrps + ['empty'] * (num_pos - len(self.wtgrps))
+        if suggestion is not None:
+            first = 0 if num_pos > 9 else 1
+            loading = ['empty'] * num_pos
+            for wtgrp, pos in zip(self.wtgrps, suggestion):
+                loading[pos - first] = wtgrp
+
         self.wtgrp_list = QtWidgets.QListWidget()
-        for wtgrp in self.wtgrps + ['empty'] * (num_pos - len(self.wtgrps)):
+        for wtgrp in loading:
                 item = QtWidgets.QListWidgetItem(wtgrp)
                 item.setCheckState(Qt.Unchecked)
                 self.wtgrp_list.addItem(item)
@@ -76,6 +87,9 @@ class AllocatorDialog(QtWidgets.QDialog):
         init_params.setLayout(frm)
 
         vbox = QtWidgets.QVBoxLayout()
+        if suggestion is not None:
+            vbox.addWidget(QtWidgets.QLabel(
+                f"Suggested positions minimise handler travel ({cycle_time:.0f} s of moves per cycle)"))
         vbox.addWidget(lists)
         vbox.addWidget(shuffle)
         vbox.addWidget(init_params)
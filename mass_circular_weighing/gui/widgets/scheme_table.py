@@ -1,8 +1,6 @@
 """
 A tabular display of the weighing scheme, which can import (by drag-n-drop) and export (to xlsx) Excel files.
 """
-import xlrd
-import openpyxl
 import os
 import string
 
@@ -153,12 +151,12 @@ class SchemeTable(QtWidgets.QTableWidget):
                 for wtgrp in scheme_entry.split():
                     for mass in wtgrp.split('+'):
                         masses.append(mass)
-                        if mass in cfg.client_wt_IDs:
+                        if cfg.all_client_wts.includes(mass):
                             log.debug(mass + ' in client set')
-                        elif mass in cfg.all_stds['Weight ID']:
+                        elif cfg.all_stds.includes(mass):
                             log.debug(mass + ' in std set')
                         elif cfg.all_checks is not None \
-                                and mass in cfg.all_checks['Weight ID']:
+                                and cfg.all_checks.includes(mass):
                             log.debug(mass + ' in check set')
                         else:
                             log.error(mass + ' is not in any of the specified mass sets')
@@ -177,6 +175,7 @@ class SchemeTable(QtWidgets.QTableWidget):
 
         path = os.path.join(folder, filename)
 
+        import openpyxl  # imported when first needed, so as not to slow down startup
         if os.path.isfile(path):
             workbook = openpyxl.load_workbook(path)
             try:
@@ -226,6 +225,7 @@ class SchemeTable(QtWidgets.QTableWidget):
 
 def read_excel_scheme(path):
     """Read an Excel file containing a weighing scheme."""
+    import xlrd  # imported when first needed, so as not to slow down startup
     _book = xlrd.open_workbook(path, on_demand=True)
 
     names = _book.sheet_names()
@@ -250,6 +250,7 @@ def read_excel_scheme(path):
 
 def _cell_convert(cell):
     """Convert an Excel cell to the appropriate value and data type"""
+    import xlrd
     t = cell.ctype
     if t == xlrd.XL_CELL_NUMBER or t == xlrd.XL_CELL_BOOLEAN:
         if int(cell.value) == cell.value:
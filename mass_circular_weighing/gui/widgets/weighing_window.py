@@ -7,7 +7,7 @@ import os
 import winsound
 import numpy as np
 
-from msl.qt import QtWidgets, QtGui, Signal, Button, Logger
+from msl.qt import QtWidgets, QtGui, Signal, Button, Logger, application
 
 from ... import __version__
 from ...log import log
@@ -18,8 +18,9 @@ from ...gui.widgets.wait_until_time import WaitUntilTimeDisplay
 
 from ...routines import check_for_existing_weighdata, check_existing_runs, check_bal_initialised
 from ...routines import do_circ_weighing, analyse_weighing
+from ...routines.json_circweigh_utils import data_file_lock
 from ...routine_classes import CircWeigh
-from ...equip import check_ambient_pre
+from ...equip import check_ambient_pre, connections, BalanceInUseError
 
 
 check_box_style = '''
@@ -57,6 +58,8 @@ class WeighingWindow(QtWidgets.QWidget):
         self.cycle = label('0')
         self.position = label('0')
         self.reading = label('0')
+        self.live_fit = label('')
+        self.live_weighing = None  # CircWeigh object fitted to readings as they are collected
         self.num_runs = 0
 
         self.hori_pos_options = QtWidgets.QSpinBox()
@@ -80,8 +83,9 @@ class WeighingWindow(QtWidgets.QWidget):
         status_layout.addRow(label('Cycle'), self.cycle)
         status_layout.addRow(label('Position'), self.position)
         status_layout.addRow(label('Reading'), self.reading)
-        status_layout.setWidget(6, 2, want_stop)
-        status_layout.setWidget(7, 2, self.logger)
+        status_layout.addRow(label('Current fit'), self.live_fit)
+        status_layout.setWidget(7, 2, want_stop)
+        status_layout.setWidget(8, 2, self.logger)
         status.setLayout(status_layout)
 
         return status
@@ -164,7 +168,8 @@ class WeighingWindow(QtWidgets.QWidget):
     def make_labels(self, se_row_data, cfg):
         self.se_row_data = se_row_data
         self.cfg = cfg
-        self.bal, self.mode = self.cfg.get_bal_instance(self.se_row_data['bal_alias'])
+        self.bal, self.mode = connections.get_bal_instance(self.cfg, self.se_row_data['bal_alias'])
+        self.bal.idle = application().processEvents  # keeps the window responsive while the handler moves
 
         self.scheme_entry.setText(self.se_row_data['scheme_entry'])
         self.nominal_mass.setText(se_row_data['nominal'])
@@ -181,7 +186,11 @@ class WeighingWindow(QtWidgets.QWidget):
                 self.lift_positions.addItems(['top', 'panbraking', 'weighing', 'calibration'])
 
     def show(self, se_row_data, cfg):
-        self.make_labels(se_row_data, cfg)
+        try:
+            self.make_labels(se_row_data, cfg)
+        except BalanceInUseError as e:
+            log.error(e)
+            return
 
         self.check_for_existing()
         if not self.bal.want_abort:
@@ -201,10 +210,8 @@ class WeighingWindow(QtWidgets.QWidget):
             super().show()
 
     def reset_balance_comms(self):
-        self.bal.connection.disconnect()
         log.info("Reconnecting to balance...")
-        self.bal.wait_for_elapse(2)
-        self.bal.connect_bal()  # could add reset True here if desired
+        self.bal.reconnect()
         log.info("Connected to balance")
         self.bal._want_abort = False
 
@@ -277,8 +284,16 @@ class WeighingWindow(QtWidgets.QWidget):
             if self.nominal_mass.text() == "10":
                 log.warning("Cannot perform internal self-calibration at 10 g! Please ensure a 20 g mass is used.")
         self.change_to_weighing_layout()
-        self.check_for_existing()
-        self.process()
+        # the weighing queue may be weighing scheme entries from the same data file in another process
+        lock = data_file_lock(self.data_file())
+        if not lock.acquire(blocking=False):
+            log.error(f'{self.data_file()} is in use by another weighing, e.g. in the weighing queue')
+            return
+        try:
+            self.check_for_existing()
+            self.process()
+        finally:
+            lock.release()
 
     def start_weighing_at(self):
         if 'aw' in self.bal.mode:
@@ -299,9 +314,12 @@ class WeighingWindow(QtWidgets.QWidget):
             check_ambient_pre(self.bal.ambient_details, 'mde')
             self.start_weighing()
 
-    def check_for_existing(self):
+    def data_file(self):
         filename = self.cfg.client + '_' + self.se_row_data['nominal']  # + '_' + run_id
-        url = os.path.join(self.cfg.folder, filename + '.json')
+        return os.path.join(self.cfg.folder, filename + '.json')
+
+    def check_for_existing(self):
+        url = self.data_file()
         root = check_for_existing_weighdata(self.cfg.folder, url, self.se_row_data['scheme_entry'])
         good_runs, run_no_1 = check_existing_runs(root, self.se_row_data['scheme_entry'])
         self.se_row_data['url'] = url
@@ -325,10 +343,24 @@ class WeighingWindow(QtWidgets.QWidget):
             self.reading.setText('None')
         else:
             self.reading.setText('{} {}'.format(np.round(reading, 9), unit))
+        if self.live_weighing is not None:
+            self.update_live_fit(reading, unit)
+
+    def update_live_fit(self, reading, unit):
+        """Updates the incremental fit of the weighing in progress and displays the drift correction with the
+        smallest residual std dev., and the current differences between weight groups"""
+        drift = self.live_weighing.add_reading(reading)
+        if drift is None:
+            self.live_fit.setText('')
+            return
+        self.live_weighing.item_diff(drift)
+        text = '{} ({} {} std dev)'.format(drift, self.live_weighing.stdev[drift], unit)
+        for key, value in self.live_weighing.grpdiffs.items():
+            text += '\n{}: {} {}'.format(key, value, unit)
+        self.live_fit.setText(text)
 
     def close_comms(self, *args):
-        self.bal._want_abort = True
-        self.bal.close_connection()
+        connections.release(self.bal)  # the connection stays open for the next scheme entry
         print("Connection closed")
         logfile = self.cfg.client + '_' + self.se_row_data['nominal'] + '_log.txt'
         log_save_path = os.path.join(self.cfg.folder, logfile)
@@ -394,15 +426,23 @@ class WeighingWindow(QtWidgets.QWidget):
                 return
             # get next run id
             run_id = 'run_' + str(round(self.se_row_data['first run no.']+run, 0))
+            self.live_weighing = CircWeigh(se)
+            self.live_weighing.start_stream()
             # do a circular weighing, while updating progress on pop-up window
             weighing_root = do_circ_weighing(self.bal, se, self.se_row_data['root'], self.se_row_data['url'], run_id,
                                              callback1=self.update_cyc_pos, callback2=self.update_reading,
-                                             **metadata)
+                                             EXCL=self.cfg.EXCL, early_stop=self.cfg.early_stop,
+                                             extra_cycles=self.cfg.extra_cycles, timed=self.cfg.timed,
+                                             drift=self.cfg.drift, **metadata)
             if weighing_root:
                 weighanalysis = analyse_weighing(
                     self.se_row_data['root'], self.se_row_data['url'], se, run_id, self.bal.mode, EXCL=self.cfg.EXCL,
                     timed=self.cfg.timed, drift=self.cfg.drift,
                 )
+                if weighanalysis is None:  # weighing was stopped early so is not complete
+                    bad_runs += 1
+                    run += 1
+                    continue
                 ok = weighanalysis.metadata.get('Acceptance met?')
                 if ok:
                     good_runs += 1
@@ -6,17 +6,77 @@ For more information, see 'A General Approach to Comparisons in the Presence of
    - The design matrices, expected values, and variance-covariance matrix
    - Estimates of item differences and their standard deviations
    - Drift parameters and their standard deviations
+ Readings may also be added one at a time as they are collected, using a recursive least squares update,
+ to follow the fit of a weighing in progress.
 """
 import numpy as np
 
 from ..log import log
 
+
+class RecursiveFit(object):
+
+    def __init__(self, num_params):
+        """Recursive least squares fit for one order of drift correction.
+        Each reading added after the normal matrix has full rank updates the fit in O(k²) for k parameters.
+
+        Parameters
+        ----------
+        num_params : int
+            number of parameters in the fit, i.e. number of weight groups plus the order of drift
+        """
+        self.k = num_params
+        self.num = 0        # number of readings included in the fit
+        self.b = None       # parameter estimates
+        self.P = None       # inverse of the normal matrix, xTx
+        self.ssr = 0.       # residual sum of squares
+        self._rows = []     # rows of the design matrix and readings, kept only until the fit is initialised
+        self._ys = []
+
+    @property
+    def dof(self):
+        return self.num - self.k
+
+    def update(self, x, y):
+        """Adds a reading to the fit
+
+        Parameters
+        ----------
+        x : numpy array
+            row of the design matrix for this reading
+        y : float
+            reading
+        """
+        self.num += 1
+        if self.P is None:  # accumulate readings until the normal matrix can be inverted
+            self._rows.append(x)
+            self._ys.append(y)
+            if self.num >= self.k:
+                X = np.array(self._rows)
+                if np.linalg.matrix_rank(X) == self.k:
+                    ys = np.array(self._ys)
+                    self.P = np.linalg.inv(np.dot(X.T, X))
+                    self.b = np.linalg.multi_dot([self.P, X.T, ys])
+                    residuals = ys - np.dot(X, self.b)
+                    self.ssr = np.dot(residuals, residuals)
+                    self._rows, self._ys = [], []
+            return
+
+        Px = np.dot(self.P, x)
+        denom = 1 + np.dot(x, Px)
+        err = y - np.dot(x, self.b)         # a priori residual
+        gain = Px / denom
+        self.b = self.b + gain * err
+        self.P = self.P - np.outer(gain, Px)
+        self.ssr += err * err / denom
+
+
 class CircWeigh(object):
     _sequences = {1: 10, 2: 5, 3: 4, 4: 3, 5: 3, 6: 3, 7: 3}  # key: number of weight groups in weighing, value: number of cycles
     _driftorder = {'no drift': 0, 'linear drift': 1, 'quadratic drift': 2, 'cubic drift': 3}
     _orderdrift = {0: 'no drift', 1 : 'linear drift', 2 : 'quadratic drift', 3 : 'cubic drift'}
 
-    def __init__(self, scheme_entry):
+    def __init__(self, scheme_entry, num_cycles=None):
         """Initialises a circular weighing for a single weighing in the scheme
 
         Parameters
@@ -24,6 +84,9 @@ class CircWeigh(object):
         scheme_entry : str
             the groups of weights to be weighed in order of weighing.
             groups of weights should be separated by a space; weights within a group should be separated by a + sign
+        num_cycles : int, optional
+            number of cycles in the weighing. If not specified, the standard number of cycles for the number of
+            weight groups is used (see _sequences). Specify to analyse a partial or extended weighing.
 
         Examples
         ----------
@@ -37,7 +100,9 @@ class CircWeigh(object):
         """
         self.wtgrps = scheme_entry.split()
         self.num_wtgrps = len(self.wtgrps)  # q in paper
-        self.num_cycles = (self._sequences[self.num_wtgrps])
+        if num_cycles is None:
+            num_cycles = self._sequences[self.num_wtgrps]
+        self.num_cycles = num_cycles
         self.num_readings = self.num_cycles*self.num_wtgrps  # p in paper
         self.matrices = {}
         self.t_matrices = {}
@@ -105,10 +170,61 @@ class CircWeigh(object):
 
         """
         for drift, xT in self.t_matrices.items():
+            if self.dof(drift) < 1:  # e.g. a partial weighing with too few readings for this order of drift
+                log.debug('Not enough readings to determine ' + drift)
+                continue
             self.expected_vals_drift(dataset, drift)
 
         return min(self.stdev, key=self.stdev.get)
 
+    def start_stream(self):
+        """Prepares for an incremental fit of a weighing in progress, where readings are added one at a time using
+        add_reading, in order of weighing. Readings are assumed to be equally spaced in time.
+        The number of cycles is not fixed, so the fit may continue into extra cycles.
+        """
+        self.trend = 'reading'
+        self._num_streamed = 0
+        self._stream = {drift: RecursiveFit(self.num_wtgrps + h) for drift, h in self._driftorder.items()}
+
+    def add_reading(self, reading):
+        """Updates the fit for each drift correction with the next reading in the weighing.
+        Once a drift correction has at least one degree of freedom, its b, stdev and varcovar are updated
+        so that item_diff may be used as for a completed weighing.
+
+        Parameters
+        ----------
+        reading : float or None
+            the next balance reading. A reading of None is skipped but still counts towards the position in the sequence
+
+        Returns
+        -------
+        str or None
+            drift correction which gives the smallest standard deviation so far, or None if too few readings
+        """
+        n = self._num_streamed
+        self._num_streamed += 1
+        if reading is None:
+            return min(self.stdev, key=self.stdev.get) if self.stdev else None
+
+        x = np.zeros(self.num_wtgrps + 3)
+        x[n % self.num_wtgrps] = 1
+        x[self.num_wtgrps:] = [n, n**2, n**3]
+
+        for drift, fit in self._stream.items():
+            fit.update(x[:fit.k], reading)
+            if fit.P is None or fit.dof < 1:
+                continue
+            var = fit.ssr / fit.dof
+            self.b[drift] = fit.b
+            self.stdev[drift] = np.round(np.sqrt(var), 8)
+            self.varcovar[drift] = np.multiply(var, fit.P)
+
+        return min(self.stdev, key=self.stdev.get) if self.stdev else None
+
+    def dof(self, drift):
+        """Number of degrees of freedom in the least squares fit for the given drift correction"""
+        return self.num_readings - self.num_wtgrps - self._driftorder[drift]
+
     def expected_vals_drift(self, dataset, drift):
         """This method takes a dataset from a weighing and calculates expected values, residuals, standard deviation,
          and variance-covariance matrices for a given drift correction option.
@@ -135,8 +251,7 @@ class CircWeigh(object):
         self.residuals[drift] = y_col - np.dot(self.matrices[drift], self.b[drift])
         log.debug('residuals for ' + drift + ' are ' + str(self.residuals[drift]))
 
-        var = np.dot(self.residuals[drift].T, self.residuals[drift]) / (
-                    self.num_readings - self.num_wtgrps - self._driftorder[drift])
+        var = np.dot(self.residuals[drift].T, self.residuals[drift]) / self.dof(drift)
         log.debug('variance, \u03C3\u00b2, for ' + drift + ' is: ' + str(var.item(0)))
         self.stdev[drift] = np.round(np.sqrt(var.item(0)), 8)
         log.debug('residual standard deviation, \u03C3, for ' + drift + ' is: ' + str(self.stdev[drift]))
@@ -0,0 +1,156 @@
+"""
+A variance-covariance matrix made up of a (block) diagonal matrix and terms of low rank, e.g. for the uncertainties
+of the air density, volume and height corrections to the mass differences in the final mass calculation.
+"""
+import numpy as np
+
+
+class Covariance(object):
+
+    def __init__(self, size: int):
+        """A square variance-covariance matrix of the form A + U₁C₁U₁ᵀ + U₂C₂U₂ᵀ + ..., where A is diagonal apart from
+        a small block in the bottom right corner (e.g. for correlations between the standards), and each UCUᵀ is of
+        low rank (e.g. the air density uncertainties are fully correlated, so their contribution is of rank 1).
+        Least squares problems with the matrix are solved without forming the matrix in full.
+
+        :param size: number of rows (and columns) of the matrix
+        """
+        self.size = size
+        self.diagonal = np.zeros(size)  # the diagonal of A, apart from the corner block
+        self.corner = None              # the bottom right corner block of A, including its diagonal
+        self.factors = []               # (U, C) for each term of low rank, where C is None for the identity matrix
+
+    @property
+    def rank(self) -> int:
+        """The total rank (number of columns of U) of the terms of low rank"""
+        return sum(u.shape[1] for u, c in self.factors)
+
+    def add_variances(self, variances, corner=None) -> None:
+        """Adds variances to the diagonal of A
+
+        :param variances: a variance for each row
+        :param corner: a square matrix to add to the bottom right corner of A in place of the last variances,
+            e.g. the variance-covariance matrix of two correlated standards
+        """
+        variances = np.array(variances, dtype=float)
+        if corner is not None and self.corner is None:
+            k = len(corner)
+            self.corner = np.diag(self.diagonal[-k:])
+            self.diagonal[-k:] = 0
+        if self.corner is not None:
+            k = len(self.corner)
+            self.corner = self.corner + (np.diag(variances[-k:]) if corner is None else np.asarray(corner, dtype=float))
+            variances[-k:] = 0
+        self.diagonal += variances
+
+    def add_low_rank(self, u, c=None) -> None:
+        """Adds a term U C Uᵀ to the matrix
+
+        :param u: matrix with a row for each row of the matrix, and a column for each rank of the term
+        :param c: square matrix with a row and column for each column of u, or None for the identity matrix
+        """
+        u = np.asarray(u, dtype=float)
+        if u.ndim == 1:
+            u = u[:, np.newaxis]
+        self.factors.append((u, None if c is None else np.asarray(c, dtype=float)))
+
+    def _cholesky_a(self):
+        """The Cholesky factor L of A = L Lᵀ, as the square root of the diagonal and the factor of the corner block,
+        or None if A is not positive definite"""
+        k = 0 if self.corner is None else len(self.corner)
+        d = self.diagonal[:self.size - k]
+        if np.any(d <= 0):
+            return None
+        if not k:
+            return np.sqrt(d), None
+        try:
+            return np.sqrt(d), np.linalg.cholesky(self.corner)
+        except np.linalg.LinAlgError:
+            return None
+
+    @staticmethod
+    def _solve_l(l_a, b):
+        """Solves L x = b for x, where l_a is the Cholesky factor of A"""
+        sqrt_d, l_corner = l_a
+        n = len(sqrt_d)
+        x = np.empty(b.shape)
+        x[:n] = (b[:n].T / sqrt_d).T
+        if l_corner is not None:
+            x[n:] = np.linalg.solve(l_corner, b[n:])
+        return x
+
+    def _factor(self) -> np.ndarray:
+        """The terms of low rank as a single factor F = [U₁G₁, U₂G₂, ...] of F Fᵀ, where C = G Gᵀ"""
+        factor = []
+        for u, c in self.factors:
+            if c is None:
+                factor.append(u)
+            else:  # C may be singular, e.g. for fully correlated volumes, so factorise it by its eigenvalues
+                w, v = np.linalg.eigh(c)
+                factor.append(np.dot(u, v * np.sqrt(np.clip(w, 0, None))))
+        return np.hstack(factor) if factor else np.empty((self.size, 0))
+
+    def dense(self) -> np.ndarray:
+        """The variance-covariance matrix as a square numpy array"""
+        matrix = np.diag(self.diagonal)
+        if self.corner is not None:
+            k = len(self.corner)
+            matrix[-k:, -k:] = self.corner
+        for u, c in self.factors:
+            matrix += u @ u.T if c is None else np.linalg.multi_dot([u, c, u.T])
+        # the products are symmetric only to within rounding
+        return 0.5 * (matrix + matrix.T)
+
+    def least_squares(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Generalised least squares solution b of x b = y, for observations y with this variance-covariance matrix.
+        The terms of low rank are treated as random effects f in x b + F f = y (where F Fᵀ is their sum), which are
+        estimated together with b by the QR decomposition of a system of size num_obs + rank. This is equivalent to
+        using the Woodbury matrix identity, but without the loss of precision of subtracting one large term from
+        another when the terms of low rank are much larger than A. If the terms of low rank are not of low rank
+        (or A is singular), the matrix is formed and solved in full.
+
+        :param x: design matrix, with a row for each observation
+        :param y: vector of observations
+        :return: the least squares solution b, and its variance-covariance matrix
+        """
+        rank = self.rank
+        l_a = None if rank >= self.size else self._cholesky_a()
+        if l_a is None:
+            return dense_least_squares(self.dense(), x, y)
+
+        # whiten by A, so that the stacked system is solved by ordinary least squares
+        stacked = np.zeros((self.size + rank, rank + x.shape[1]))
+        stacked[:self.size] = self._solve_l(l_a, np.column_stack([self._factor(), x]))
+        stacked[self.size:, :rank] = np.identity(rank)
+        # b is last, so its part of R gives its variance-covariance matrix (the rows of y for f are zero)
+        return _qr_least_squares(stacked, self._solve_l(l_a, y), skip=rank)
+
+
+def dense_least_squares(psi_y: np.ndarray, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Generalised least squares solution b of x b = y, for observations y with variance-covariance matrix psi_y.
+    The system is whitened by the Cholesky factor of psi_y and solved by QR decomposition, rather than by forming the
+    normal equations (which square the condition number), unless psi_y is not positive definite.
+
+    :param psi_y: variance-covariance matrix of the observations, as a square numpy array
+    :param x: design matrix, with a row for each observation
+    :param y: vector of observations
+    :return: the least squares solution b, and its variance-covariance matrix
+    """
+    try:
+        l_psi_y = np.linalg.cholesky(psi_y)
+    except np.linalg.LinAlgError:
+        psi_y_inv_x_y = np.linalg.solve(psi_y, np.column_stack([x, y]))
+        psi_b = np.linalg.inv(np.dot(x.T, psi_y_inv_x_y[:, :-1]))
+        return np.dot(psi_b, np.dot(x.T, psi_y_inv_x_y[:, -1])), psi_b
+    x_y = np.linalg.solve(l_psi_y, np.column_stack([x, y]))
+    return _qr_least_squares(x_y[:, :-1], x_y[:, -1])
+
+
+def _qr_least_squares(x: np.ndarray, y: np.ndarray, skip: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Ordinary least squares solution of x b = y by QR decomposition, and its variance-covariance matrix,
+    for the columns of x after the first skip columns (which are solved for, but not returned)"""
+    q, r = np.linalg.qr(x)
+    r_b = r[skip:, skip:]
+    b = np.linalg.solve(r_b, np.dot(q[:len(y), skip:].T, y))
+    r_b_inv = np.linalg.inv(r_b)
+    return b, np.dot(r_b_inv, r_b_inv.T)
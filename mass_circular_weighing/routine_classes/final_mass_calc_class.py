@@ -7,16 +7,40 @@ from msl.io import JSONWriter, read
 from .. import __version__
 from ..log import log
 from ..constants import REL_UNC, DELTA_STR, SUFFIX, MU_STR
+from ..weight_set import WeightSet
+from .covariance import Covariance, dense_least_squares
+
+
+# columns of the input data with least squares residuals, as saved to the json file
+inputdatares_dtype = [
+    ('+ weight group', object), ('- weight group', object), ('mass difference (g)', float),
+    ('balance uncertainty (' + MU_STR + 'g)', float), ('residual (' + MU_STR + 'g)', float),
+]
+# columns of the summary table of mass values (Reference value and Shift are nan for client weights)
+summarytable_dtype = [
+    ('Nominal (g)', object), ('Weight ID', object), ('Set ID', object), ('Mass value (g)', float),
+    ('Uncertainty (' + MU_STR + 'g)', float), ('95% CI', float), ('Cov', int),
+    ('Reference value (g)', float), ('Shift (' + MU_STR + 'g)', float),
+]
 
 
 def g_to_microg(num):
     return round(num*1e6, 3)
 
 
-def filter_mass_set(masses: dict, inputdata: np.asarray) -> dict:
+def nominal_masses(values: np.ndarray) -> list[str]:
+    """Nominal masses in g as strings: to the nearest gram for masses of at least 1 g,
+    otherwise to one significant figure (or '0', if that needs an exponent)"""
+    values = np.asarray(values, dtype=float)
+    noms = np.where(values >= 1, np.char.mod('%d', np.round(values)), np.char.mod('%.1g', values))
+    noms[np.char.find(noms, 'e-') >= 0] = '0'
+    return noms.tolist()
+
+
+def filter_mass_set(masses: dict, inputdata: np.asarray) -> WeightSet:
     """Takes a dictionary of masses and returns a copy with only the masses included in inputdata which will be
     used for the final mass calculation.
-    Uses Set type key to determine which other keys are present in the masses dictionary.
+    All columns of the mass set are filtered. The Set type must be 'Standard', 'Check' or 'Client'.
 
     :param masses: mass set as stored in the Configuration class object (from AdminDetails)
     :param inputdata: numpy structured array;
@@ -31,30 +55,13 @@ def filter_mass_set(masses: dict, inputdata: np.asarray) -> dict:
         else:
             weightgroups.append(i)
 
-    # create copy of masses with empty mass lists
-    masses_new = dict()
-    for key, val in masses.items():
-        masses_new[key] = val
-    to_append = ['Shape/Mark', 'Nominal (g)', 'Weight ID',
-                 'Expansion coeff (ppm/degC)', 'Vol (mL)', 'Vol unc (mL)',
-                 'Density (kg/m3)', 'u_density (kg/m3)',
-                 'Centre Height (mm)', 'u_height (mm)']
-    if masses['Set type'] == 'Standard' or masses['Set type'] == 'Check':
-        to_append += ['mass values (g)', 'uncertainties (' + MU_STR + 'g)', 'u_cal', 'u_drift']
-    elif masses['Set type'] == 'Client':
-        to_append += ['Container', 'u_mag (mg)']
-    else:
+    if masses['Set type'] not in ['Standard', 'Check', 'Client']:
         raise ValueError("Mass Set type not recognised: must be 'std' or 'client'")
 
-    for key in to_append:
-        masses_new[key] = []
-    # add info for included masses only
-    for i, item in enumerate(masses['Weight ID']):
-        if item in weightgroups:
-            for key in to_append:
-                masses_new[key].append(masses[key][i])
-
-    return masses_new
+    # copy of masses with info for included masses only
+    if not isinstance(masses, WeightSet):
+        masses = WeightSet(masses)
+    return masses.subset(weightgroups)
 
 
 class FinalMassCalc(object):
@@ -66,6 +73,7 @@ class FinalMassCalc(object):
     UNC_HEIGHT = False      # include uncertainties in centre height measurement
     TRUE_MASS = False       # work in true mass (rather than conventional mass)
     EDIT_CORR_COEFFS = False    # allow manual entry of correlation coefficients
+    DENSE_PSI_Y = False     # solve with psi_y as a numpy array, e.g. so that it can be edited before the least squares
 
     def __init__(self, folder: str | os.PathLike, client :str, client_masses: dict, check_masses: dict | None,
                  std_masses: dict, inputdata: np.asarray, nbc: bool = True, corr: np.array = np.identity(2)) -> None:
@@ -124,12 +132,15 @@ class FinalMassCalc(object):
         self.y = np.zeros(len(inputdata))       # corrected mass differences
         self.y_meas = np.empty(len(inputdata))  # apparent (measured) mass differences
         self.uncerts = np.empty(len(inputdata))
-        self.psi_y = None
+        self._psi_y_cov = None  # variance-covariance matrix of the observations in µg2, as a Covariance
+        self._psi_y = None      # the same as a numpy array, if DENSE_PSI_Y is True
 
         self.designmatrix = None
         self.cmx1 = None
         self.cnx1 = None
 
+        self._corrections = {}  # name: (objects it depends on, value) of the terms of the corrections and uncertainties
+
         self.inputdatares = None
         self.b = None
         self.psi_bmeas = None
@@ -138,6 +149,21 @@ class FinalMassCalc(object):
 
         self.summarytable = None
 
+    @property
+    def psi_y(self) -> np.ndarray | None:
+        """The variance-covariance matrix of the observations in µg2 as a numpy array, or None if not yet calculated.
+        The array is read-only unless DENSE_PSI_Y is True, in which case it is the matrix used by
+        :meth:`do_least_squares`, so it may be edited."""
+        if self._psi_y_cov is None:
+            return None
+        if not self.DENSE_PSI_Y:
+            psi_y = self._psi_y_cov.dense()
+            psi_y.flags.writeable = False
+            return psi_y
+        if self._psi_y is None:
+            self._psi_y = self._psi_y_cov.dense()
+        return self._psi_y
+
     def structure_jsonfile(self):
         """Creates relevant groups in the JSONWriter object"""
         mass_sets = self.finalmasscalc.require_group('1: Mass Sets')
@@ -172,22 +198,12 @@ class FinalMassCalc(object):
         self.num_unknowns = self.num_client_masses + self.num_check_masses + self.num_stds
         log.info('Number of unknowns = '+str(self.num_unknowns))
 
-        # combine relevant parts of weight sets into a mega dictionary
-        self.all_wts = ({'Weight ID': self.client_masses['Weight ID'], })
-        for k in ['Expansion coeff (ppm/degC)', 'Vol (mL)', 'Vol unc (mL)', 'Nominal (g)', 'Centre Height (mm)', 'u_height (mm)']:
-            try:
-                self.all_wts[k] = self.client_masses[k]
-            except KeyError:
-                log.warning(f"{k} key not found in client mass set dictionary")
-        for k, v in self.all_wts.items():
-            if self.check_masses:
-                self.all_wts[k] += self.check_masses[k]
-            self.all_wts[k] += self.std_masses[k]
-
-        self.all_wts['Set'] = ['Client']*self.num_client_masses
-        if self.check_masses:
-            self.all_wts['Set'] += ['Check'] * self.num_check_masses
-        self.all_wts['Set'] += ['Standard'] * self.num_stds
+        # combine relevant parts of weight sets into a mega dictionary (as a new set, so that the sets are unchanged)
+        self.all_wts = WeightSet.union(self.client_masses, self.check_masses, self.std_masses, keys=[
+            'Expansion coeff (ppm/degC)', 'Vol (mL)', 'Vol unc (mL)', 'Nominal (g)', 'Centre Height (mm)', 'u_height (mm)'
+        ])
+        self.all_wts['Set'] = ['Client'] * self.num_client_masses + ['Check'] * self.num_check_masses \
+            + ['Standard'] * self.num_stds
 
         self.allmassIDs = self.all_wts['Weight ID']
 
@@ -212,7 +228,7 @@ class FinalMassCalc(object):
             grp1 = entry[0].split('+')
             for mass in grp1:
                 try:
-                    i = self.all_wts['Weight ID'].index(mass)
+                    i = self.all_wts.position(mass)
                     log.debug(f'mass {mass} is in position {i}')
                     designmatrix[rowcounter, i] = 1
                 except IndexError:
@@ -220,7 +236,7 @@ class FinalMassCalc(object):
             grp2 = entry[1].split('+')
             for mass in grp2:
                 try:
-                    i = self.all_wts['Weight ID'].index(mass)
+                    i = self.all_wts.position(mass)
                     log.debug(f'mass {mass} is in position {i}')
                     designmatrix[rowcounter, i] = -1
                 except IndexError:
@@ -229,7 +245,7 @@ class FinalMassCalc(object):
             self.uncerts[rowcounter] = entry[3]
             rowcounter += 1
         for std in self.std_masses['Weight ID']:
-            designmatrix[rowcounter, self.all_wts['Weight ID'].index(std)] = 1
+            designmatrix[rowcounter, self.all_wts.position(std)] = 1
             rowcounter += 1
 
         self.y_meas = np.append(self.y_meas, self.std_masses['mass values (g)'])  # corresponds to Y, in g
@@ -238,6 +254,7 @@ class FinalMassCalc(object):
         log.debug('uncerts:\n' + str(self.uncerts))
 
         self.designmatrix = designmatrix
+        self._corrections = {}
 
         cmx1 = np.ones(self.num_client_masses + self.num_check_masses)  # from above, stds are added last
         self.cmx1 = np.append(cmx1, np.zeros(self.num_stds))  # 1's for unknowns, 0's for reference stds
@@ -261,6 +278,30 @@ class FinalMassCalc(object):
 
         return True
 
+    def _correction_term(self, name: str, depends_on: tuple, func):
+        """The named correction term, calculated by func only if any of the objects it depends on (e.g. the design
+        matrix, or a column of all_wts) has been replaced since it was last calculated. The terms don't depend on
+        the class variables (e.g. BUOYANCY_CORR), so they are kept when those are changed.
+        Replace an input (e.g. fmc.all_wts['Vol (mL)'] = [...]) rather than changing it in place."""
+        cached = self._corrections.get(name)
+        if cached is None or any(a is not b for a, b in zip(cached[0], depends_on)):
+            value = func()
+            value.flags.writeable = False
+            cached = self._corrections[name] = (depends_on, value)
+        return cached[1]
+
+    def _volume_differences(self) -> np.ndarray:
+        """The design matrix times the volumes of the weights, i.e. the difference in volume for each observation"""
+        vols = self.all_wts['Vol (mL)']
+        return self._correction_term('xv', (self.designmatrix, vols), lambda: np.dot(self.designmatrix, vols))
+
+    def _height_design_matrix(self) -> np.ndarray:
+        """The design matrix with the rows for the standards set to zero, for the height corrections and for the
+        uncertainties of the volume and height corrections"""
+        return self._correction_term(
+            'x_c', (self.designmatrix, self.cnx1), lambda: (self.designmatrix.T * self.cnx1).T
+        )
+
     def calc_buoyancy_corrections(self, air_densities: np.ndarray) -> np.ndarray:
         """Calculate true mass differences by applying buoyancy corrections.
         NOTE: mass volumes are not corrected for temperature during weighing.
@@ -270,18 +311,19 @@ class FinalMassCalc(object):
         """
         # NOTE: volumes are not corrected for temperature during weighing
         # print('v', self.all_wts['Vol (mL)'])
-        # print('xv', np.dot(self.designmatrix, self.all_wts['Vol (mL)']).T)
+        xv = self._volume_differences()
+        # print('xv', xv)
         if self.TRUE_MASS:
             a_d = np.append(air_densities, np.zeros(self.num_stds))
             # buoyancy correction in mg
-            rho_x_v = (np.dot(self.designmatrix, self.all_wts['Vol (mL)']).T * a_d).T
+            rho_x_v = (xv.T * a_d).T
             # print('rho_x_v', rho_x_v)
             tm_conv = - 0.00015*self.cnx1*self.y_meas
             return tm_conv + rho_x_v/1000
         else:  # work in conventional mass -- doesn't seem right?
             ad_0 = [ad - 1.2 for ad in air_densities]
             a_d = np.append(ad_0, np.zeros(self.num_stds))
-            rho_x_v = (np.dot(self.designmatrix, self.all_wts['Vol (mL)']).T * a_d).T/1000
+            rho_x_v = (xv.T * a_d).T/1000
             return rho_x_v/0.99985
 
     def calc_height_corrections(self):
@@ -289,22 +331,32 @@ class FinalMassCalc(object):
 
         :return: correction in g, and the corresponding variance-covariance matrix in µg2
         """
-        # height corr in mg
-        m = np.array(self.all_wts['Nominal (g)'])
-        z = np.array(self.all_wts['Centre Height (mm)'])
-        x_c = (self.designmatrix.T * self.cnx1).T
-        h_c = 0.3 * 1e-6 * np.dot(x_c, m * z)
-
-        u_z = np.array(self.all_wts['u_height (mm)'])
-        uuz = np.vstack(u_z) * np.hstack(u_z)
-        r_z = np.identity(self.num_unknowns)
-        psi_z = uuz * r_z
-        # print('\npsi_z', psi_z)
-
-        psi_z_contr = 9e-8 * np.dot(np.dot(x_c, m * psi_z * m.T), x_c.T)  # in µg2
+        u = self._height_design_matrix() * self.height_uncertainties()
+        psi_z_contr = np.dot(u, u.T)  # in µg2
         # print('\npsi_z_contr', psi_z_contr)
 
-        return h_c/1000, psi_z_contr
+        return self._height_corrections(), psi_z_contr
+
+    def _height_corrections(self) -> np.ndarray:
+        """Corrections to mass differences in g for the heights of the centres of mass of the weights"""
+        m = self.all_wts['Nominal (g)']
+        z = self.all_wts['Centre Height (mm)']
+
+        def calc():
+            # height corr in mg
+            h_c = 0.3 * 1e-6 * np.dot(self._height_design_matrix(), np.array(m) * np.array(z))
+            return h_c/1000
+
+        return self._correction_term('height', (self.designmatrix, self.cnx1, m, z), calc)
+
+    def height_uncertainties(self) -> np.ndarray:
+        """The uncertainty of the height correction for each weight (the centre heights are uncorrelated).
+
+        :return: uncertainties in µg
+        """
+        m = self.all_wts['Nominal (g)']
+        u_z = self.all_wts['u_height (mm)']
+        return self._correction_term('u_height', (m, u_z), lambda: 3e-4 * np.array(m) * np.array(u_z))
 
     def apply_corrections_to_mass_differences(self, air_densities: np.ndarray):
         """Apply corrections to y_meas for buoyancy and COM heights,
@@ -321,7 +373,7 @@ class FinalMassCalc(object):
         height_corr = np.zeros(len(self.y_meas))
 
         if self.HEIGHT_CORR:    # include corrections for differences in centre height of masses
-            height_corr = self.calc_height_corrections()[0]
+            height_corr = self._height_corrections()
 
         self.y = self.y_meas + buoy_corr + height_corr
 
@@ -337,59 +389,39 @@ class FinalMassCalc(object):
 
         :return:
         """
-        # The 'psi' variables in this method are variance-covariance matrices
-        # U's are variances and R's are correlation coefficients
-        ad_contr = 0
-        vol_contr = 0
-        height_contr = 0
+        # psi_y is the variance-covariance matrix of the observations. Each contribution is of low rank,
+        # so it is kept as a factor U (of uncertainties) and a correlation matrix C of U C Uᵀ
+        psi_y = Covariance(self.num_obs)
 
         if self.UNC_AIR_DENS:  # include uncertainties in air density measurement
             u_ad = np.append(unc_airdens, np.zeros(self.num_stds))
-            uua = np.vstack(u_ad) * np.hstack(u_ad)
-            # print('uua', uua)
-            ra = np.ones(len(uua))  # the air density measurements are fully correlated
-            psi_airdens = uua * ra
-            # print('psi_airdens', psi_airdens)
-            xv = np.dot(self.designmatrix, self.all_wts['Vol (mL)'])
-            # print('xv', xv)
-
-            ad_contr = (xv * psi_airdens).T * xv * 1e6  # factor of 1e6 for µg2
-            log.debug(f'Air density contribution to psi_y is {ad_contr}')
-            # print('\nvAcomp', ad_contr)  # should be square of size b or num unknowns
+            # the air density measurements are fully correlated, so the contribution is of rank 1
+            psi_y.add_low_rank(self._volume_differences() * u_ad * 1e3)  # factor of 1e3 for µg
+            log.debug('Air density contribution to psi_y is of rank 1')
 
+        # The volume and height contributions are of the form (D) Xc Ψ Xcᵀ (D), where Xc is the design matrix without
+        # the rows for the standards, Ψ is a variance-covariance matrix of the weights, and D is the diagonal matrix of
+        # the air densities (for the volumes only). Each is of rank num_unknowns.
         if self.UNC_VOL:   # include uncertainties in volume estimation
             # The uncertainty in the buoyancy correction to a measured mass difference due to an
-            # uncertainty uV in the volume of a weight is ρa*uV, where the ambient air density ρa is assumed
-            # to be 1.2 kg m-3 for the purposes of the uncertainty calculation. TP9, p7, item 4
-            # print('Vol unc (mL)', self.all_wts['Vol unc (mL)'])
-            uuv = np.vstack(self.all_wts['Vol unc (mL)']) * np.hstack(self.all_wts['Vol unc (mL)'])
-            # print(uuv)
+            # uncertainty uV in the volume of a weight is ρa*uV, where ρa is the air density during the measurement.
+            # TP9, p7, item 4 assumes ρa = 1.2 kg m-3 for the purposes of the uncertainty calculation.
+            u_v = np.array(self.all_wts['Vol unc (mL)'])
 
-            # Correlations of volume uncertainties are bespoke. They could be uncorrelated,
+            # Correlations of volume uncertainties are bespoke. They could be uncorrelated (rv is None),
             # or fully correlated for weights from the same set
-            if rv is None:
-                rv = np.identity(len(uuv))  # uncorrelated
-            # print('set', self.all_wts['Set'])
             # print('rv', rv)
-            psi_vol = uuv * rv
-            # print('psi_vol', psi_vol)
-
-            # xv = np.dot(self.designmatrix, self.all_wts['Vol (mL)'])
-            # print('xv', xv)
-            a_d = np.append(air_densities, np.zeros(self.num_stds))
-            # print('air density vector', a_d)
-
-            xvxt = np.dot(np.dot(self.designmatrix, psi_vol), self.designmatrix.T)
-            vol_contr = (a_d * xvxt).T * a_d * 1e6  # factor of 1e6 for µg2
-            # print('\nvVcomp', vol_contr)
-            log.debug(f'Volume contribution to psi_y is {vol_contr}')  # should be square of size b or num unknowns
+            psi_vol = np.outer(u_v, u_v) * (np.identity(self.num_unknowns) if rv is None else rv)
+            a_d = np.append(air_densities, np.zeros(self.num_stds)) * 1e3  # factor of 1e3 for µg
+            psi_y.add_low_rank(a_d[:, np.newaxis] * self._height_design_matrix(), psi_vol)
+            log.debug(f'Volume contribution to psi_y is of rank {self.num_unknowns}')
 
-        if self.UNC_HEIGHT:
-            height_contr = self.calc_height_corrections()[1]
-            log.debug(f'Height contribution to psi_y is {height_contr}')
-            # print('\nvZcomp', height_contr)
+        if self.UNC_HEIGHT:  # the uncertainties of the heights are uncorrelated
+            psi_y.add_low_rank(self._height_design_matrix() * self.height_uncertainties())
+            log.debug(f'Height contribution to psi_y is of rank {self.num_unknowns}')
 
-        self.psi_y = ad_contr + vol_contr + height_contr
+        self._psi_y_cov = psi_y
+        self._psi_y = None
 
     def do_least_squares(self):
         if not self.check_design_matrix():
@@ -401,31 +433,25 @@ class FinalMassCalc(object):
 
         # Calculate least squares solution, following the mathcad example in Tech proc MSLT.M.001
         x = self.designmatrix
-        xT = self.designmatrix.T
 
-        # Hadamard product: element-wise multiplication
-        uumeas = np.vstack(self.uncerts) * np.hstack(self.uncerts)    # becomes square matrix dim num_obs
-        rmeas = np.identity(self.num_obs)
-        # Replace bottom right corner with correlation matrix (which may just be the identity matrix)
+        # The balance uncertainties are uncorrelated, except for any correlation between the two standards,
+        # so the variance-covariance matrix of the measurements is diagonal apart from the bottom right corner
+        corner = None
         if self.corr is not None:
-            rmeas[-2:, -2:] = self.corr
-        log.info(f'rmeas matrix with correlations for stds if specified:\n{rmeas}')
-
-        psi_y_hadamard = uumeas * rmeas  # Hadamard product is element-wise multiplication
-        # print('covYmeas', psi_y_hadamard)
-
-        if self.psi_y is not None:    # psi_y already includes contributions from buoyancy and volume corrections
-            self.psi_y += psi_y_hadamard
-        else:             # psi_y not yet defined
-            self.psi_y = psi_y_hadamard
-        # print('fmc psi_y', self.psi_y)
-
-        psi_y_inv = np.linalg.inv(self.psi_y)
-
-        psi_bmeas_inv = np.linalg.multi_dot([xT, psi_y_inv, x])
-        self.psi_bmeas = np.linalg.inv(psi_bmeas_inv)
-
-        self.b = np.linalg.multi_dot([self.psi_bmeas, xT, psi_y_inv, self.y])
+            corner = np.outer(self.uncerts[-2:], self.uncerts[-2:]) * self.corr
+            log.info(f'Correlations for stds:\n{self.corr}')
+
+        # psi_y may already include contributions from buoyancy and volume corrections
+        if self._psi_y_cov is None:
+            self._psi_y_cov = Covariance(self.num_obs)
+        if self.DENSE_PSI_Y:    # as a numpy array, which may have been edited
+            psi_y_meas = Covariance(self.num_obs)
+            psi_y_meas.add_variances(self.uncerts**2, corner)
+            self._psi_y = self.psi_y + psi_y_meas.dense()
+            self.b, self.psi_bmeas = dense_least_squares(self._psi_y, x, self.y)
+        else:
+            self._psi_y_cov.add_variances(self.uncerts**2, corner)
+            self.b, self.psi_bmeas = self._psi_y_cov.least_squares(x, self.y)
         log.info('Mass values:\n'+str(self.b))
 
         r0 = (self.y - np.dot(x, self.b)) * 1e6               # residuals, converted from g to ug
@@ -433,16 +459,14 @@ class FinalMassCalc(object):
         self.leastsq_meta['Sum of residues squared (' + MU_STR + 'g^2)'] = np.round(sum_residues_squared, 6)
         log.info('Residuals:\n'+str(np.round(r0, 4)))       # also save as column with input data for checking
 
-        inputdata = self.inputdata
-        inputdatares = np.empty((self.num_obs, 5), dtype=object)
-            # dtype =[('+ weight group', object), ('- weight group', object), ('mass difference (g)', object),
-            #         ('balance uncertainty (ug)', 'float64'), ('residual (ug)', 'float64')])
-        inputdatares[0:len(inputdata), 0] = inputdata['+ weight group']
-        inputdatares[len(inputdata):, 0] = self.std_masses['Weight ID']
-        inputdatares[0:len(inputdata), 1] = inputdata['- weight group']
-        inputdatares[:, 2] = self.y
-        inputdatares[:, 3] = self.uncerts
-        inputdatares[:, 4] = np.round(r0, 3)
+        num_diffs = len(self.inputdata)
+        inputdatares = np.empty(self.num_obs, dtype=inputdatares_dtype)  # the '- weight group' of a standard is None
+        inputdatares['+ weight group'][:num_diffs] = self.inputdata['+ weight group']
+        inputdatares['+ weight group'][num_diffs:] = self.std_masses['Weight ID']
+        inputdatares['- weight group'][:num_diffs] = self.inputdata['- weight group']
+        inputdatares['mass difference (g)'] = self.y
+        inputdatares['balance uncertainty (' + MU_STR + 'g)'] = self.uncerts
+        inputdatares['residual (' + MU_STR + 'g)'] = np.round(r0, 3)
 
         self.inputdatares = inputdatares
 
@@ -479,11 +503,12 @@ class FinalMassCalc(object):
             self.do_least_squares()
 
         # check that the calculated residuals are less than twice the balance uncertainties in ug
+        res = self.inputdatares
+        too_large = np.absolute(res['residual (' + MU_STR + 'g)']) > 2 * res['balance uncertainty (' + MU_STR + 'g)']
         flag = []
-        for entry in self.inputdatares:
-            if np.absolute(entry[4]) > 2 * entry[3]:
-                flag.append(str(entry[0]) + ' - ' + str(entry[1]))
-                log.warn(f"A residual for {entry[0]} - {entry[1]} is too large")
+        for entry in res[too_large]:
+            flag.append(str(entry['+ weight group']) + ' - ' + str(entry['- weight group']))
+            log.warning(f"A residual for {entry['+ weight group']} - {entry['- weight group']} is too large")
 
         if flag:
             self.leastsq_meta['Residuals greater than 2 balance uncerts'] = flag
@@ -539,37 +564,24 @@ class FinalMassCalc(object):
         if self.std_uncert_b is None:
             self.cal_rel_unc()
 
-        summarytable = np.empty((self.num_unknowns, 9), object)
         cov = 2
-        for i in range(self.num_unknowns):
-            summarytable[i, 1] = self.all_wts['Weight ID'][i]
-
-            if i < self.num_client_masses:
-                summarytable[i, 2] = 'Client'
-                summarytable[i, 7] = ""
-                summarytable[i, 8] = ""
-            elif i >= self.num_client_masses + self.num_check_masses:
-                summarytable[i, 2] = 'Standard'
-                summarytable[i, 7] = self.std_masses['mass values (g)'][i - self.num_client_masses - self.num_check_masses]
-                delta = self.b[i] - summarytable[i, 7]
-                summarytable[i, 8] = g_to_microg(delta)
-            else:
-                summarytable[i, 2] = 'Check'
-                summarytable[i, 7] = self.check_masses['mass values (g)'][i - self.num_client_masses]
-                delta = self.b[i] - self.check_masses['mass values (g)'][i - self.num_client_masses]
-                summarytable[i, 8] = g_to_microg(delta)
-
-            summarytable[i, 3] = np.round(self.b[i], 12)
-            if self.b[i] >= 1:
-                nom = str(int(round(self.b[i], 0)))
-            else:
-                nom = "{0:.1g}".format(self.b[i])
-            if 'e-' in nom:
-                nom = 0
-            summarytable[i, 0] = nom
-            summarytable[i, 4] = np.round(self.std_uncert_b[i], 3)
-            summarytable[i, 5] = np.round(cov * self.std_uncert_b[i], 3)
-            summarytable[i, 6] = cov
+        # reference values of the check and standard weights (the client weights have none)
+        num_clients = self.num_client_masses
+        ref_values = np.full(self.num_unknowns, np.nan)
+        if self.num_check_masses:
+            ref_values[num_clients:num_clients + self.num_check_masses] = self.check_masses['mass values (g)']
+        ref_values[num_clients + self.num_check_masses:] = self.std_masses['mass values (g)']
+
+        summarytable = np.empty(self.num_unknowns, dtype=summarytable_dtype)
+        summarytable['Nominal (g)'] = nominal_masses(self.b)
+        summarytable['Weight ID'] = self.all_wts['Weight ID']
+        summarytable['Set ID'] = self.all_wts['Set']
+        summarytable['Mass value (g)'] = np.round(self.b, 12)
+        summarytable['Uncertainty (' + MU_STR + 'g)'] = np.round(self.std_uncert_b, 3)
+        summarytable['95% CI'] = np.round(cov * self.std_uncert_b, 3)
+        summarytable['Cov'] = cov
+        summarytable['Reference value (g)'] = ref_values
+        summarytable['Shift (' + MU_STR + 'g)'] = np.round((self.b - ref_values) * 1e6, 3)
 
         log.info('Found least squares solution')
         log.debug('Least squares solution:\nWeight ID, Set ID, Mass value (g), Uncertainty (' + MU_STR + 'g), '
@@ -583,15 +595,9 @@ class FinalMassCalc(object):
 
         leastsq_data = self.finalmasscalc.create_group('2: Matrix Least Squares Analysis', metadata=self.leastsq_meta)
         leastsq_data.create_dataset('Input data with least squares residuals', data=self.inputdatares,
-                                    metadata={'headers':
-                                                  ['+ weight group', '- weight group', 'mass difference (g)',
-                                                   'balance uncertainty (' + MU_STR + 'g)', 'residual (' + MU_STR + 'g)']})
+                                    metadata={'headers': list(self.inputdatares.dtype.names)})
         leastsq_data.create_dataset('Mass values from least squares solution', data=self.summarytable,
-                                    metadata={'headers':
-                                                  ['Nominal (g)', 'Weight ID', 'Set ID',
-                                                   'Mass value (g)', 'Uncertainty (' + MU_STR + 'g)', '95% CI', 'Cov',
-                                                   "Reference value (g)", "Shift (" + MU_STR + 'g)'
-                                                   ]})
+                                    metadata={'headers': list(self.summarytable.dtype.names)})
 
     def save_to_json_file(self, filesavepath=None, folder=None, client=None):
         if not filesavepath:
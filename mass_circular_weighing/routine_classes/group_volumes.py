@@ -0,0 +1,71 @@
+"""
+Volumes of the weight groups in circular weighings, for the buoyancy corrections of true mass analysis.
+"""
+import numpy as np
+
+from ..log import log
+from ..weight_set import WeightSet
+
+
+class GroupVolumes(object):
+
+    def __init__(self, *sets):
+        """Volumes of the weight groups of scheme entries, from the weight sets of a Configuration.
+        The volume at 20 °C and the sum of volume times expansion coefficient of each weight group are worked out once
+        for each scheme entry, so that the volumes corrected for the temperature of a run are a single expression.
+
+        Parameters
+        ----------
+        sets : WeightSet or None
+            the client, standard and check sets, e.g. cfg.all_client_wts, cfg.all_stds, cfg.all_checks
+        """
+        self.sets = sets
+        all_wts = WeightSet.union(*sets, keys=['Expansion coeff (ppm/degC)', 'Vol (mL)'])
+        self.all_wts = all_wts
+        self._vols = all_wts.array('Vol (mL)')
+        self._vol_coeffs = self._vols * all_wts.array('Expansion coeff (ppm/degC)')
+        self._entries = {}  # tuple of weight groups: (volumes at 20 °C, volume * expansion coeff)
+
+    def uses(self, *sets) -> bool:
+        """Whether the volumes are from these weight sets"""
+        return len(sets) == len(self.sets) and all(a is b for a, b in zip(sets, self.sets))
+
+    def precompute(self, scheme_entries) -> None:
+        """Works out the group volumes for scheme entries in advance.
+        Entries with weights that are unknown, or have no volume, are left until they are asked for."""
+        for se in scheme_entries:
+            if not isinstance(se, str):
+                continue
+            try:
+                self.entry(se.split())
+            except ValueError as e:
+                log.debug(f'No volumes for {se}: {e}')
+
+    def entry(self, wt_grps: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Volume in mL at 20 °C of each weight group, and the sum of volume in mL times expansion coefficient
+        in ppm/°C of each weight group
+
+        :param wt_grps: weight groups of a scheme entry, with the weights in a group separated by '+'
+        """
+        key = tuple(wt_grps)
+        if key not in self._entries:
+            vols_20 = np.empty(len(wt_grps), dtype=float)
+            vol_coeffs = np.empty(len(wt_grps), dtype=float)
+            for g, grp in enumerate(wt_grps):
+                # get index of each wt in mass set
+                i = self.all_wts.positions(grp.split("+"))
+                if np.isnan(self._vol_coeffs[i]).any():
+                    raise ValueError(f"Volumes are not known for all weights in {grp}.")
+                vols_20[g] = sum(self._vols[i])
+                vol_coeffs[g] = sum(self._vol_coeffs[i])
+            self._entries[key] = vols_20, vol_coeffs
+        return self._entries[key]
+
+    def volumes(self, wt_grps: list[str], temp: float = 20.) -> tuple[np.ndarray, np.ndarray]:
+        """Volumes in mL of the weight groups, both nominal (at 20 °C) and corrected for the ambient temperature
+
+        :param wt_grps: weight groups of a scheme entry
+        :param temp: measured temperature in °C
+        """
+        vols_20, vol_coeffs = self.entry(wt_grps)
+        return vols_20.copy(), vols_20 + vol_coeffs * 0.000001 * (temp - 20)
@@ -10,8 +10,6 @@ from openpyxl import load_workbook
 from openpyxl.styles import Font, Alignment
 
 from msl.io import read
-from ..gui.threads.prompt_thread import PromptThread
-pt = PromptThread()
 
 from ..constants import FONTSIZE, IN_DEGREES_C
 from ..log import log
@@ -19,14 +17,17 @@ from ..log import log
 
 class ExcelSummaryWorkbook(object):
 
-    def __init__(self, cfg):
+    def __init__(self, cfg, interactive=True):
         """Collate all administrative information, weighing data and calculated values into one spreadsheet
 
         Parameters
         ----------
         cfg : Config object
             Configuration class instance created using Admin.xlsx and config.xml files
+        interactive : bool, optional
+            if True (default), the user is prompted for any missing ambient conditions
         """
+        self.interactive = interactive
         # Load the Admin Details workbook which contains Admin and Scheme sheets
         self.wb = load_workbook(os.path.join(cfg.folder, cfg.client + '_Admin.xlsx'))
         if "Admin" not in self.wb.sheetnames:
@@ -59,7 +60,8 @@ class ExcelSummaryWorkbook(object):
         sheet.append(header)
 
         for row in data:
-            sheet.append(list(row))
+            # missing values (e.g. the reference value of a client weight) are nan, and are left blank
+            sheet.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
 
         for cell in sheet[1]:
             cell.font = Font(italic=True)
@@ -316,8 +318,7 @@ class ExcelSummaryWorkbook(object):
             if not all_temps:
                 message = '<html>Please enter any known temperature values during weighing<br>' \
                           'for {}, separated by a space, ending {}</html>'.format(se, weighdata.metadata.get("Mmt Timestamp"))
-                pt.show('text', message, font=FONTSIZE, title='Ambient Monitoring')
-                reply = pt.wait_for_prompt_reply()
+                reply = self.ask_user(message)
                 try:
                     temperatures = reply.split()
                 except AttributeError:
@@ -326,14 +327,24 @@ class ExcelSummaryWorkbook(object):
             if not all_rh:
                 message = '<html>Please enter any known humidity values during weighing<br>' \
                           'for {}, separated by a space, ending {}</html>'.format(se, weighdata.metadata.get("Mmt Timestamp"))
-                pt.show('text', message, font=FONTSIZE, title='Ambient Monitoring')
-                reply = pt.wait_for_prompt_reply()
+                reply = self.ask_user(message)
                 try:
                     humidities = reply.split()
                 except AttributeError:
                     humidities = []
                 sheet.append(["Humidities:"] + humidities)
 
+    def ask_user(self, message):
+        """Prompts the user for text, or returns None if the workbook is being made without user interaction"""
+        if not self.interactive:
+            text = message.replace('<html>', '').replace('</html>', '').replace('<br>', ' ')
+            log.warning('Not prompted during non-interactive export: ' + text)
+            return None
+        from ..gui.threads.prompt_thread import PromptThread
+        pt = PromptThread()
+        pt.show('text', message, font=FONTSIZE, title='Ambient Monitoring')
+        return pt.wait_for_prompt_reply()
+
     def add_all_cwdata(self, cfg, incl_datasets,):
         scheme = self.wb['Scheme']
         i = self.first_scheme_entry_row  # Header rows occur before scheme
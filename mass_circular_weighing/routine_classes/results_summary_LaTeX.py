@@ -147,7 +147,9 @@ class LaTexDoc(object):
         data_as_str = "\n"
         for row in data:
             for e, entry in enumerate(row):
-                if e == masscol:
+                if isinstance(entry, float) and entry != entry:  # nan, e.g. no reference value for a client weight
+                    data_as_str += " & "
+                elif e == masscol:
                     data_as_str += greg_format(entry) + " & "
                 else:
                     data_as_str += str(entry) + " & "
@@ -3,6 +3,7 @@ Results summary in Word format (not currently used)
 """
 import os
 import xlwt
+import numpy as np
 
 from msl.loadlib import LoadLibrary
 from msl.io import read
@@ -23,6 +24,14 @@ def greg_format(number):
     return before + '.' + ' '.join(after[i:i+3] for i in range(0, len(after), 3))
 
 
+def cell_text(entry, mass=False):
+    """The text for a cell of a table of mass data, which is blank for nan (e.g. no reference value for a client
+    weight), and in 'Greg' formatting for a mass value"""
+    if isinstance(entry, float) and np.isnan(entry):
+        return ""
+    return greg_format(entry) if mass else str(entry)
+
+
 def list_to_csstr(idlst):
     idstr = ""
     for id in idlst:
@@ -169,7 +178,8 @@ class WordDoc(object):
     def make_table_massdata(self, data, masscol=None):
         """Makes table of structured data containing one column of mass data to be formatted in 'Greg' formatting"""
         headers = data.metadata.get('metadata')['headers']
-        if len(data.shape) == 1:
+        single_row = len(data.shape) == 1 and not data.dtype.names  # a structured array has a record for each row
+        if single_row:
             rows = 2
         else:
             rows = len(data) + 1
@@ -178,20 +188,16 @@ class WordDoc(object):
         oTable.Range.ParagraphFormat.SpaceAfter = 0
         for c in range(1, cols+1):
             oTable.Cell(1, c).Range.Text = str(headers[c-1])
-            if len(data.shape) == 1:
+            if single_row:
+                oTable.Cell(2, c).Range.Text = cell_text(data[c - 1], mass=c == masscol)
                 if c == masscol:
-                    oTable.Cell(2, c).Range.Text = greg_format(data[c - 1])
                     oTable.Cell(2, c).Range.ParagraphFormat.Alignment = 2
                 #     https://docs.microsoft.com/en-us/dotnet/api/microsoft.office.interop.word.wdparagraphalignment?view=word-pia
-                else:
-                    oTable.Cell(2, c).Range.Text = str(data[c-1])
             else:
                 for r in range(2, rows+1):
+                    oTable.Cell(r, c).Range.Text = cell_text(data[r - 2][c - 1], mass=c == masscol)
                     if c == masscol:
-                        oTable.Cell(r, c).Range.Text = greg_format(data[r - 2][c - 1])
                         oTable.Cell(r, c).Range.ParagraphFormat.Alignment = 2
-                    else:
-                        oTable.Cell(r, c).Range.Text = str(data[r-2][c - 1])
                     # oTable.Cell(r, c).Range.Text = str(data[r-2][c-1])
         oTable.Rows.Item(1).Range.Font.Bold = True
         oTable.Rows.Item(1).Range.Font.Italic = True
@@ -1,3 +1,5 @@
 from .run_circ_weigh import check_existing_runs, check_bal_initialised, do_circ_weighing
 from .json_circweigh_utils import check_for_existing_weighdata
 from .analyse_circ_weigh import analyse_weighing
+from .weighing_queue import run_queue
+from .recover_backups import recover_backups
@@ -0,0 +1,102 @@
+"""
+Online assessment of an automatic circular weighing in progress.
+After each completed cycle the drift model is refitted using CircWeigh, so that a weighing which is clearly going to be
+excluded can be stopped early, and a borderline weighing can be extended by extra cycles.
+"""
+import numpy as np
+
+from ..constants import SUFFIX
+from ..log import log
+from ..routine_classes.circ_weigh_class import CircWeigh
+
+CONTINUE = 'continue'   # keep going with the planned cycles
+ABORT = 'abort'         # residual standard deviation is already far outside the exclusion criterion
+EXTEND = 'extend'       # planned cycles are complete but the weighing is borderline, so add a cycle
+
+MIN_CYCLES = 2          # no assessment is made until at least this many cycles are complete
+
+
+def partial_fit(se, data, timed=False, drift=None):
+    """Refits the drift model for the cycles of a circular weighing completed so far
+
+    Parameters
+    ----------
+    se : str
+        scheme entry
+    data : numpy array
+        weighing data for the completed cycles, of shape (num completed cycles, num weight groups, 2)
+        with times in [:, :, 0] and readings in [:, :, 1]
+    timed : bool, optional
+        if True, uses times from weighings, otherwise assumes equally spaced in time
+    drift : str, optional
+        drift correction to use. If None, or if there are too few readings for this drift correction so far,
+        the drift correction which gives the smallest standard deviation is used
+
+    Returns
+    -------
+    tuple of (drift, stdev) where stdev is the residual standard deviation in the balance unit,
+    or (None, None) if too few readings have been collected to determine a standard deviation
+    """
+    cycles_done = data.shape[0]
+    weighing = CircWeigh(se, num_cycles=cycles_done)
+    if timed:
+        times = np.reshape(data[:, :, 0], weighing.num_readings)
+    else:
+        times = []
+    weighing.generate_design_matrices(times)
+    if weighing.dof('no drift') < 1:
+        return None, None
+
+    best = weighing.determine_drift(data[:, :, 1])
+    if drift not in weighing.stdev:
+        drift = best
+
+    return drift, weighing.stdev[drift]
+
+
+def assess_cycles(se, data, unit, max_stdev, EXCL, early_stop=None, final=False, timed=False, drift=None):
+    """Decides whether an automatic circular weighing should continue, stop early or be extended by a cycle.
+
+    Parameters
+    ----------
+    se : str
+        scheme entry
+    data : numpy array
+        weighing data for the completed cycles, of shape (num completed cycles, num weight groups, 2)
+    unit : str
+        mass unit of the balance readings, e.g. 'g'
+    max_stdev : float
+        'Max stdev from CircWeigh (µg)' from the acceptance criteria for the balance
+    EXCL : float
+        criterion for excluding a single weighing within an automatic weighing sequence
+    early_stop : float or None
+        the weighing is stopped if the residual standard deviation exceeds early_stop * EXCL * max_stdev.
+        If None or 0, the weighing is never stopped early
+    final : bool
+        True if the planned (or already extended) cycles are all complete
+    timed : bool, optional
+        if True, uses times from weighings, otherwise assumes equally spaced in time
+    drift : str, optional
+        drift correction to use for the assessment (None to select the optimal drift correction)
+
+    Returns
+    -------
+    tuple of (decision, stdev in µg), where decision is one of CONTINUE, ABORT or EXTEND
+    """
+    if data.shape[0] < MIN_CYCLES:
+        return CONTINUE, None
+
+    drift, stdev = partial_fit(se, data, timed=timed, drift=drift)
+    if stdev is None:
+        return CONTINUE, None
+
+    stdev_ug = stdev * SUFFIX[unit] / SUFFIX['ug']
+    log.info(f'Residual std dev. after {data.shape[0]} cycles ({drift}): {np.round(stdev_ug, 3)} µg')
+
+    if early_stop and stdev_ug > early_stop * EXCL * max_stdev:
+        return ABORT, stdev_ug
+
+    if final and max_stdev < stdev_ug <= EXCL * max_stdev:
+        return EXTEND, stdev_ug
+
+    return CONTINUE, stdev_ug
@@ -56,7 +56,7 @@ def analyse_weighing(root, url, se, run_id, bal_mode, timed=False, drift=None, E
 
     log.info(f'CIRCULAR WEIGHING ANALYSIS for scheme entry {se} {run_id}')
 
-    weighing = CircWeigh(se)
+    weighing = CircWeigh(se, num_cycles=weighdata.shape[0])
     if timed:
         times = np.reshape(weighdata[:, :, 0], weighing.num_readings)
     else:
@@ -135,7 +135,7 @@ def analyse_weighing(root, url, se, run_id, bal_mode, timed=False, drift=None, E
 
 def analyse_old_weighing(cfg, filename, se, run_id):
     """Analyses a specific weighing run on file, with timed and drift parameters as specified in the configuration"""
-    url = cfg.folder + "\\" + filename + '.json'
+    url = os.path.join(cfg.folder, filename + '.json')
     root = check_for_existing_weighdata(cfg.folder, url, se)
     weighdata = root['Circular Weighings'][se]['measurement_' + run_id]
     bal_alias = weighdata.metadata.get('Balance')
@@ -157,7 +157,7 @@ def analyse_all_weighings_in_file(cfg, filename, se):
     se : :class:`str`
         scheme entry, as per standard format e.g. "1 1s 0.5+0.5s"
     """
-    url = cfg.folder + "\\" + filename + '.json'
+    url = os.path.join(cfg.folder, filename + '.json')
 
     i = 1
     while True:
@@ -202,7 +202,7 @@ def analyse_weighing_true_mass(
 
     log.info(f'CIRCULAR WEIGHING ANALYSIS for scheme entry {se} {run_id}')
 
-    weighing = CircWeigh(se)
+    weighing = CircWeigh(se, num_cycles=weighdata.shape[0])
 
     # cfg.timed : if `True`, uses times from weighings, otherwise assumes equally spaced in time
     if cfg.timed:
@@ -314,12 +314,12 @@ def wt_grp_vols_temp_corr(cfg: Configuration, root: JSONWriter, se: str, run_id:
     temp = float(weighdata.metadata.get('Mean T' + IN_DEGREES_C))
 
     # get weight groups
-    weighing = CircWeigh(se)
-    wt_grps = weighing.wtgrps
+    wt_grps = se.split()
 
     wt_grp_vols_20, wt_grp_vols_Tcorr = get_all_volumes(cfg, wt_grps, temp)
 
-    if not all(0.9 < i/wt_grp_vols_Tcorr.max() < 1.1 for i in wt_grp_vols_Tcorr):
+    ratios = wt_grp_vols_Tcorr / wt_grp_vols_Tcorr.max()
+    if not np.all((0.9 < ratios) & (ratios < 1.1)):
         log.warning(f"Volumes of weight groups differ by more than 10%: {wt_grp_vols_Tcorr}")
 
     weighdata.metadata["Weight group nominal volumes (mL)"] = wt_grp_vols_20
@@ -329,35 +329,9 @@ def wt_grp_vols_temp_corr(cfg: Configuration, root: JSONWriter, se: str, run_id:
 
 
 def get_all_volumes(cfg: Configuration, wt_grps: list[str], temp: float = 20.) -> tuple[np.ndarray, np.ndarray]:
-
-    # combine relevant parts of weight sets
-    all_wts = {'Weight ID': [], 'Expansion coeff (ppm/degC)': [], 'Vol (mL)': []}
-    for k, v in all_wts.items():
-        all_wts[k] = cfg.all_client_wts[k] + cfg.all_stds[k]
-        if cfg.all_checks:
-            all_wts[k] += cfg.all_checks[k]
-
-    # get volumes of weight groups, both nominal and also corrected for temperature
-    wt_grp_vols_20 = np.empty(len(wt_grps), dtype=float)  # nominal at 20 deg C
-    wt_grp_vols_Tcorr = np.empty(len(wt_grps), dtype=float)  # corrected for expansion due to ambient temperature
-    for g, grp in enumerate(wt_grps):
-        grp_vol = 0
-        grp_vol_20 = 0
-        for wt in grp.split("+"):
-            # get index of wt in mass set
-            try:
-                i = all_wts['Weight ID'].index(wt)
-            except ValueError:
-                raise ValueError(f"{wt} is not in any of the specified weight sets.")
-
-            nom_vol = all_wts['Vol (mL)'][i]
-            grp_vol_20 += nom_vol
-            grp_vol += corrected_volume(nom_vol, temp, all_wts['Expansion coeff (ppm/degC)'][i])
-
-        wt_grp_vols_20[g] = grp_vol_20
-        wt_grp_vols_Tcorr[g] = grp_vol
-
-    return wt_grp_vols_20, wt_grp_vols_Tcorr
+    """Returns the volumes in mL of the weight groups, both nominal (at 20 deg C) and corrected for expansion due to
+    the ambient temperature, using the group volumes worked out once for the Configuration"""
+    return cfg.group_volumes.volumes(wt_grps, temp)
 
 
 def true_mass_differences(
@@ -9,7 +9,7 @@ from msl.io import read
 
 from ..constants import MU_STR, SUFFIX
 from ..log import log
-from .run_circ_weigh import check_for_existing_weighdata
+from .json_circweigh_utils import check_for_existing_weighdata
 
 
 def collate_all_weighings(schemetable, cfg):
@@ -23,6 +23,35 @@ def collate_all_weighings(schemetable, cfg):
     cfg : :class:`Configuration`
         from mass_circular_weighing.configuration, as initialised during set-up
 
+    Returns
+    -------
+    data : numpy structured array
+        see collate_scheme_entries
+    """
+    entries = []
+    for row in range(schemetable.rowCount()):
+        if schemetable.cellWidget(row, 1).text():
+            entries.append({
+                'scheme_entry': schemetable.cellWidget(row, 0).text(),
+                'nominal': schemetable.cellWidget(row, 1).text(),
+                'bal_alias': schemetable.cellWidget(row, 2).currentText(),
+            })
+
+    return collate_scheme_entries(entries, cfg)
+
+
+def collate_scheme_entries(entries, cfg):
+    """Collects all data from acceptable weighings in existing json files for the given scheme entries
+    Selects appropriate collation method depending on mode of balance
+
+    Parameters
+    ----------
+    entries : list of dict
+        one dictionary for each scheme entry with keys 'scheme_entry', 'nominal' and 'bal_alias'
+        (e.g. the se_row_data for each row of the scheme)
+    cfg : :class:`Configuration`
+        from mass_circular_weighing.configuration, as initialised during set-up
+
     Returns
     -------
     data : numpy structured array
@@ -42,35 +71,34 @@ def collate_all_weighings(schemetable, cfg):
                     ]
                     )
 
-    for row in range(schemetable.rowCount()):
-        if schemetable.cellWidget(row, 1).text():
-            filename = client + '_' + schemetable.cellWidget(row, 1).text()
-            url = os.path.join(folder, filename + '.json')
-
-            bal_alias = schemetable.cellWidget(row, 2).currentText()
-            mode = cfg.equipment[bal_alias].user_defined['weighing_mode']
-            if 'aw' in mode:
-                newdata = collate_a_data_from_json(url, schemetable.cellWidget(row, 0).text())
-            else:
-                newdata = collate_m_data_from_json(url, schemetable.cellWidget(row, 0).text())
-            dlen = data.shape[0]
-            if newdata is not None:
-                # log.debug(schemetable.cellWidget(row, 0).text(), newdata)
-                ndlen = newdata.shape[0]
-                data.resize(dlen + ndlen)
-                data[-len(newdata):]['Nominal (g)'] = newdata[:]['Nominal (g)']
-                data[-len(newdata):]['Scheme entry'] = newdata[:]['Scheme entry']
-                data[-len(newdata):]['Run #'] = newdata[:]['Run #']
-                data[-len(newdata):]['+ weight group'] = newdata[:]['+ weight group']
-                data[-len(newdata):]['- weight group'] = newdata[:]['- weight group']
-                data[-len(newdata):]['mass difference (g)'] = newdata[:]['mass difference (g)']
-                data[-len(newdata):]['residual (' + MU_STR + 'g)'] = newdata[:]['residual (' + MU_STR + 'g)']
-                data[-len(newdata):]['balance uncertainty ('+MU_STR+'g)'] = newdata[:]['balance uncertainty ('+MU_STR+'g)']
-                data[-len(newdata):]['Acceptance met?'] = newdata[:]['Acceptance met?']
-                data[-len(newdata):]['Mean air density (kg/m3)'] = newdata[:]['Mean air density (kg/m3)']
-                data[-len(newdata):]['Stdev air density (kg/m3)'] = newdata[:]['Stdev air density (kg/m3)']
-
-                log.debug(f'Collated scheme entry {schemetable.cellWidget(row, 0).text()} from {url} ({mode} mode)')
+    for entry in entries:
+        se = entry['scheme_entry']
+        filename = client + '_' + entry['nominal']
+        url = os.path.join(folder, filename + '.json')
+
+        mode = cfg.equipment[entry['bal_alias']].user_defined['weighing_mode']
+        if 'aw' in mode:
+            newdata = collate_a_data_from_json(url, se)
+        else:
+            newdata = collate_m_data_from_json(url, se)
+        dlen = data.shape[0]
+        if newdata is not None:
+            # log.debug(se, newdata)
+            ndlen = newdata.shape[0]
+            data.resize(dlen + ndlen)
+            data[-len(newdata):]['Nominal (g)'] = newdata[:]['Nominal (g)']
+            data[-len(newdata):]['Scheme entry'] = newdata[:]['Scheme entry']
+            data[-len(newdata):]['Run #'] = newdata[:]['Run #']
+            data[-len(newdata):]['+ weight group'] = newdata[:]['+ weight group']
+            data[-len(newdata):]['- weight group'] = newdata[:]['- weight group']
+            data[-len(newdata):]['mass difference (g)'] = newdata[:]['mass difference (g)']
+            data[-len(newdata):]['residual (' + MU_STR + 'g)'] = newdata[:]['residual (' + MU_STR + 'g)']
+            data[-len(newdata):]['balance uncertainty ('+MU_STR+'g)'] = newdata[:]['balance uncertainty ('+MU_STR+'g)']
+            data[-len(newdata):]['Acceptance met?'] = newdata[:]['Acceptance met?']
+            data[-len(newdata):]['Mean air density (kg/m3)'] = newdata[:]['Mean air density (kg/m3)']
+            data[-len(newdata):]['Stdev air density (kg/m3)'] = newdata[:]['Stdev air density (kg/m3)']
+
+            log.debug(f'Collated scheme entry {se} from {url} ({mode} mode)')
 
     return data
 
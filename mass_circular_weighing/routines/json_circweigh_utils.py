@@ -1,6 +1,9 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 import os
+import json
+import threading
+from time import sleep, monotonic
 
 from datetime import datetime
 import numpy as np
@@ -16,6 +19,109 @@ from ..constants import local_backup
 if TYPE_CHECKING:
     from msl.io import JSONWriter
 
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+MANIFEST = 'backup_manifest.json'   # index of the local backup files in each local backup folder
+_manifest_lock = threading.Lock()
+
+
+try:
+    import msvcrt
+
+    def _lock_file(fp):
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock_file(fp):
+        fp.seek(0)
+        msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+except ImportError:
+    import fcntl
+
+    def _lock_file(fp):
+        fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock_file(fp):
+        fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+class DataFileLock(object):
+
+    poll_interval = 0.1  # time in seconds between attempts to lock the file while waiting for another process
+
+    def __init__(self, url):
+        """A lock for a json data file which is held by one thread of one process at a time, e.g. by a balance in
+        the weighing queue, which runs in its own process, or by the weighing window of the GUI.
+        The lock is a lock on the file url + '.lock', so it is released by the operating system if the process
+        holding it ends. Use as for :class:`threading.Lock`.
+
+        Parameters
+        ----------
+        url : path (full) to json file
+        """
+        self.path = url + '.lock'
+        self._thread_lock = threading.Lock()  # as an open file may be locked again by another thread of the process
+        self._fp = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        """Acquires the lock, waiting for it if blocking is True (for at most timeout seconds if timeout >= 0).
+        Returns True if the lock was acquired."""
+        deadline = None if timeout < 0 else monotonic() + timeout
+        if not self._thread_lock.acquire(blocking, timeout):
+            return False
+        fp = open(self.path, mode='a')
+        while True:
+            try:
+                _lock_file(fp)
+                self._fp = fp
+                return True
+            except OSError:
+                if not blocking or (deadline is not None and monotonic() >= deadline):
+                    fp.close()
+                    self._thread_lock.release()
+                    return False
+                sleep(self.poll_interval)
+
+    def release(self):
+        fp, self._fp = self._fp, None
+        _unlock_file(fp)
+        fp.close()
+        self._thread_lock.release()
+
+    def locked(self):
+        return self._thread_lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def data_file_lock(url):
+    """Returns the lock for a json data file, for use when weighings on several balances, or in the weighing queue
+    and the GUI, run at the same time. The lock should be held from reading the file (check_for_existing_weighdata)
+    until the last save_data for the scheme entry, so that the root of one weighing is never overwritten by the root
+    of another.
+
+    Parameters
+    ----------
+    url : path (full) to json file
+
+    Returns
+    -------
+    :class:`DataFileLock`
+        the same instance for each call with the same file
+    """
+    key = os.path.normcase(os.path.abspath(url))
+    with _file_locks_lock:
+        if key not in _file_locks:
+            _file_locks[key] = DataFileLock(key)
+        return _file_locks[key]
+
 
 def check_for_existing_weighdata(folder, url, se):
     """Reads json file, if it exists, and loads as root object.  Saves backup of existing file.
@@ -66,18 +172,91 @@ def save_data(root: JSONWriter, url: str, run_id: str, timestamp: datetime = dat
     # ensure a unique filename in case of intermittent internet
     local_file = os.path.join(
         local_folder,
-        os.path.basename(url).strip('.json') + f'_{run_id}_{timestamp.strftime("%Y%m%d_%H%M%S")}.json'
+        os.path.splitext(os.path.basename(url))[0] + f'_{run_id}_{timestamp.strftime("%Y%m%d_%H%M%S")}.json'
     )
     if not os.path.exists(local_folder):
         os.makedirs(local_folder)
     root.save(file=local_file, mode='w', encoding='utf-8', ensure_ascii=False)
     try:
         root.save(file=url, mode='w', encoding='utf-8', ensure_ascii=False)
-        return True
+        network_ok = True
     except FileNotFoundError:
         log.warning(f'Unable to save to {url}. Please check network connection.')
         log.info(f"Data saved to {local_file}")
-        return False
+        network_ok = False
+    try:
+        add_to_manifest(local_file, summarise_backup(root, run_id, timestamp), network_ok)
+    except OSError as e:
+        log.warning(f'Unable to update the backup manifest: {e}')
+    return network_ok
+
+
+def summarise_backup(root, run_id, timestamp):
+    """Lists the weighings which a local backup file was saved for: those with measurement_<run_id>
+    which started at timestamp
+
+    Returns
+    -------
+    list of [scheme entry, run_id, Mmt Timestamp, Weighing complete, has analysis]
+    """
+    mmt_timestamp = timestamp.strftime('%d-%m-%Y %H:%M:%S')
+    runs = []
+    if 'Circular Weighings' not in root:
+        return runs
+    for group in root['Circular Weighings'].groups():
+        if 'measurement_' + run_id not in group:
+            continue
+        weighdata = group['measurement_' + run_id]
+        if weighdata.metadata.get('Mmt Timestamp') != mmt_timestamp:
+            continue
+        runs.append([
+            group.name.split('/')[-1], run_id, mmt_timestamp,
+            bool(weighdata.metadata.get('Weighing complete')), 'analysis_' + run_id in group,
+        ])
+    return runs
+
+
+def read_manifest(local_folder):
+    """Returns the manifest of the local backup files in local_folder, as a dict of file name: entry"""
+    path = os.path.join(local_folder, MANIFEST)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, mode='r', encoding='utf-8') as fp:
+            return json.load(fp)
+    except ValueError:
+        log.warning(f'Backup manifest {path} is corrupt and will be rebuilt')
+        return {}
+
+
+def write_manifest(local_folder, manifest):
+    """Saves the manifest, replacing the manifest file only once the new file is completely written"""
+    path = os.path.join(local_folder, MANIFEST)
+    with open(path + '.tmp', mode='w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=1, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def add_to_manifest(local_file, runs, network_ok):
+    """Records a local backup file in the manifest of its folder, with its size and modification time
+    so that the file need not be read again unless it changes
+
+    Parameters
+    ----------
+    local_file : path
+    runs : list
+        see summarise_backup
+    network_ok : bool or None
+        whether the same data was also saved to the network file, or None if unknown
+    """
+    local_folder, name = os.path.split(local_file)
+    stat = os.stat(local_file)
+    with _manifest_lock:
+        manifest = read_manifest(local_folder)
+        entry = manifest.get(name, {})
+        entry.update({'size': stat.st_size, 'mtime': stat.st_mtime, 'runs': runs, 'network saved': network_ok})
+        manifest[name] = entry
+        write_manifest(local_folder, manifest)
 
 
 def add_air_densities(root):
@@ -0,0 +1,169 @@
+"""
+Headless processing of a calibration from the command line, without the gui or Qt:
+analysis of all circular weighings in the scheme, collation of the mass differences, the final mass calculation,
+and export of the LaTeX and Excel summaries.
+"""
+import os
+import numpy as np
+
+from ..constants import MU_STR, NBC
+from ..log import log
+from ..routine_classes.final_mass_calc_class import FinalMassCalc, filter_mass_set
+
+from .analyse_circ_weigh import analyse_all_weighings_in_file
+from .collate_data import collate_scheme_entries
+from .report_results import export_results_summary
+from .weighing_queue import scheme_to_entries
+
+
+def select_datasets(data, included='accepted'):
+    """Selects the collated mass differences to include in the final mass calculation,
+    as for the checkboxes in the final mass calculation window
+
+    Parameters
+    ----------
+    data : numpy structured array
+        collated data from collate_scheme_entries
+    included : str or set, optional
+        'accepted' (default) to include only weighings which met the acceptance criteria,
+        'all' to include all collated weighings, or a set of (nominal mass, scheme entry, run) tuples as strings,
+        e.g. {('1000.0', '1000 1000MA 1000MB', '1')}. A run # of the form '1+2+3' is included if any of its runs is.
+
+    Returns
+    -------
+    tuple of (inputdata, included_datasets) where inputdata is the structured array for FinalMassCalc and
+    included_datasets is the set of (nominal mass, scheme entry, run) for the report summaries
+    """
+    included_datasets = set()
+    rows = []
+    for i in range(len(data)):
+        nominal = str(data['Nominal (g)'][i])
+        se = data['Scheme entry'][i]
+        runs = str(data['Run #'][i]).split('+')
+        if included == 'accepted':
+            use = data['Acceptance met?'][i]
+        elif included == 'all':
+            use = True
+        else:
+            use = any((nominal, se, run) in included for run in runs)
+        if use:
+            rows.append(i)
+            for run in runs:
+                included_datasets.add((nominal, se, run))
+
+    inputdata = np.empty(len(rows),
+                         dtype=[('+ weight group', object), ('- weight group', object),
+                                ('mass difference (g)', 'float64'),
+                                ('balance uncertainty (' + MU_STR + 'g)', 'float64')])
+    for key in inputdata.dtype.names:
+        inputdata[key] = data[key][rows]
+
+    return inputdata, included_datasets
+
+
+def read_datasets_file(path):
+    """Reads a selection of datasets from a text file with one dataset per line, as nominal mass, scheme entry, run
+    separated by commas, e.g. 1000, 1000 1000MA 1000MB, 2"""
+    datasets = set()
+    with open(path, mode='r', encoding='utf-8') as fp:
+        for line in fp:
+            if not line.strip() or line.startswith('#'):
+                continue
+            nominal, se, run = [item.strip() for item in line.split(',')]
+            datasets.add((str(float(nominal)), se, run.replace('run_', '')))
+
+    return datasets
+
+
+def run_pipeline(cfg, included='accepted', analyse=True, export=True):
+    """Analyses, collates, calculates and reports the calibration described by the Admin.xlsx file
+
+    Parameters
+    ----------
+    cfg : :class:`Configuration`
+    included : str or set, optional
+        selection of datasets for the final mass calculation (see select_datasets)
+    analyse : bool, optional
+        if True (default), all weighings on file are reanalysed with the drift and timing options in cfg
+    export : bool, optional
+        if True (default), the LaTeX and Excel summaries are saved in the client folder
+
+    Returns
+    -------
+    :class:`FinalMassCalc` or None if no calculation was possible
+    """
+    if cfg.all_stds is None:
+        cfg.init_ref_mass_sets()
+    if not cfg.scheme:
+        log.error('No weighing scheme found in ' + cfg.path)
+        return None
+    entries = scheme_to_entries(*cfg.scheme)
+
+    if analyse:
+        for entry in entries:
+            filename = cfg.client + '_' + entry['nominal']
+            if os.path.isfile(os.path.join(cfg.folder, filename + '.json')):
+                analyse_all_weighings_in_file(cfg, filename, entry['scheme_entry'])
+
+    data = collate_scheme_entries(entries, cfg)
+    inputdata, included_datasets = select_datasets(data, included)
+    if len(inputdata) == 0:
+        log.error('No comparisons selected for the final mass calculation')
+        return None
+
+    client_masses = filter_mass_set(cfg.all_client_wts, inputdata)
+    if cfg.all_checks is not None:
+        check_masses = filter_mass_set(cfg.all_checks, inputdata)
+    else:
+        check_masses = None
+    std_masses = filter_mass_set(cfg.all_stds, inputdata)
+    if len(std_masses['Weight ID']) == 0:
+        log.error('No standard masses included. Check mass sets are correct.')
+        return None
+
+    fmc = FinalMassCalc(cfg.folder, cfg.client, client_masses, check_masses, std_masses, inputdata, NBC,
+                        cfg.correlations)
+    fmc.add_data_to_root()
+    fmc.save_to_json_file()
+
+    if export:
+        if cfg.all_checks:
+            check_set = f"Sheet {cfg.all_checks['Sheet name']} in {cfg.massref_path}"
+        else:
+            check_set = None
+        export_results_summary(
+            cfg,
+            check_set,
+            f"Sheet {cfg.all_stds['Sheet name']} in {cfg.massref_path}",
+            included_datasets,
+            interactive=False,
+        )
+
+    return fmc
+
+
+def pipeline_cli():
+    """Console entry point for run_pipeline. See mcw-pipeline --help for usage"""
+    import argparse
+    from ..configuration import Configuration
+
+    parser = argparse.ArgumentParser(
+        prog='mcw-pipeline',
+        description='Analyse, collate, calculate and report a mass calibration without the gui',
+    )
+    parser.add_argument('admin', help='path to the Admin.xlsx file')
+    parser.add_argument('--include', default='accepted',
+                        help="datasets for the final mass calculation: 'accepted' (default), 'all', or the path to "
+                             "a text file with one dataset per line as: nominal mass, scheme entry, run")
+    parser.add_argument('--no-analysis', action='store_true', help='use the existing analysis of each weighing')
+    parser.add_argument('--no-export', action='store_true', help='do not export the LaTeX and Excel summaries')
+    args = parser.parse_args()
+
+    included = args.include
+    if included not in ['accepted', 'all']:
+        included = read_datasets_file(included)
+
+    cfg = Configuration(args.admin)
+    fmc = run_pipeline(cfg, included=included, analyse=not args.no_analysis, export=not args.no_export)
+
+    return 0 if fmc is not None else 1
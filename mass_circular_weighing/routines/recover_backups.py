@@ -0,0 +1,197 @@
+"""
+Recovery of weighings which were saved only to the local backup folder, e.g. during a network outage.
+The local backups of the json files in a folder are merged into the (network) json files, using the manifest of
+the local backup folder to skip files which have already been merged or which were also saved to the network.
+"""
+import os
+import re
+from datetime import datetime
+
+from msl.io import JSONWriter, read
+
+from ..constants import local_backup
+from ..log import log
+
+from .json_circweigh_utils import data_file_lock, summarise_backup, read_manifest, write_manifest, _manifest_lock
+
+# local backup files are named <file>_<run_id>_<YYYYmmdd_HHMMSS>.json by save_data
+BACKUP_NAME = re.compile(r'^(?P<file>.+)_(?P<run_id>run_\d+)_(?P<timestamp>\d{8}_\d{6})\.json$')
+RUN_DATASETS = ['measurement_', 'analysis_', 'timing_']
+
+
+def index_backups(local_folder):
+    """Brings the manifest of a local backup folder up to date. Only files which are new or have changed since
+    they were last indexed are read.
+
+    Returns
+    -------
+    dict
+        the manifest, of file name: entry
+    """
+    with _manifest_lock:
+        manifest = read_manifest(local_folder)
+        names = [f for f in os.listdir(local_folder) if BACKUP_NAME.match(f)]
+        changed = False
+        for name in list(manifest):
+            if name not in names:
+                del manifest[name]
+                changed = True
+        for name in names:
+            stat = os.stat(os.path.join(local_folder, name))
+            entry = manifest.get(name)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+            m = BACKUP_NAME.match(name)
+            log.debug(f'Indexing local backup {name}')
+            runs = summarise_backup(read(os.path.join(local_folder, name)), m['run_id'],
+                                    datetime.strptime(m['timestamp'], '%Y%m%d_%H%M%S'))
+            manifest[name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'runs': runs, 'network saved': None}
+            changed = True
+        if changed:
+            write_manifest(local_folder, manifest)
+    return manifest
+
+
+def _needs_merge(group, run, entry):
+    """Whether the weighing in a backup is missing from, or more complete than, the group of the network file"""
+    se, run_id, mmt_timestamp, complete, analysed = run
+    existing = find_run(group, mmt_timestamp)
+    if existing is None:
+        return True
+    if entry['network saved'] is False:
+        return True  # the backup was saved after the last save to the network file
+    weighdata = group['measurement_' + existing]
+    if complete and not weighdata.metadata.get('Weighing complete'):
+        return True
+    return analysed and 'analysis_' + existing not in group
+
+
+def find_run(group, mmt_timestamp):
+    """Returns the run_id of the weighing in group which started at mmt_timestamp, or None"""
+    for dataset in group.datasets():
+        name = dataset.name.split('/')[-1]
+        if name.startswith('measurement_') and dataset.metadata.get('Mmt Timestamp') == mmt_timestamp:
+            return name[len('measurement_'):]
+    return None
+
+
+def next_run_id(group):
+    i = 1
+    while 'measurement_run_' + str(i) in group:
+        i += 1
+    return 'run_' + str(i)
+
+
+def merge_run(root, backup, run):
+    """Copies the datasets of a weighing from the backup root into root. The weighing keeps its run_id unless
+    that run_id is already used in root by a different weighing, in which case it gets the next free run_id.
+
+    Returns
+    -------
+    str
+        the run_id of the weighing in root
+    """
+    se, run_id, mmt_timestamp = run[:3]
+    group = root.require_group('Circular Weighings').require_group(se)
+    target = find_run(group, mmt_timestamp)
+    if target is None:
+        target = run_id if 'measurement_' + run_id not in group else next_run_id(group)
+    source = backup['Circular Weighings'][se]
+    for prefix in RUN_DATASETS:
+        if prefix + target in group:
+            root.remove(group[prefix + target].name)
+        if prefix + run_id in source:
+            dataset = source[prefix + run_id]
+            group.require_dataset(prefix + target, data=dataset.data).add_metadata(**dataset.metadata)
+    return target
+
+
+def back_up(root, existing_root, folder, file):
+    """Saves a copy of a json file before it is changed, in the backups folder as for check_for_existing_weighdata"""
+    back_up_folder = os.path.join(folder, "backups")
+    if not os.path.exists(back_up_folder):
+        os.makedirs(back_up_folder)
+    new_index = len(os.listdir(back_up_folder))
+    new_file = os.path.join(back_up_folder, file + '_backup{}.json'.format(new_index))
+    root.save(root=existing_root, file=new_file, mode='w', encoding='utf-8', ensure_ascii=False)
+
+
+def recover_backups(folder, local_backup_folder=local_backup, dry_run=False):
+    """Merges weighings from the local backups of the json files in folder into the json files themselves.
+    For each weighing, the newest backup is used. A network file is backed up (as in check_for_existing_weighdata)
+    before it is changed.
+
+    Parameters
+    ----------
+    folder : path
+        the (network) folder of the json files, e.g. cfg.folder
+    local_backup_folder : path, optional
+        as passed to save_data
+    dry_run : bool, optional
+        if True, reports what would be merged without changing any file
+
+    Returns
+    -------
+    dict
+        for each json file changed, a list of (scheme entry, run_id in the backup, run_id in the file)
+    """
+    local_folder = os.path.join(local_backup_folder, os.path.split(os.path.normpath(folder))[-1])
+    if not os.path.isdir(local_folder):
+        log.info(f'No local backups for {folder}')
+        return {}
+    manifest = index_backups(local_folder)
+
+    # the newest backup of each weighing, for each json file
+    newest = {}
+    considered = {}
+    for name, entry in manifest.items():
+        if entry.get('merged') == [entry['size'], entry['mtime']]:
+            continue
+        file = BACKUP_NAME.match(name)['file']
+        considered.setdefault(file, []).append(name)
+        for run in entry['runs']:
+            key = (run[0], run[2])  # scheme entry and Mmt Timestamp identify a weighing
+            current = newest.setdefault(file, {}).get(key)
+            if current is None or manifest[current[0]]['mtime'] < entry['mtime']:
+                newest[file][key] = (name, run)
+
+    merged = {}
+    for file, weighings in newest.items():
+        url = os.path.join(folder, file + '.json')
+        with data_file_lock(url):
+            root = JSONWriter()
+            existing_root = None
+            if os.path.isfile(url):
+                existing_root = read(url)
+                existing_root.read_only = False
+                root.set_root(existing_root)
+            backups = {}
+            for name, run in weighings.values():
+                group = root.require_group('Circular Weighings').require_group(run[0])
+                if not _needs_merge(group, run, manifest[name]):
+                    continue
+                if dry_run:
+                    target = run[1]
+                else:
+                    if existing_root is not None and url not in merged:
+                        back_up(root, existing_root, folder, file)
+                    if name not in backups:
+                        backups[name] = read(os.path.join(local_folder, name))
+                    target = merge_run(root, backups[name], run)
+                merged.setdefault(url, []).append((run[0], run[1], target))
+                log.info(f'Recovered {run[0]} {run[1]} from {name} into {url} as {target}')
+
+            if url in merged and not dry_run:
+                root.save(file=url, mode='w', encoding='utf-8', ensure_ascii=False)
+
+        if not dry_run:
+            with _manifest_lock:
+                manifest = read_manifest(local_folder)
+                for name in considered[file]:
+                    if name in manifest:
+                        manifest[name]['merged'] = [manifest[name]['size'], manifest[name]['mtime']]
+                write_manifest(local_folder, manifest)
+
+    if not merged:
+        log.info(f'The json files in {folder} are up to date with the local backups')
+    return merged
@@ -8,14 +8,12 @@ import numpy as np
 from msl.io import read
 
 from ..log import log
-from ..gui.threads.prompt_thread import PromptThread
-pt = PromptThread()
 # from ..routine_classes.results_summary_Word import WordDoc
 from ..routine_classes.results_summary_LaTeX import LaTexDoc
 from ..routine_classes.results_summary_Excel import ExcelSummaryWorkbook
 
 
-def export_results_summary(cfg, check_file, std_file, incl_datasets):
+def export_results_summary(cfg, check_file, std_file, incl_datasets, interactive=True):
     """Export results summaries to LaTeX and Excel
 
     Parameters
@@ -28,6 +26,9 @@ def export_results_summary(cfg, check_file, std_file, incl_datasets):
         path to reference mass set file for standards
     incl_datasets : set
         set of included datasets as (nominal mass, scheme entry, run)
+    interactive : bool, optional
+        if True (default), the user is prompted for any missing information and notified on completion.
+        Set to False to export without Qt, e.g. from the command line.
 
     Returns
     -------
@@ -62,7 +63,7 @@ def export_results_summary(cfg, check_file, std_file, incl_datasets):
 
     # make Excel summary file
     # xl_output_file = os.path.join(cfg.folder, cfg.client + '_Summary.xlsx')
-    xl = ExcelSummaryWorkbook(cfg)
+    xl = ExcelSummaryWorkbook(cfg, interactive=interactive)
     xl.format_scheme_file()
     xl.add_mls(fmc_root)
     xl.add_all_cwdata(cfg, incl_datasets)
@@ -83,5 +84,8 @@ def export_results_summary(cfg, check_file, std_file, incl_datasets):
     # log.info("Word file saved to {}".format(save_file))
 
     log.info("File export complete")
-    pt.show('information', "File export complete")
-    pt.wait_for_prompt_reply()
+    if interactive:
+        from ..gui.threads.prompt_thread import PromptThread
+        pt = PromptThread()
+        pt.show('information', "File export complete")
+        pt.wait_for_prompt_reply()
@@ -1,16 +1,16 @@
 """
 The main circular weighing routine and associated functions
 """
-from time import perf_counter
 from datetime import datetime
 
 from .. import __version__
 from ..routine_classes.circ_weigh_class import CircWeigh
-from ..constants import local_backup
-from ..equip import check_ambient_pre, check_ambient_post
+from ..constants import local_backup, MU_STR
 from ..log import log
+from ..utils.phase_timer import PhaseTimer, PHASES
 
 from .json_circweigh_utils import *
+from .adaptive_stop import assess_cycles, ABORT, EXTEND
 
 tab = '  '
 
@@ -98,7 +98,8 @@ def check_bal_initialised(bal, wtgrps):
 
 # do_circ_weighing is called by the gui's weighing window
 def do_circ_weighing(bal, se, root, url, run_id, callback1=None, callback2=None,
-                     local_backup_folder=local_backup, **metadata):
+                     local_backup_folder=local_backup, EXCL=3, early_stop=None, extra_cycles=0,
+                     timed=False, drift=None, **metadata):
     """Routine to run a circular weighing by collecting data from a balance.
     This routine currently requires a Vaisala or an OMEGA logger to be specified in the registers
     for monitoring of the ambient conditions
@@ -120,12 +121,26 @@ def do_circ_weighing(bal, se, root, url, run_id, callback1=None, callback2=None,
     callback2
         used by gui
     local_backup_folder : path
+    EXCL : float, optional
+        criterion for excluding a single weighing within an automatic weighing sequence
+    early_stop : float, optional
+        for automatic weighings, the weighing is stopped after any completed cycle if the residual standard deviation
+        exceeds early_stop * EXCL * max stdev. If None (default) the weighing is never stopped early.
+    extra_cycles : int, optional
+        for automatic weighings, the maximum number of cycles which may be added to a borderline weighing
+    timed : bool, optional
+        passed to the drift fit used to assess the weighing after each cycle
+    drift : str, optional
+        passed to the drift fit used to assess the weighing after each cycle
     metadata : :class:`dict`
 
     Returns
     -------
-    msl.io root object if weighing was completed, False if weighing was not started, or None if weighing was aborted.
+    msl.io root object if weighing was completed or stopped early (in which case 'Weighing complete' is False),
+    False if weighing was not started, or None if weighing was aborted.
     """
+    from ..equip import check_ambient_pre, check_ambient_post
+
     metadata['Program Version'] = __version__
     timestamp = datetime.now()
     metadata['Mmt Timestamp'] = timestamp.strftime('%d-%m-%Y %H:%M:%S')
@@ -161,37 +176,80 @@ def do_circ_weighing(bal, se, root, url, run_id, callback1=None, callback2=None,
     weighdata = root['Circular Weighings'][se].require_dataset('measurement_' + run_id, data=data)
     weighdata.add_metadata(**metadata)
 
+    # automatic weighings are assessed after each cycle if a stop or extension policy is set
+    max_stdev = metadata.get('Max stdev from CircWeigh ('+MU_STR+'g)')
+    adaptive = 'aw' in bal.mode and max_stdev is not None and (early_stop or extra_cycles)
+    num_cycles = weighing.num_cycles
+    stdev = None
+
+    # the time taken for each reading is divided between the phases of loading, reading, saving and unloading
+    timer = PhaseTimer(bal.clock)
+    bal.timer = timer
+
     # do circular weighing, allowing for user to cancel weighing:
     reading = None
+    cycle = 0
     while not bal.want_abort:
         times = []
         t0 = 0
-        for cycle in range(weighing.num_cycles):
+        while cycle < num_cycles:
             for i in range(weighing.num_wtgrps):
                 if callback1 is not None:
-                    callback1(cycle+1, positions[i], weighing.num_cycles, weighing.num_wtgrps)
+                    callback1(cycle+1, positions[i], num_cycles, weighing.num_wtgrps)
                 mass = weighing.wtgrps[i]
+                timer.begin_reading('move')
                 ok = bal.load_bal(mass, positions[i])
                 if 'aw' in bal.mode:
                     if not ok:
+                        bal.timer = None
                         return None
+                timer.start('read')
                 reading = bal.get_mass_stable(mass)
                 if callback2 is not None:
                     callback2(reading, str(metadata['Unit']))
                 if not times:
                     time = 0
-                    t0 = perf_counter()
+                    t0 = bal.clock()
                 else:
-                    time = np.round((perf_counter() - t0) / 60, 6)  # elapsed time in minutes
+                    time = np.round((bal.clock() - t0) / 60, 6)  # elapsed time in minutes
                 times.append(time)
                 weighdata[cycle, i, :] = [time, reading]
                 if reading is not None:
+                    timer.start('save')
                     network_ok = save_data(root, url, run_id, timestamp, local_backup_folder, )
                     if not network_ok:
                         metadata['Network issues'] = True
+                timer.start('unload')
                 bal.unload_bal(mass, positions[i])
+                timer.end_reading(cycle + 1, positions[i], mass)
+            cycle += 1
+
+            if adaptive and not bal.want_abort:
+                decision, stdev = assess_cycles(
+                    se, weighdata[:cycle, :, :], metadata['Unit'], max_stdev, EXCL, early_stop=early_stop,
+                    final=cycle == num_cycles, timed=timed, drift=drift,
+                )
+                if decision == ABORT:
+                    break
+                if decision == EXTEND and num_cycles < weighing.num_cycles + extra_cycles:
+                    num_cycles += 1
+                    log.info(f'Borderline weighing: adding cycle {num_cycles}')
+                    metadata['Extra cycles'] = num_cycles - weighing.num_cycles
+                    weighdata = add_cycles(root, se, run_id, weighdata, 1, metadata)
         break
 
+    bal.timer = None
+    add_timing(root, se, run_id, timer)
+
+    if cycle < num_cycles and not bal.want_abort:
+        log.warning(f'Weighing stopped early as residual std dev. of {np.round(stdev, 3)} {MU_STR}g after '
+                    f'{cycle} cycles is far outside the exclusion criterion')
+        metadata['Stopped early'] = f'after {cycle} of {num_cycles} cycles; residual std dev. {stdev} {MU_STR}g'
+        metadata['Mmt end time'] = datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+        trim_cycles(root, se, run_id, weighdata, cycle, metadata)
+        save_data(root, url, run_id, timestamp, local_backup_folder)
+        return root
+
     while not bal.want_abort:
         ambient_post = check_ambient_post(ambient_pre, bal.ambient_details, bal.mode)
         for key, value in ambient_post.items():
@@ -220,6 +278,62 @@ def do_circ_weighing(bal, se, root, url, run_id, callback1=None, callback2=None,
     return None
 
 
+def add_timing(root, se, run_id, timer):
+    """Adds the durations of the phases of each reading in a weighing to the root as a dataset timing_run_N
+    alongside measurement_run_N, and summarises them in the log
+
+    Parameters
+    ----------
+    root : :class:`root`
+    se : str
+    run_id : str
+    timer : :class:`~mass_circular_weighing.utils.phase_timer.PhaseTimer`
+    """
+    if not timer.rows:
+        return None
+    summary = timer.summary()
+    timing = root['Circular Weighings'][se].require_dataset('timing_' + run_id, data=timer.table())
+    timing.add_metadata(**{
+        'Time unit': 's',
+        'Mean time per reading (s)': np.round(summary['total'], 1),
+        'Mean phase durations (s)': {p: np.round(summary[p], 1) for p in PHASES},
+    })
+    log.info(f"Mean time per reading of {np.round(summary['total'], 1)} s: " +
+             ', '.join(f'{p} {np.round(summary[p], 1)} s' for p in PHASES))
+
+    return timing
+
+
+def add_cycles(root, se, run_id, weighdata, num_extra, metadata):
+    """Extends the measurement dataset of a weighing in progress by num_extra (empty) cycles
+
+    Returns
+    -------
+    the new measurement dataset, containing the data collected so far and the metadata
+    """
+    data = np.concatenate((weighdata[:, :, :], np.empty(shape=(num_extra,) + weighdata.shape[1:])))
+    root.remove(weighdata.name)
+    weighdata = root['Circular Weighings'][se].require_dataset('measurement_' + run_id, data=data)
+    weighdata.add_metadata(**metadata)
+
+    return weighdata
+
+
+def trim_cycles(root, se, run_id, weighdata, num_cycles, metadata):
+    """Shortens the measurement dataset of a weighing which was stopped early to the num_cycles completed cycles
+
+    Returns
+    -------
+    the new measurement dataset, containing the data of the completed cycles and the metadata
+    """
+    data = weighdata[:num_cycles, :, :]
+    root.remove(weighdata.name)
+    weighdata = root['Circular Weighings'][se].require_dataset('measurement_' + run_id, data=data)
+    weighdata.add_metadata(**metadata)
+
+    return weighdata
+
+
 def elapsed_duration(duration):
     duration_in_s = duration.total_seconds()
     hours = int(divmod(duration_in_s, 3600)[0])  # Seconds in an hour = 3600
@@ -0,0 +1,544 @@
+"""
+A queue of scheme entries to be weighed back to back on automatic balances without the weighing window,
+e.g. for running the whole weighing scheme overnight.
+Scheme entries are grouped by balance, and for each balance into loadings: sets of weight groups which fit into
+the available positions on the weight handler, so that entries sharing a loading run without operator intervention.
+Balances may be run one after the other, or concurrently with a worker thread for each balance, in which case the
+main thread connects to the balances and shows any prompts for the operator, as Qt may only be used in the main thread.
+The state of the queue is saved after every change so that the queue can be resumed after a crash.
+"""
+import os
+import json
+import threading
+from queue import Queue, Empty
+from datetime import datetime
+
+from ..constants import MAX_BAD_RUNS
+from ..log import log
+from ..routine_classes.circ_weigh_class import CircWeigh
+
+from .json_circweigh_utils import check_for_existing_weighdata, data_file_lock
+from .run_circ_weigh import check_existing_runs, check_bal_initialised, do_circ_weighing
+from .analyse_circ_weigh import analyse_weighing
+
+# status of each scheme entry in the queue
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+QUEUE_SUFFIX = '_weighing_queue.json'
+
+
+def scheme_to_entries(header, rows):
+    """Converts a weighing scheme, e.g. as loaded from the Scheme sheet of the Admin.xlsx file,
+    to a list of se_row_data dictionaries with keys ['row', 'scheme_entry', 'nominal', 'bal_alias', 'num_runs']
+
+    Parameters
+    ----------
+    header : list
+        column headings of the scheme
+    rows : list of lists
+        one row for each scheme entry
+
+    Returns
+    -------
+    list of dict
+    """
+    index_map = {}
+    for col_name in ['weight', 'nominal', 'balance', 'runs']:
+        for i, name in enumerate(header):
+            if name and col_name in str(name).lower():
+                index_map[col_name] = i
+    if len(index_map) < 4:
+        log.error('Unable to create weighing queue from scheme with columns {}'.format(header))
+        return []
+
+    entries = []
+    for i, row in enumerate(rows):
+        if not row[index_map['weight']]:
+            continue
+        nominal = row[index_map['nominal']]
+        if float(nominal) == int(float(nominal)):
+            nominal = int(float(nominal))
+        entries.append({
+            'row': i,
+            'scheme_entry': str(row[index_map['weight']]).strip(),
+            'nominal': str(nominal),
+            'bal_alias': str(row[index_map['balance']]),
+            'num_runs': str(row[index_map['runs']]),
+        })
+
+    return entries
+
+
+def plan_loadings(wtgrps_list, num_pos):
+    """Allocates the weight groups of several scheme entries to as few loadings of the weight handler as possible,
+    by adding each scheme entry in turn to the first loading with enough free positions.
+
+    Parameters
+    ----------
+    wtgrps_list : list of lists
+        weight groups for each scheme entry, e.g. [se.split() for se in scheme_entries]
+    num_pos : int
+        number of positions available on the weight handler
+
+    Returns
+    -------
+    tuple of (loadings, allocation) where loadings is a list of lists of weight groups, with the position of each
+    weight group being its index in the list + 1, and allocation is the index of the loading for each scheme entry,
+    or None if the scheme entry has too many weight groups for the weight handler
+    """
+    loadings = []
+    allocation = []
+    for wtgrps in wtgrps_list:
+        if len(wtgrps) > num_pos:
+            allocation.append(None)
+            continue
+        for i, loading in enumerate(loadings):
+            new_grps = [grp for grp in wtgrps if grp not in loading]
+            if len(loading) + len(new_grps) <= num_pos:
+                loading.extend(new_grps)
+                allocation.append(i)
+                break
+        else:
+            loadings.append(list(wtgrps))
+            allocation.append(len(loadings) - 1)
+
+    return loadings, allocation
+
+
+def order_entries(cfg, entries):
+    """Orders scheme entries for the queue: by balance (in order of first appearance in the scheme),
+    and for automatic balances by loading, keeping the order of the scheme within each loading.
+    Entries on balances without a weight handler are skipped as these need an operator for every reading.
+
+    Parameters
+    ----------
+    cfg : :class:`Configuration`
+    entries : list of dict
+        se_row_data dictionaries, e.g. from scheme_to_entries
+
+    Returns
+    -------
+    list of dict
+        entries with the additional keys 'loading', 'positions', 'status' and 'good runs'
+    """
+    balances = []
+    for entry in entries:
+        if entry['bal_alias'] not in balances:
+            balances.append(entry['bal_alias'])
+
+    ordered = []
+    for alias in balances:
+        bal_entries = [dict(entry) for entry in entries if entry['bal_alias'] == alias]
+        try:
+            record = cfg.equipment[alias]
+        except KeyError:
+            log.error(f'No equipment record for balance {alias}')
+            record = None
+        if record is None or 'aw' not in record.user_defined['weighing_mode']:
+            for entry in bal_entries:
+                log.warning(f"{entry['scheme_entry']} skipped as {alias} is not an automatic balance")
+                entry.update({'loading': None, 'positions': None, 'status': SKIPPED, 'good runs': 0})
+            ordered += bal_entries
+            continue
+
+        num_pos = int(record.user_defined['pos'])
+        loadings, allocation = plan_loadings([entry['scheme_entry'].split() for entry in bal_entries], num_pos)
+        for entry, i in zip(bal_entries, allocation):
+            if i is None:
+                log.warning(f"{entry['scheme_entry']} skipped as it has too many weight groups for {alias}")
+                entry.update({'loading': None, 'positions': None, 'status': SKIPPED, 'good runs': 0})
+            else:
+                positions = [loadings[i].index(grp) + 1 for grp in entry['scheme_entry'].split()]
+                entry.update({'loading': loadings[i], 'positions': positions, 'status': PENDING, 'good runs': 0})
+
+        ordered += sorted(bal_entries, key=lambda e: -1 if e['loading'] is None else loadings.index(e['loading']))
+
+    return ordered
+
+
+class WeighingQueue(object):
+
+    def __init__(self, path, entries=None):
+        """A queue of scheme entries which is saved to a json file after every change.
+
+        Parameters
+        ----------
+        path : path
+            path to the json file for the queue state
+        entries : list of dict, optional
+            ordered entries for a new queue (see order_entries). If the file at path already holds a queue for
+            the same scheme entries, the saved state is resumed instead.
+        """
+        self.path = path
+        self.entries = []
+        self._lock = threading.RLock()   # the queue is shared by the worker threads for each balance
+        saved = self.load()
+        if entries is None or (saved and self._key(saved) == self._key(entries)):
+            self.entries = saved
+            for entry in self.entries:
+                if entry['status'] == RUNNING:  # interrupted; runs already collected are found from the data file
+                    log.warning(f"Resuming {entry['scheme_entry']} on {entry['bal_alias']}")
+                    entry['status'] = PENDING
+        else:
+            self.entries = entries
+        self.save()
+
+    @staticmethod
+    def _key(entries):
+        return [(e['scheme_entry'], e['nominal'], e['bal_alias'], e['num_runs']) for e in entries]
+
+    def load(self):
+        """Returns the list of entries saved in the queue file, or an empty list if there is no saved queue"""
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path, mode='r', encoding='utf-8') as fp:
+            return json.load(fp).get('Entries', [])
+
+    def save(self):
+        """Saves the state of the queue, replacing the queue file only once the new file is completely written"""
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._lock:
+            state = {'Updated': datetime.now().strftime('%d-%m-%Y %H:%M:%S'), 'Entries': self.entries}
+            tmp = self.path + '.tmp'
+            with open(tmp, mode='w', encoding='utf-8') as fp:
+                json.dump(state, fp, indent=2)
+            os.replace(tmp, self.path)
+
+    def set_status(self, entry, status, good_runs=None):
+        with self._lock:
+            entry['status'] = status
+            if good_runs is not None:
+                entry['good runs'] = good_runs
+            self.save()
+
+    def pending(self, alias=None):
+        """Returns the entries still to be weighed, in order, optionally for only the balance with this alias"""
+        with self._lock:
+            return [entry for entry in self.entries
+                    if entry['status'] == PENDING and (alias is None or entry['bal_alias'] == alias)]
+
+    def balances(self):
+        """Returns the aliases of the balances with entries still to be weighed, in order of the queue"""
+        aliases = []
+        for entry in self.pending():
+            if entry['bal_alias'] not in aliases:
+                aliases.append(entry['bal_alias'])
+        return aliases
+
+
+class MainThreadPrompt(object):
+
+    def __init__(self, requests):
+        """Takes the place of the PromptThread of a balance run in a worker thread, by passing each prompt to the
+        main thread (see serve_prompts) and waiting for the reply. The methods are those of PromptThread.
+
+        Parameters
+        ----------
+        requests : :class:`queue.Queue`
+            the queue of prompts for the main thread
+        """
+        self._requests = requests
+        self._replied = threading.Event()
+        self.reply = None
+
+    def show(self, *args, **kwargs):
+        self.reply = None
+        self._replied.clear()
+        self._requests.put((self, args, kwargs))
+
+    def wait_for_prompt_reply(self):
+        self._replied.wait()
+        return self.reply
+
+
+def serve_prompts(requests, workers):
+    """Shows the prompts from the worker threads of the balances in the main thread, until the workers are done
+
+    Parameters
+    ----------
+    requests : :class:`queue.Queue`
+        the queue of prompts from each :class:`MainThreadPrompt`
+    workers : list of :class:`threading.Thread`
+    """
+    pt = None
+    while any(worker.is_alive() for worker in workers) or not requests.empty():
+        try:
+            mtp, args, kwargs = requests.get(timeout=0.1)
+        except Empty:
+            continue
+        if pt is None:
+            from ..gui.threads.prompt_thread import PromptThread
+            pt = PromptThread()
+        try:
+            pt.prompt(args, kwargs)  # the prompt is modal, so the reply is known once it returns
+            mtp.reply = pt.reply
+        finally:
+            mtp._replied.set()
+
+
+def load_entry(bal, entry, same_loading=False):
+    """Sets up an automatic balance with the positions planned for a scheme entry in the queue, in place of
+    allocating positions with the AllocatorDialog. The loading check is repeated unless the loading is unchanged.
+    """
+    bal._weight_groups = entry['scheme_entry'].split()
+    bal._positions = entry['positions']
+    bal.pos_to_centre = []
+    bal.cal_pos = entry['positions'][0]
+    if not same_loading:
+        bal._move_time = False
+
+
+def reload_weights(bal, loading):
+    """Prompts the operator to place each weight group of the new loading in its position on the weight handler
+
+    Returns
+    -------
+    bool to indicate that all weight groups were placed
+    """
+    for pos, mass in enumerate(loading, start=1):
+        if not bal.place_weight(mass, pos):
+            return False
+
+    return True
+
+
+def data_file(cfg, entry):
+    """Returns the path to the json data file for a scheme entry"""
+    return os.path.join(cfg.folder, cfg.client + '_' + entry['nominal'] + '.json')
+
+
+def weigh_scheme_entry(cfg, bal, entry):
+    """Collects the target number of acceptable circular weighings for a scheme entry, as for the weighing window
+
+    Parameters
+    ----------
+    cfg : :class:`Configuration`
+    bal : balance instance
+    entry : dict
+        se_row_data dictionary for the scheme entry
+
+    Returns
+    -------
+    int or None
+        number of acceptable weighings on file, or None if the balance could not be initialised or a weighing
+        was aborted
+    """
+    se = entry['scheme_entry']
+    url = data_file(cfg, entry)
+    root = check_for_existing_weighdata(cfg.folder, url, se)
+    good_runs, run_no_1 = check_existing_runs(root, se)
+
+    ac = cfg.acceptance_criteria(entry['bal_alias'], float(entry['nominal']))
+    metadata = {
+        'Client': cfg.client,
+        'Balance': entry['bal_alias'], 'Bal serial no.': bal.record.serial,
+        'Unit': bal.unit, 'Nominal mass (g)': float(entry['nominal']),
+    }
+    for key, value in ac.items():
+        metadata[key] = value
+
+    weighing = CircWeigh(se)
+    positions = check_bal_initialised(bal=bal, wtgrps=weighing.wtgrps)
+    if positions is None:
+        log.error("Balance initialisation not complete")
+        return None
+
+    num_runs = float(entry['num_runs'])
+    run = 0
+    bad_runs = 0
+    while run < num_runs + MAX_BAD_RUNS + 1 and bad_runs < MAX_BAD_RUNS:
+        if good_runs > num_runs - 1:
+            log.info('Finished weighings for ' + se)
+            return good_runs
+        run_id = 'run_' + str(round(run_no_1 + run, 0))
+        weighing_root = do_circ_weighing(bal, se, root, url, run_id, EXCL=cfg.EXCL, early_stop=cfg.early_stop,
+                                         extra_cycles=cfg.extra_cycles, timed=cfg.timed, drift=cfg.drift,
+                                         **metadata)
+        if not weighing_root:
+            return None
+        weighanalysis = analyse_weighing(root, url, se, run_id, bal.mode, EXCL=cfg.EXCL,
+                                         timed=cfg.timed, drift=cfg.drift)
+        if weighanalysis is None:  # weighing was stopped early so is not complete
+            bad_runs += 1
+        elif weighanalysis.metadata.get('Acceptance met?'):
+            good_runs += 1
+        elif not weighanalysis.metadata.get('Exclude'):
+            log.warning('Weighing acceptable as part of set of automatic weighings only')
+            good_runs += 1
+        else:
+            bad_runs += 1
+        run += 1
+
+    log.error(f'Completed {good_runs} acceptable weighings of {entry["num_runs"]} for {se}')
+    return good_runs
+
+
+def run_balance_queue(cfg, queue, alias, attended=False, bal=None):
+    """Weighs the pending scheme entries in the queue for one balance, one loading at a time.
+    Before each scheme entry the lock for its data file is acquired, so that several balances (and the weighing
+    window of the GUI) may work through the same scheme concurrently. An entry whose data file is in use is passed
+    over for the next entry on the same loading, if there is one.
+
+    Parameters
+    ----------
+    cfg : :class:`Configuration`
+    queue : :class:`WeighingQueue`
+    alias : str
+        alias of the balance in the config file
+    attended : bool, optional
+        see run_queue
+    bal : balance instance, optional
+        the balance checked out for alias, e.g. by the main thread. If None, the balance is checked out here.
+        The balance is released once its queue is done, or if an error is raised while weighing a scheme entry.
+        The entry is then marked as failed, and the error raised again.
+    """
+    from ..equip import connections
+    entries = queue.pending(alias)
+    if not entries:
+        if bal is not None:
+            connections.release(bal)
+        return
+
+    if bal is None:
+        bal, mode = connections.get_bal_instance(cfg, alias)
+    try:
+        loading = entries[0]['loading']
+        log.info(f'Weighing queue for {alias}: load weight groups {loading} into positions 1 to {len(loading)}')
+        new_loading = True
+
+        while not bal.want_abort:
+            entries = queue.pending(alias)
+            if not entries:
+                break
+            on_loading = [entry for entry in entries if entry['loading'] == loading]
+            if not on_loading:
+                loading = entries[0]['loading']
+                if not attended:
+                    log.warning(f'Weighing queue for {alias} paused: reload with weight groups {loading} '
+                                f'into positions 1 to {len(loading)} and run the queue again')
+                    break
+                if not reload_weights(bal, loading):
+                    log.warning(f'Reloading of {alias} was not completed')
+                    break
+                new_loading = True
+                continue
+
+            for entry in on_loading:
+                lock = data_file_lock(data_file(cfg, entry))
+                if lock.acquire(blocking=False):
+                    break
+            else:  # all data files are in use by other balances, so wait for the first
+                entry = on_loading[0]
+                lock = data_file_lock(data_file(cfg, entry))
+                log.info(f'{alias} waiting for {data_file(cfg, entry)}')
+                lock.acquire()
+
+            try:
+                load_entry(bal, entry, same_loading=not new_loading)
+                new_loading = False
+                log.info(f"Weighing queue: {entry['scheme_entry']} on {alias}")
+                queue.set_status(entry, RUNNING)
+                good_runs = weigh_scheme_entry(cfg, bal, entry)
+                if good_runs is None:
+                    queue.set_status(entry, FAILED)
+                else:
+                    queue.set_status(entry, DONE if good_runs >= float(entry['num_runs']) else FAILED, good_runs)
+            except Exception as e:
+                log.error(f"Weighing queue: {entry['scheme_entry']} on {alias} failed: {e.__class__.__name__}: {e}")
+                queue.set_status(entry, FAILED)
+                raise
+            finally:
+                lock.release()
+    finally:  # check the balance in, even if an error was raised
+        connections.release(bal)
+
+
+def run_queue(cfg, entries=None, attended=False, concurrent=False):
+    """Weighs all scheme entries in the queue back to back.
+    The queue is saved in the client folder and resumed if this function is called again for the same scheme.
+
+    Parameters
+    ----------
+    cfg : :class:`Configuration`
+    entries : list of dict, optional
+        se_row_data dictionaries for the scheme entries. If None, the scheme in the Admin.xlsx file is used.
+    attended : bool, optional
+        if True, the operator is prompted to change the loading of the weight handler when needed.
+        If False (default), the queue for a balance stops at the first change of loading, with the remaining
+        entries left pending so that the queue can be resumed once the weights have been reloaded.
+    concurrent : bool, optional
+        if True, the balances are run at the same time, each in its own worker thread with its own connection
+        and ambient monitoring. The balances are connected, and the operator prompted, by the calling thread,
+        which should be the main thread. If False (default), the balances are run one after the other.
+
+    Returns
+    -------
+    :class:`WeighingQueue`
+    """
+    if entries is None:
+        if not cfg.scheme:
+            log.error('No weighing scheme found in ' + cfg.path)
+            return None
+        entries = scheme_to_entries(*cfg.scheme)
+
+    queue = WeighingQueue(os.path.join(cfg.folder, cfg.client + QUEUE_SUFFIX), order_entries(cfg, entries))
+    log.info(f'Weighing queue saved to {queue.path}')
+
+    if concurrent:
+        from ..equip import connections
+        requests = Queue()
+        workers = []
+        for alias in queue.balances():
+            bal, mode = connections.get_bal_instance(cfg, alias)  # in this thread, as connecting may prompt
+            bal._prompt_thread = MainThreadPrompt(requests)
+            workers.append(
+                threading.Thread(target=run_balance_queue, args=(cfg, queue, alias, attended, bal), name=alias)
+            )
+        for worker in workers:
+            worker.start()
+        serve_prompts(requests, workers)
+        for worker in workers:
+            worker.join()
+    else:
+        for alias in queue.balances():
+            run_balance_queue(cfg, queue, alias, attended=attended)
+
+    done = [entry for entry in queue.entries if entry['status'] == DONE]
+    log.info(f'Weighing queue finished: {len(done)} of {len(queue.entries)} scheme entries complete')
+
+    return queue
+
+
+def run_queue_cli(admin=None):
+    """Console entry point to run the weighing queue for the scheme in an Admin.xlsx file
+
+    Parameters
+    ----------
+    admin : path
+       path to the Admin.xlsx file. If not specified, the first command line argument is used.
+       Add --attended to the command line to allow reloading of the weight handlers,
+       and --concurrent to run all balances at the same time.
+    """
+    import sys
+    from ..configuration import Configuration
+
+    if not admin:
+        try:
+            admin = sys.argv[1]
+        except IndexError:
+            print('Usage: mcw-queue path/to/Admin.xlsx [--attended] [--concurrent]', file=sys.stderr)
+            return None
+
+    cfg = Configuration(admin)
+
+    if '--concurrent' in sys.argv:
+        from msl.qt import application
+        app = application()  # create the application in the main thread before the balances use it in their threads
+
+    return run_queue(cfg, attended='--attended' in sys.argv, concurrent='--concurrent' in sys.argv)
@@ -0,0 +1,110 @@
+"""
+A breakdown of the time taken to import modules while the program starts up, as for ``python -X importtime``
+but also for the standalone executable (e.g. run with --profile-startup).
+This module only uses the standard library, so that it can be imported before anything that is to be profiled.
+"""
+import sys
+from time import perf_counter
+
+
+class _TimedLoader(object):
+
+    def __init__(self, loader, profiler):
+        """Wraps the loader of a module spec to time the creation and execution of the module"""
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._profiler.timed(spec.name, self._loader.create_module, spec)
+
+    def exec_module(self, module):
+        return self._profiler.timed(module.__name__, self._loader.exec_module, module)
+
+
+class ImportProfiler(object):
+
+    def __init__(self):
+        """Times the import of each module (the time to create and execute it, not including the time to find it),
+        from when :meth:`install` is called. Use :meth:`mark` to record the time at each stage of the startup."""
+        self.t0 = None
+        self.times = {}  # module name: [self time, cumulative time] in seconds, in order of import
+        self.marks = []  # (label, time since install in seconds)
+        self._stack = []  # [module name, time spent importing other modules] for the modules being imported
+
+    def install(self):
+        """Starts timing imports"""
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        self.t0 = perf_counter()
+        return self
+
+    def uninstall(self):
+        """Stops timing imports"""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def timed(self, name, func, *args):
+        """Calls func, and adds the time taken to the import time of the named module"""
+        self._stack.append([name, 0.])
+        t = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = perf_counter() - t
+            _, nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            times = self.times.setdefault(name, [0., 0.])
+            times[0] += elapsed - nested
+            times[1] += elapsed
+
+    def mark(self, label):
+        """Records the time since the profiler was installed, e.g. when the first window is shown"""
+        self.marks.append((label, perf_counter() - self.t0))
+
+    def by_package(self):
+        """Total import time (of all modules) of each top-level package, longest first"""
+        totals = {}
+        for name, (self_time, _) in self.times.items():
+            package = name.split('.')[0]
+            totals[package] = totals.get(package, 0.) + self_time
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def report(self, top=30, file=None):
+        """Writes the breakdown of import times
+
+        Parameters
+        ----------
+        top : int
+            the number of modules to list, of those with the longest cumulative import time
+        file : file-like object, optional
+            where to write the breakdown, if not sys.stderr
+        """
+        file = sys.stderr if file is None else file
+        lines = ['Startup profile', '']
+        for label, t in self.marks:
+            lines.append(f'{t:9.3f} s  {label}')
+        total = sum(t[0] for t in self.times.values())
+        lines += ['', f'{total:9.3f} s  importing {len(self.times)} modules', '', 'Import time by package:']
+        for package, t in self.by_package():
+            if t >= 0.001:
+                lines.append(f'{t:9.3f} s  {package}')
+        lines += ['', f'Slowest {top} imports (self | cumulative):']
+        slowest = sorted(self.times.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (self_time, cumulative) in slowest:
+            lines.append(f'{self_time:9.3f} s | {cumulative:9.3f} s  {name}')
+        print('\n'.join(lines), file=file)
@@ -1,9 +1,11 @@
+import os
 import sys
 import ast
 
 from ..log import log
 from ..constants import admin_default
 from ..configuration import Configuration
+from ..admin_details import PromptNeededError
 # from ..gui.threads.circweigh_popup import WeighingThread
 from ..gui.widgets.weighing_window import WeighingWindow
 
@@ -14,7 +16,32 @@ from ..gui.widgets.weighing_window import WeighingWindow
 # Instead cfg is re-created from the admin.xlsx file
 
 
-def run_circweigh_popup(admin=None, se_row_data=None):
+def load_configuration(admin, splash=None):
+    """Loads the Configuration for an admin file, in a background thread while the splash screen is shown
+    (if there is one)
+
+    Parameters
+    ----------
+    admin : path
+       path to the admin.xlsx file
+    splash : :class:`~mass_circular_weighing.gui.splash.Splash`, optional
+
+    Returns
+    -------
+    :class:`~mass_circular_weighing.configuration.Configuration`
+    """
+    if splash is None:
+        return Configuration(admin)
+    splash.message(f'Loading {os.path.basename(admin)}...')
+    try:
+        return splash.run_in_background(Configuration, admin)
+    except PromptNeededError:
+        # the operator needs to be prompted for a file, which can only be done from the main thread
+        splash.finish()
+        return Configuration(admin)
+
+
+def run_circweigh_popup(admin=None, se_row_data=None, splash=None, on_shown=None):
     """Runs the circular weighing pop-up window for a specified scheme entry, given the appropriate admin file
 
     Parameters
@@ -23,6 +50,10 @@ def run_circweigh_popup(admin=None, se_row_data=None):
        path to the admin.xlsx file
     se_row_data : dict
         a dictionary of strings with keys ['row', 'scheme_entry', 'nominal', 'bal_alias', 'num_runs']
+    splash : :class:`~mass_circular_weighing.gui.splash.Splash`, optional
+        a splash screen to show while the Configuration loads (one is made if the admin file is from the console)
+    on_shown : callable, optional
+        a function to call (with no arguments) once the weighing window is shown, e.g. to report the startup time
 
     Returns
     -------
@@ -37,12 +68,17 @@ def run_circweigh_popup(admin=None, se_row_data=None):
     try:
         if not admin:  # try using arguments from console
             admin = sys.argv[1]
-        cfg = Configuration(admin)
+            if splash is None:
+                from ..gui.splash import Splash
+                splash = Splash()
+        cfg = load_configuration(admin, splash)
         se_row_data = ast.literal_eval(sys.argv[2])
     except IndexError:
         pass
     except IOError as e:
         # print(f'{e.__class__.__name__}: {e}', file=sys.stderr)
+        if splash is not None:
+            splash.finish()
         return None
 
     if not admin:  # prompt user for input
@@ -70,6 +106,10 @@ def run_circweigh_popup(admin=None, se_row_data=None):
 
     w = WeighingWindow()
     w.show(se_row_data, cfg)
+    if splash is not None:
+        splash.finish(w)
+    if on_shown is not None:
+        on_shown()
 
     gui.exec()
 
@@ -0,0 +1,75 @@
+"""
+Timing of the phases of each reading in a circular weighing, to show where the time in a cycle goes.
+"""
+from time import perf_counter
+
+import numpy as np
+
+PHASES = ('move', 'lift', 'settle', 'read', 'save', 'unload')
+
+
+class PhaseTimer(object):
+
+    def __init__(self, clock=perf_counter):
+        """Divides the time taken for each reading between the phases in PHASES.
+        Each call to start() ends the current phase, so the phase durations for a reading add up to the
+        total time from begin_reading() to end_reading(). Calls outside a reading are ignored.
+
+        Parameters
+        ----------
+        clock : callable, optional
+            returns the time in seconds, e.g. the clock of the balance
+        """
+        self.clock = clock
+        self.rows = []
+        self._phase = None
+        self._t = None
+        self._durations = None
+
+    @property
+    def phase(self):
+        """The current phase, or None if no reading is in progress"""
+        return self._phase
+
+    def begin_reading(self, phase=PHASES[0]):
+        self._durations = dict.fromkeys(PHASES, 0.)
+        self._phase = phase
+        self._t = self.clock()
+
+    def start(self, phase):
+        """Ends the current phase and starts the next one"""
+        if self._phase is None:
+            return
+        t = self.clock()
+        self._durations[self._phase] += t - self._t
+        self._phase = phase
+        self._t = t
+
+    def end_reading(self, cycle, position, wtgrp):
+        """Ends the current phase and stores the phase durations for the reading"""
+        if self._phase is None:
+            return
+        self.start(None)
+        self.rows.append((cycle, position, wtgrp) + tuple(self._durations[p] for p in PHASES))
+
+    def table(self):
+        """Phase durations of each reading, in s
+
+        Returns
+        -------
+        numpy structured array with fields Cycle, Position, Weight group, and each phase
+        """
+        dtype = [('Cycle', 'i4'), ('Position', 'i4'), ('Weight group', object)] + [(p, 'float64') for p in PHASES]
+        table = np.empty(len(self.rows), dtype=dtype)
+        for i, row in enumerate(self.rows):
+            table[i] = row
+        return table
+
+    def summary(self):
+        """Mean duration of each phase per reading, and the mean total time per reading, in s"""
+        if not self.rows:
+            return {}
+        table = self.table()
+        summary = {p: float(np.mean(table[p])) for p in PHASES}
+        summary['total'] = sum(summary[p] for p in PHASES)
+        return summary
@@ -0,0 +1,113 @@
+"""
+On-disk cache of the weight sets parsed from .xlsx files, so that a workbook which rarely changes (e.g. MASSREF)
+is only parsed again after it has been modified.
+Each weight set is stored as columns (a list for each key) in a json file in the cache folder, together with the path,
+sheet, size and modification time of the workbook that it was parsed from.
+"""
+import os
+import json
+import hashlib
+import threading
+from copy import deepcopy
+
+from ..constants import xlsx_cache_folder
+from ..log import log
+
+_memory = {}   # (path, sheet): cached entry, so that each cache file is read at most once per process
+_lock = threading.Lock()
+
+
+def signature(path):
+    """Size and modification time of a file, which change whenever the file is saved"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def cache_file(path, sheet, folder=None):
+    """Path of the cache file for a sheet of a workbook"""
+    key = hashlib.sha1(f'{os.path.abspath(path)}|{sheet}'.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(xlsx_cache_folder if folder is None else folder, key + '.json')
+
+
+def load_cached(path, sheet, folder=None):
+    """Returns the weight set cached for a sheet of a workbook, or None if the workbook has changed since the set
+    was cached (or the set was never cached)
+
+    Parameters
+    ----------
+    path : path
+        the .xlsx file
+    sheet : str
+        name of the sheet of the weight set
+    folder : path, optional
+        the cache folder, if not xlsx_cache_folder
+
+    Returns
+    -------
+    dict or None
+    """
+    abspath = os.path.abspath(path)
+    try:
+        sig = signature(path)
+    except OSError:
+        return None
+    with _lock:
+        entry = _memory.get((abspath, sheet))
+    if entry is None or entry['Signature'] != sig:
+        try:
+            with open(cache_file(path, sheet, folder), mode='r', encoding='utf-8') as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+    if entry.get('Path') != abspath or entry.get('Sheet') != sheet or entry.get('Signature') != sig:
+        return None
+    with _lock:
+        _memory[(abspath, sheet)] = entry
+    log.debug(f'Using cached {sheet} from {path}')
+    return deepcopy(entry['Columns'])  # so that changes by the caller don't change the cache
+
+
+def save_cached(path, sheet, columns, sig, folder=None):
+    """Caches a weight set parsed from a sheet of a workbook. The cache folder is created if the folder that holds it
+    exists (e.g. the local data folder), otherwise the set is cached for this process only.
+
+    Parameters
+    ----------
+    path : path
+        the .xlsx file
+    sheet : str
+        name of the sheet of the weight set
+    columns : dict
+        the weight set, with a list for each column (or any other json-serialisable data parsed from the sheet)
+    sig : list
+        the signature of the workbook when it was opened to be parsed
+    folder : path, optional
+        the cache folder, if not xlsx_cache_folder
+    """
+    entry = {'Path': os.path.abspath(path), 'Sheet': sheet, 'Signature': sig, 'Columns': columns}
+    try:
+        text = json.dumps(entry)
+    except TypeError as e:  # e.g. a date in a cell
+        log.debug(f'Unable to cache {sheet} from {path}: {e}')
+        return False
+    with _lock:
+        _memory[(entry['Path'], sheet)] = json.loads(text)
+    file = cache_file(path, sheet, folder)
+    try:
+        if not os.path.isdir(os.path.dirname(file)):
+            if not os.path.isdir(os.path.dirname(os.path.dirname(file))):
+                return False
+            os.makedirs(os.path.dirname(file))
+        with open(file + '.tmp', mode='w', encoding='utf-8') as fp:
+            fp.write(text)
+        os.replace(file + '.tmp', file)
+    except OSError as e:
+        log.debug(f'Unable to cache {sheet} from {path}: {e}')
+        return False
+    return True
+
+
+def clear_memory():
+    """Forgets the weight sets cached in this process (the cache files are kept)"""
+    with _lock:
+        _memory.clear()
@@ -0,0 +1,134 @@
+"""
+A weight set (client, check or standard) as loaded by AdminDetails: a dictionary of set details (e.g. 'Set type')
+and of columns, with a list of values for each weight in each column.
+"""
+import numpy as np
+
+from .log import log
+
+
+class WeightSet(dict):
+
+    def __init__(self, *args, **kwargs):
+        """A dictionary of columns of weight info, as for :meth:`.AdminDetails.load_set_from_massref` and
+        :meth:`.AdminDetails.load_client_set`, with an index of the Weight IDs and numpy arrays of the columns.
+        The index and arrays are made when first needed, and are remade if a column is replaced,
+        so replace a column (e.g. ws['Vol (mL)'] = [...]) rather than changing its list in place.
+        """
+        super().__init__(*args, **kwargs)
+        self._index = None
+        self._arrays = {}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._arrays.pop(key, None)
+        if key == 'Weight ID':
+            self._index = None
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    @property
+    def num_weights(self) -> int:
+        return len(self.get('Weight ID') or [])
+
+    @property
+    def columns(self) -> list[str]:
+        """The keys of the columns, i.e. of the lists with a value for each weight"""
+        n = self.num_weights
+        return [key for key, val in self.items() if isinstance(val, (list, np.ndarray)) and len(val) == n]
+
+    @property
+    def index(self) -> dict:
+        """Weight ID: position of the weight in the set (the first position, if a Weight ID is repeated)"""
+        if self._index is None:
+            self._index = {}
+            for i, wt_id in enumerate(self.get('Weight ID') or []):
+                self._index.setdefault(wt_id, i)
+        return self._index
+
+    def includes(self, wt_id: str) -> bool:
+        """Whether a weight with this Weight ID is in the set"""
+        return wt_id in self.index
+
+    def position(self, wt_id: str) -> int:
+        """Position of a weight in the set, as for list.index"""
+        try:
+            return self.index[wt_id]
+        except KeyError:
+            raise ValueError(f"{wt_id} is not in any of the specified weight sets.") from None
+
+    def positions(self, wt_ids) -> np.ndarray:
+        """Positions of weights in the set"""
+        return np.array([self.position(wt_id) for wt_id in wt_ids], dtype=int)
+
+    def array(self, key: str) -> np.ndarray:
+        """The column as a numpy array: of floats, with nan for missing values, for a numeric column,
+        otherwise of objects"""
+        if key not in self._arrays:
+            values = self[key]
+            try:
+                arr = np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+            except (TypeError, ValueError):
+                arr = np.array(values, dtype=object)
+            arr.flags.writeable = False
+            self._arrays[key] = arr
+        return self._arrays[key]
+
+    def subset(self, wt_ids) -> 'WeightSet':
+        """A copy of the set with only the weights in wt_ids, in the order of the set.
+        Weight IDs which are not in the set are ignored."""
+        wanted = set(wt_ids)
+        keep = [i for i, wt_id in enumerate(self.get('Weight ID') or []) if wt_id in wanted]
+        columns = self.columns
+        subset = WeightSet()
+        for key, val in self.items():
+            if key in columns:
+                subset[key] = [val[i] for i in keep]
+            else:
+                subset[key] = val
+        if 'Num weights' in self:
+            subset['Num weights'] = len(keep)
+        return subset
+
+    @classmethod
+    def union(cls, *sets, keys=None) -> 'WeightSet':
+        """Combines the columns of weight sets, in order, into a new set with a 'Set' column for the set type
+        of each weight. Sets which are None are skipped.
+
+        :param sets: WeightSet (or dict) objects
+        :param keys: keys of the columns to combine; if a set doesn't have a column, the column is left out.
+            'Weight ID' is always included. If not given, the columns that all the sets have are combined.
+        """
+        sets = [s if isinstance(s, WeightSet) else WeightSet(s) for s in sets if s]
+        if keys is None:
+            keys = [k for k in sets[0].columns if all(k in s.columns for s in sets[1:])] if sets else []
+        union = cls({'Weight ID': []})
+        for key in keys:
+            missing = [s.get('Set type') for s in sets if key not in s]
+            if missing:
+                log.warning(f"{key} key not found in {', '.join(str(m) for m in missing)} mass set dictionary")
+                continue
+            union[key] = [v for s in sets for v in s[key]]
+        union['Weight ID'] = [v for s in sets for v in s['Weight ID']]
+        union['Set'] = [s.get('Set type') for s in sets for _ in range(s.num_weights)]
+        return union
+
+    def volumes(self) -> np.ndarray:
+        """Volumes in mL of the weights at 20 °C, from the nominal masses and densities (nan where not known)"""
+        return 1000 * self.array('Nominal (g)') / self.array('Density (kg/m3)')
+
+    def volume_uncertainties(self) -> np.ndarray:
+        """Standard uncertainties in mL of the volumes, from the uncertainties of the densities (nan where not known)"""
+        d = self.array('Density (kg/m3)')
+        return self.array('u_density (kg/m3)') / d * 1000 * self.array('Nominal (g)') / d
+
+    def corrected_volumes(self, temp: float) -> np.ndarray:
+        """Volumes in mL of the weights corrected for expansion due to the temperature deviating from 20 °C
+        (as for :func:`~.analyse_circ_weigh.corrected_volume`)"""
+        return self.array('Vol (mL)') * (1 + self.array('Expansion coeff (ppm/degC)') * 0.000001 * (temp - 20))
+
+
+def nan_to_none(values: np.ndarray) -> list:
+    """A list of the values, with None in place of nan"""
+    return [None if np.isnan(v) else float(v) for v in values]
@@ -138,10 +138,9 @@ mls.append(["Note that the table above contains TRUE MASS VALUES (including the
 mls.append([""])  # Makes a new empty row
 mls.append(["Below is a table of CONVENTIONAL MASS VALUES (converted from above)"])
 b_conv = fmc.convert_to_conventional_mass(v=None, b=None)
-for i, b in enumerate(b_conv):
-    fmc.summarytable[i, 3] = np.round(b, 12)
+fmc.summarytable['Mass value (g)'] = np.round(b_conv, 12)
 for row in fmc.summarytable:
-    mls.append(list(row[:7]))
+    mls.append(list(row)[:7])
 
 # add covariance matrix info to mls sheet
 mls.append([""])  # Makes a new empty row
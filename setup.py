@@ -188,6 +188,8 @@ setup(
             'mcw-gui = mass_circular_weighing.gui.gui:show_gui',
             'poll-omega-logger = mass_circular_weighing.utils.poll_omega_logger:poll_omega_logger',
             'circweigh-gui = mass_circular_weighing.utils.circweigh_subprocess:run_circweigh_popup',
+            'mcw-queue = mass_circular_weighing.routines.weighing_queue:run_queue_cli',
+            'mcw-pipeline = mass_circular_weighing.routines.pipeline:pipeline_cli',
         ],
     },
 )
@@ -1,10 +1,14 @@
 """
 PyInstaller hook for Mass-Circular-Weighing
 """
-from PyInstaller.utils.hooks import collect_data_files
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 
 datas = collect_data_files('msl.loadlib')
 datas += [
     ('../mass_circular_weighing/utils/default_admin.xlsx', 'examples'),
     ('../mass_circular_weighing/utils/default_config.xml', 'examples'),
-]
\ No newline at end of file
+]
+
+# modules that are imported when first used (e.g. by the lazy imports of mass_circular_weighing.equip)
+# are not found by the analysis of import statements
+hiddenimports = collect_submodules('mass_circular_weighing')
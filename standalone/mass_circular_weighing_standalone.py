@@ -1,17 +1,41 @@
 import sys
 import traceback
 
+# run with --profile-startup to print a breakdown of the time taken to import modules until the first window shows
+profiler = None
+if '--profile-startup' in sys.argv:
+    sys.argv.remove('--profile-startup')
+    from mass_circular_weighing.startup_profile import ImportProfiler
+    profiler = ImportProfiler().install()
+
 nargs = len(sys.argv)
 
+
+def report_startup():
+    if profiler is not None:
+        profiler.mark('first window shown')
+        profiler.uninstall()
+        profiler.report()
+
+
 try:
+    if nargs not in (1, 3):     # Something has gone wrong...
+        raise ValueError(f'Invalid number of command line arguments: {nargs}')
+
+    # show a splash screen straight away, while the rest of the program is imported
+    from msl.qt import application
+    app = application()
+    from mass_circular_weighing.gui.splash import Splash
+    splash = Splash()
+    if profiler is not None:
+        profiler.mark('splash screen shown')
+
     if nargs == 1:      # Show the GUI
         from mass_circular_weighing.gui import gui
-        gui.show_gui()
-    elif nargs == 3:    # Show the weighing window
+        gui.show_gui(splash=splash, on_shown=report_startup)
+    else:               # Show the weighing window
         from mass_circular_weighing.utils.circweigh_subprocess import run_circweigh_popup
-        run_circweigh_popup()
-    else:               # Something has gone wrong...
-        raise ValueError(f'Invalid number of command line arguments: {nargs}')
+        run_circweigh_popup(splash=splash, on_shown=report_startup)
 
 except KeyboardInterrupt:
     pass
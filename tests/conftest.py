@@ -0,0 +1,42 @@
+import pytest
+
+from mass_circular_weighing.constants import MU_STR
+from mass_circular_weighing.admin_details import add_volumes
+from mass_circular_weighing.weight_set import WeightSet
+
+
+@pytest.fixture
+def make_set():
+    """A function to make a weight set, as loaded from the Admin or MASSREF file, with the volumes calculated from
+    the densities. A value for a column is used for every weight, and a list gives a value for each weight."""
+
+    def make(set_type, ids, mass_values=None, nominals=100., densities=8000., u_density=10., expansions=48.,
+             vols=None, heights=None):
+        def column(value):
+            return list(value) if isinstance(value, (list, tuple)) else [value] * len(ids)
+
+        ws = WeightSet({
+            'Set type': set_type,
+            'Set identifier': set_type[0],
+            'Calibrated': '2020',
+            'Weight ID': list(ids),
+            'Nominal (g)': column(nominals),
+            'Density (kg/m3)': column(densities),
+            'u_density (kg/m3)': column(u_density),
+            'Expansion coeff (ppm/degC)': column(expansions),
+            'u_mag (mg)': column(None),
+            'Num weights': len(ids),
+        })
+        add_volumes(ws)
+        if vols is not None:  # in place of the volumes from the densities
+            ws['Vol (mL)'] = column(vols)
+            ws['Vol unc (mL)'] = column(0.01)
+        if heights is not None:
+            ws['Centre Height (mm)'] = column(heights)
+            ws['u_height (mm)'] = column(0.5)
+        if mass_values is not None:
+            ws['mass values (g)'] = column(mass_values)
+            ws['uncertainties (' + MU_STR + 'g)'] = column(10.)
+        return ws
+
+    return make
@@ -0,0 +1,59 @@
+import numpy as np
+
+from mass_circular_weighing.routine_classes.circ_weigh_class import CircWeigh
+from mass_circular_weighing.routines.adaptive_stop import partial_fit, assess_cycles, CONTINUE, ABORT, EXTEND
+
+# testing the assessment of partially complete automatic circular weighings using synthetic data
+# for three weight groups with readings in g and a linear drift of 2 µg per reading
+
+se = "1000 1000MA 1000MB"
+offsets = [0, 0.000050, -0.000030]
+
+
+def make_data(num_cycles, noise_ug=0., seed=1):
+    rng = np.random.default_rng(seed)
+    data = np.empty((num_cycles, 3, 2))
+    for cycle in range(num_cycles):
+        for i in range(3):
+            n = 3 * cycle + i
+            data[cycle, i, 0] = n
+            data[cycle, i, 1] = 1000 + offsets[i] + 2e-6 * n + noise_ug * 1e-6 * rng.standard_normal()
+    return data
+
+
+def test_partial_cycles():
+    cw = CircWeigh(se, num_cycles=2)
+    assert cw.num_cycles == 2
+    assert cw.num_readings == 6
+    assert cw.dof('no drift') == 3
+    assert cw.dof('cubic drift') == 0
+
+    drift, stdev = partial_fit(se, make_data(2))
+    assert drift in ['linear drift', 'quadratic drift']
+    assert stdev < 1e-9
+
+
+def test_assess_cycles():
+    # too few cycles to assess
+    assert assess_cycles(se, make_data(1, noise_ug=100), 'g', 5, 3, early_stop=2) == (CONTINUE, None)
+
+    # well-behaved weighing
+    decision, stdev = assess_cycles(se, make_data(3, noise_ug=0.1), 'g', 5, 3, early_stop=2, final=True)
+    assert decision == CONTINUE
+    assert stdev < 5
+
+    # very noisy weighing is stopped early
+    decision, stdev = assess_cycles(se, make_data(2, noise_ug=200), 'g', 5, 3, early_stop=2)
+    assert decision == ABORT
+    assert stdev > 30
+
+    # ...unless early stopping is not requested
+    decision, stdev = assess_cycles(se, make_data(2, noise_ug=200), 'g', 5, 3)
+    assert decision == CONTINUE
+
+    # borderline weighing is extended only once all the planned cycles are complete
+    data = make_data(4, noise_ug=10, seed=2)
+    decision, stdev = assess_cycles(se, data, 'g', 5, 3, final=True, drift='linear drift')
+    assert 5 < stdev <= 15
+    assert decision == EXTEND
+    assert assess_cycles(se, data, 'g', 5, 3, final=False, drift='linear drift')[0] == CONTINUE
@@ -0,0 +1,75 @@
+import os
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.simulator import simulate_record, SIMULATED_AMBIENT
+from mass_circular_weighing.equip.aio import AsyncBalance, ambient_now, ambient_during
+
+
+def make_balance(alias, masses):
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    record = SimpleNamespace(
+        alias=alias, manufacturer='Mettler Toledo', model='AX1006', serial='B98765432' + alias[-1],
+        user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 20},
+        connection=SimpleNamespace(properties={'intcaltimeout': 120}),
+    )
+    sim_record, _ = simulate_record(record, masses=masses, speedup=2000, seed=1)
+    bal = AWBalCarousel(sim_record)
+    bal.identify_handler()
+    bal._positions = list(masses)
+    bal._move_time = 10
+    bal._ambient_details = dict(SIMULATED_AMBIENT)
+    return AsyncBalance(bal)
+
+
+async def weigh(abal, pos):
+    await abal.load_bal(str(pos), pos)
+    reading = await abal.get_mass_stable(str(pos))
+    await abal.unload_bal(str(pos), pos)
+    return reading
+
+
+def test_overlapping_balances():
+    masses_a = {1: 500.000012, 2: 500.000062}
+    masses_b = {1: 200.000005, 3: 199.99999}
+
+    async def main():
+        a = make_balance('AX1006a', masses_a)
+        b = make_balance('AX1006b', masses_b)
+        assert a.mode == 'aw_c' and a.positions == [1, 2]
+
+        # the ambient conditions are fetched while both balances weigh
+        pre, reading_a, reading_b = await asyncio.gather(
+            ambient_now(a.ambient_details, a.mode), weigh(a, 2), weigh(b, 3),
+        )
+        post = await ambient_during(pre, a.ambient_details, a.mode)
+
+        # commands on the same balance run one at a time, in order
+        readings = await asyncio.gather(a.move_to(1), a.get_status(), a.lift_to('weighing', hori_pos=1, wait=False))
+        await a.close_connection()
+        await b.close_connection()
+        return pre, post, reading_a, reading_b, readings[1]
+
+    pre, post, reading_a, reading_b, status = asyncio.run(main())
+    assert pre['T_pre (°C)'] == 20
+    assert post['Ambient OK?']
+    assert abs(reading_a - masses_a[2]) < 1e-9
+    assert abs(reading_b - masses_b[3]) < 1e-9
+    assert status == ('1', 'top')
+
+
+def test_manual_weighing_not_supported():
+    from mass_circular_weighing.equip import Balance
+
+    record = SimpleNamespace(
+        alias='MDE', user_defined={'unit': 'g', 'resolution': '0.001 g', 'stable_wait': 20},
+    )
+    with pytest.raises(ValueError, match='automatic'):
+        AsyncBalance(Balance(record))
+    with pytest.raises(ValueError, match='automatic'):
+        asyncio.run(ambient_now(dict(SIMULATED_AMBIENT), 'mw'))
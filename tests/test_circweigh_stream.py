@@ -0,0 +1,54 @@
+import numpy as np
+
+from mass_circular_weighing.routine_classes.circ_weigh_class import CircWeigh
+
+# testing that the incremental (recursive least squares) fit agrees with the batch analysis,
+# using synthetic data for three weight groups with readings in g and a drift of 2 µg per reading
+
+se = "1000 1000MA 1000MB"
+offsets = [0, 0.000050, -0.000030]
+
+rng = np.random.default_rng(2)
+data = np.empty((4, 3))
+for cycle in range(4):
+    for i in range(3):
+        n = 3 * cycle + i
+        data[cycle, i] = 1000 + offsets[i] + 2e-6 * n + 3e-6 * rng.standard_normal()
+
+
+def test_stream_matches_batch():
+    batch = CircWeigh(se)
+    batch.generate_design_matrices([])
+    batch_drift = batch.determine_drift(data)
+
+    stream = CircWeigh(se)
+    stream.start_stream()
+    drifts = [stream.add_reading(reading) for reading in data.flatten()]
+
+    # no standard deviation can be determined until the first cycle is complete
+    assert drifts[:3] == [None, None, None]
+    assert drifts[-1] == batch_drift
+
+    for drift in batch.stdev:
+        assert np.isclose(stream.stdev[drift], batch.stdev[drift], rtol=0, atol=2e-8)
+        assert np.allclose(stream.b[drift], batch.b[drift], rtol=0, atol=1e-8)
+        assert np.allclose(stream.varcovar[drift], batch.varcovar[drift], rtol=1e-4, atol=0)
+
+    s_analysis = stream.item_diff(batch_drift)
+    b_analysis = batch.item_diff(batch_drift)
+    assert np.allclose(s_analysis['mass difference'], b_analysis['mass difference'], rtol=0, atol=1e-10)
+
+
+def test_stream_partial():
+    stream = CircWeigh(se)
+    stream.start_stream()
+    for reading in data[:2].flatten():
+        stream.add_reading(reading)
+
+    partial = CircWeigh(se, num_cycles=2)
+    partial.generate_design_matrices([])
+    partial.determine_drift(data[:2])
+
+    assert 'cubic drift' not in stream.stdev
+    for drift in partial.stdev:
+        assert np.isclose(stream.stdev[drift], partial.stdev[drift], rtol=0, atol=2e-8)
@@ -118,3 +118,71 @@ def test_acceptance_criteria():
     ac = cfg.acceptance_criteria('MDE-demo', 500)
     assert ac['Max stdev from CircWeigh ('+MU_STR+'g)'] == 20.
     assert ac['Stdev for balance ('+MU_STR+'g)'] == 15.
+
+    # the balance register is only read again if it changes
+    index = cfg.acceptance_index()
+    assert cfg.acceptance_index() is index
+    ranges = index[('Mettler Toledo', 'TEST_BAL', '0')]
+    assert [r[0] for r in ranges] == sorted(r[0] for r in ranges)
+    ac = cfg.acceptance_criteria('MDE-demo', 5000)  # in two ranges, so the first range in the register is used
+    assert ac['Max stdev from CircWeigh ('+MU_STR+'g)'] == 50000.
+
+
+def test_load_configuration_in_background(monkeypatch):
+    import threading
+    from mass_circular_weighing.admin_details import prompt_operator
+    from mass_circular_weighing.utils import circweigh_subprocess
+
+    class Splash(object):
+        # runs func in a background thread, as for the splash screen of the standalone executable
+        finished = False
+
+        def message(self, text):
+            pass
+
+        def finish(self, widget=None):
+            self.finished = True
+
+        def run_in_background(self, func, *args):
+            result = {}
+
+            def target():
+                try:
+                    result['value'] = func(*args)
+                except BaseException as e:
+                    result['error'] = e
+
+            thread = threading.Thread(target=target)
+            thread.start()
+            thread.join()
+            if 'error' in result:
+                raise result['error']
+            return result['value']
+
+    loads = []
+
+    def configuration(admin):
+        in_main_thread = threading.current_thread() is threading.main_thread()
+        loads.append(in_main_thread)
+        if admin == 'missing':
+            raise FileNotFoundError(f'Cannot find {admin}')
+        if admin == 'prompt' and not in_main_thread:
+            prompt_operator('filename', title='Please select a valid MASSREF file')
+        return admin
+
+    monkeypatch.setattr(circweigh_subprocess, 'Configuration', configuration)
+
+    # loaded again in the main thread only if the operator needs to be prompted
+    splash = Splash()
+    assert circweigh_subprocess.load_configuration('prompt', splash) == 'prompt'
+    assert loads == [False, True]
+    assert splash.finished
+
+    loads.clear()
+    assert circweigh_subprocess.load_configuration('cached', Splash()) == 'cached'
+    assert loads == [False]
+
+    loads.clear()
+    with pytest.raises(FileNotFoundError):
+        circweigh_subprocess.load_configuration('missing', Splash())
+    assert loads == [False]
@@ -0,0 +1,96 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.connection_manager import ConnectionManager, BalanceInUseError
+from mass_circular_weighing.equip.simulator import simulate_record, SIMULATED_AMBIENT
+
+record = SimpleNamespace(
+    alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+    user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 20},
+    connection=SimpleNamespace(properties={'intcaltimeout': 120}),
+)
+
+
+class SimulatedConfig(object):
+    """Stands in for a Configuration with one simulated balance"""
+
+    def __init__(self):
+        self.created = 0
+
+    def get_bal_instance(self, alias):
+        from mass_circular_weighing.equip import AWBalCarousel
+        self.created += 1
+        sim_record, _ = simulate_record(record, masses={1: 500.000012}, speedup=5000)
+        bal = AWBalCarousel(sim_record)
+        bal.identify_handler()
+        bal._ambient_details = dict(SIMULATED_AMBIENT)
+        return bal, bal.mode
+
+
+def test_reuse_and_reconnect():
+    cfg = SimulatedConfig()
+    manager = ConnectionManager()
+
+    bal, mode = manager.get_bal_instance(cfg, 'AX1006')
+    assert mode == 'aw_c' and cfg.created == 1
+    bal._positions = [1]
+    bal._move_time = 10
+    manager.release(bal)
+    assert bal.want_abort
+
+    # the next scheme entry gets the same balance, without its state from the last entry
+    bal2, mode = manager.get_bal_instance(cfg, 'AX1006')
+    assert bal2 is bal and cfg.created == 1
+    assert not bal.want_abort and bal.positions is None and not bal.move_time
+    assert bal.handler == 'H1006'
+    manager.release(bal2)
+
+    # a lost connection is reconnected
+    def lost(msg):
+        raise ConnectionResetError('port closed')
+    bal.connection = SimpleNamespace(serial=bal.connection.serial, query=lost, disconnect=lambda: None)
+    assert not bal.is_connected()
+    bal3, mode = manager.get_bal_instance(cfg, 'AX1006')
+    assert bal3 is bal and cfg.created == 1
+    assert bal.is_connected()
+    manager.release(bal3)
+
+    manager.close_all()
+    assert manager.aliases == []
+    bal4, mode = manager.get_bal_instance(cfg, 'AX1006')
+    assert bal4 is not bal and cfg.created == 2
+    manager.close_all()
+
+
+def test_one_weighing_at_a_time():
+    cfg = SimulatedConfig()
+    manager = ConnectionManager()
+
+    bal, mode = manager.get_bal_instance(cfg, 'AX1006')
+    with pytest.raises(BalanceInUseError):
+        manager.get_bal_instance(cfg, 'AX1006')
+
+    # a weighing may wait for the balance to be released
+    got = []
+    waiting = threading.Thread(target=lambda: got.append(manager.get_bal_instance(cfg, 'AX1006', timeout=10)))
+    waiting.start()
+    waiting.join(timeout=0.2)
+    assert waiting.is_alive()
+    manager.release(bal)
+    waiting.join(timeout=10)
+    assert got[0][0] is bal and cfg.created == 1
+    assert not bal.want_abort  # its state is reset for the next weighing
+
+    # a balance which is released twice is only checked in once
+    manager.release(bal)
+    manager.release(bal)
+    bal2, mode = manager.get_bal_instance(cfg, 'AX1006')
+    assert bal2 is bal and not bal.want_abort
+    with pytest.raises(BalanceInUseError):
+        manager.get_bal_instance(cfg, 'AX1006')
+    manager.close_all()
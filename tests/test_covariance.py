@@ -0,0 +1,66 @@
+import numpy as np
+
+from mass_circular_weighing.routine_classes.covariance import Covariance, dense_least_squares
+
+
+def normal_equations(psi_y, x, y):
+    psi_y_inv = np.linalg.inv(psi_y)
+    psi_b = np.linalg.inv(np.linalg.multi_dot([x.T, psi_y_inv, x]))
+    return np.linalg.multi_dot([psi_b, x.T, psi_y_inv, y]), psi_b
+
+
+def make_covariance(rng, num_obs, num_unknowns):
+    cov = Covariance(num_obs)
+    uncerts = 1 + rng.random(num_obs)
+    corr = np.array([[1, 0.5], [0.5, 1]])
+    cov.add_variances(uncerts**2, np.outer(uncerts[-2:], uncerts[-2:]) * corr)
+    cov.add_low_rank(100 * rng.random(num_obs))                                  # e.g. air density
+    cov.add_low_rank(10 * rng.random((num_obs, num_unknowns)), np.ones((num_unknowns, num_unknowns)))  # e.g. volume
+    cov.add_low_rank(rng.random((num_obs, num_unknowns)))                       # e.g. height
+
+    dense = np.diag(uncerts**2)
+    dense[-2:, -2:] = np.outer(uncerts[-2:], uncerts[-2:]) * corr
+    for u, c in cov.factors:
+        dense += np.linalg.multi_dot([u, np.identity(u.shape[1]) if c is None else c, u.T])
+    return cov, dense
+
+
+def test_dense():
+    rng = np.random.default_rng(1)
+    cov, dense = make_covariance(rng, 20, 4)
+    assert cov.rank == 9
+    assert np.allclose(cov.dense(), dense, rtol=1e-14, atol=0)
+    assert np.array_equal(cov.dense(), cov.dense().T)
+
+    # variances added later go to the same corner block
+    cov.add_variances(np.ones(20))
+    assert np.allclose(cov.dense(), dense + np.identity(20), rtol=1e-14, atol=0)
+
+
+def test_least_squares():
+    rng = np.random.default_rng(2)
+    x = rng.integers(-1, 2, (30, 6)).astype(float)
+    y = rng.normal(size=30)
+    cov, dense = make_covariance(rng, 30, 6)
+
+    b, psi_b = cov.least_squares(x, y)
+    b_ne, psi_b_ne = normal_equations(dense, x, y)
+    assert np.allclose(b, b_ne, rtol=1e-9, atol=0)
+    assert np.allclose(psi_b, psi_b_ne, rtol=1e-9, atol=0)
+
+    b_dense, psi_b_dense = dense_least_squares(dense, x, y)
+    assert np.allclose(b, b_dense, rtol=1e-9, atol=0)
+    assert np.allclose(psi_b, psi_b_dense, rtol=1e-9, atol=0)
+
+
+def test_least_squares_full_rank():
+    # terms which are not of low rank (and a singular A) are solved in full
+    rng = np.random.default_rng(3)
+    x = rng.integers(-1, 2, (8, 3)).astype(float)
+    y = rng.normal(size=8)
+    cov = Covariance(8)
+    cov.add_low_rank(rng.random((8, 8)) + np.identity(8))
+    b, psi_b = cov.least_squares(x, y)
+    b_ne, psi_b_ne = normal_equations(cov.dense(), x, y)
+    assert np.allclose(b, b_ne, rtol=1e-9, atol=0)
+    assert np.allclose(psi_b, psi_b_ne, rtol=1e-9, atol=0)
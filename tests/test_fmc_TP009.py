@@ -302,8 +302,8 @@ def test_make_summary_table():
     )
     for i, row in enumerate(summarytable):
         for j, item in enumerate(row):
-            if not item == fmc.summarytable[i, j]:
-                assert np.isclose(float(item), fmc.summarytable[i, j], rtol=1e-9)
+            if not item == fmc.summarytable[i][j]:
+                assert np.isclose(float(item or 'nan'), fmc.summarytable[i][j], rtol=1e-9, equal_nan=True)
 
 
 if __name__ == '__main__':
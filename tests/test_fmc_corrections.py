@@ -0,0 +1,171 @@
+import numpy as np
+
+from mass_circular_weighing.constants import MU_STR
+from mass_circular_weighing.routine_classes import covariance, final_mass_calc_class
+from mass_circular_weighing.routine_classes.final_mass_calc_class import FinalMassCalc
+
+
+def make_fmc(tmp_path, make_set, vols=(12.5, 12.6)):
+    inputdata = np.asarray([
+        ('100a', '100s', 0.0001, 1.),
+        ('100b', '100s', -0.0002, 1.),
+        ('100a', '100b', 0.0003, 1.),
+    ], dtype=[('+ weight group', object), ('- weight group', object),
+              ('mass difference (g)', 'float64'), ('balance uncertainty (' + MU_STR + 'g)', 'float64')])
+    fmc = FinalMassCalc(
+        str(tmp_path), 'Client', make_set('Client', ['100a', '100b'], expansions=0., vols=vols, heights=[20., 25.]),
+        None, make_set('Standard', ['100s'], [99.9999], expansions=0., vols=12.4, heights=30.), inputdata, nbc=False,
+    )
+    fmc.parse_inputdata_to_matrices()
+    fmc.BUOYANCY_CORR = fmc.HEIGHT_CORR = True
+    fmc.UNC_AIR_DENS = fmc.UNC_VOL = fmc.UNC_HEIGHT = True
+    return fmc
+
+
+def corrections(fmc, air_densities):
+    """The corrected mass differences and their variance-covariance matrix"""
+    fmc.apply_corrections_to_mass_differences(air_densities)
+    fmc.cal_psi_y(np.full(3, 0.001), air_densities, None)
+    return fmc.y.copy(), fmc.psi_y.copy()
+
+
+def test_correction_terms(tmp_path, make_set, monkeypatch):
+    air_densities = np.array([1.19, 1.2, 1.21])
+    fmc = make_fmc(tmp_path, make_set)
+
+    # count the products of the design matrix which calculate the volume differences and height corrections
+    products = []
+    dot = np.dot
+
+    def counting_dot(*args):
+        products.append(args[0].shape)
+        return dot(*args)
+
+    def counted_corrections(fmc):
+        products.clear()
+        with monkeypatch.context() as m:
+            m.setattr(final_mass_calc_class.np, 'dot', counting_dot)
+            return corrections(fmc, air_densities)
+
+    y, psi_y = counted_corrections(fmc)
+    assert len(products) == 2
+    assert np.allclose(fmc.calc_height_corrections()[0], 0.3e-9 * 100 * np.array([-10., -5., -5., 0.]))
+    assert not fmc.calc_height_corrections()[0].flags.writeable
+    assert np.allclose(fmc.calc_buoyancy_corrections(air_densities)[:3],
+                       (air_densities - 1.2) * [0.1, 0.2, -0.1] / 1000 / 0.99985)
+
+    # the terms are calculated once, and kept when the class variables are changed
+    for true_mass in [True, False]:
+        fmc.TRUE_MASS = true_mass
+        y, psi_y = counted_corrections(fmc)
+        assert not products
+        new = make_fmc(tmp_path, make_set)
+        new.TRUE_MASS = true_mass
+        new_y, new_psi_y = corrections(new, air_densities)
+        assert np.array_equal(new_y, y) and np.array_equal(new_psi_y, psi_y)
+
+    # a term is recalculated if a column it depends on is replaced
+    fmc.all_wts['Vol (mL)'] = [12.5, 12.7, 12.4]
+    y, psi_y = counted_corrections(fmc)
+    assert len(products) == 1
+    new_y, new_psi_y = corrections(make_fmc(tmp_path, make_set, vols=(12.5, 12.7)), air_densities)
+    assert np.array_equal(new_y, y) and np.array_equal(new_psi_y, psi_y)
+
+    # and all the terms are recalculated with a new design matrix
+    fmc.designmatrix = fmc.designmatrix.copy()
+    assert np.array_equal(counted_corrections(fmc)[0], y)
+    assert len(products) == 2
+
+
+def test_dense_psi_y(tmp_path, make_set):
+    fmc = make_fmc(tmp_path, make_set)
+    air_densities = np.array([1.19, 1.2, 1.21])
+    fmc.BUOYANCY_CORR = fmc.HEIGHT_CORR = fmc.UNC_VOL = fmc.UNC_HEIGHT = False
+    fmc.apply_corrections_to_mass_differences(air_densities)
+    fmc.cal_psi_y(np.full(3, 0.001), air_densities, None)
+    psi_y = fmc.psi_y
+    assert not psi_y.flags.writeable  # so that it can't be edited without effect
+    fmc.do_least_squares()
+    psi_bmeas = fmc.psi_bmeas
+
+    # the edited matrix is only used if asked for
+    fmc.cal_psi_y(np.full(3, 0.001), air_densities, None)
+    fmc.DENSE_PSI_Y = True
+    assert np.array_equal(fmc.psi_y, psi_y)
+    fmc.psi_y[0, 0] += 100
+    fmc.do_least_squares()
+    assert not np.allclose(fmc.psi_bmeas, psi_bmeas)
+    assert fmc.psi_y[0, 0] == psi_y[0, 0] + 100 + fmc.uncerts[0]**2
+
+
+def test_psi_y(tmp_path, make_set):
+    # the contributions to psi_y as in the variance-covariance matrices of the weights (in µg2),
+    # with the air density of each observation for the volumes
+    fmc = make_fmc(tmp_path, make_set)
+    air_densities = np.array([1.15, 1.2, 1.24])
+    u_airdens = np.array([0.001, 0.002, 0.0015])
+    rv = np.array([[1, 1, 0], [1, 1, 0], [0, 0, 1.]])  # the client weights are from the same set
+    fmc.cal_psi_y(u_airdens, air_densities, rv)
+
+    x = fmc.designmatrix
+    x_c = x * np.array([1, 1, 1, 0])[:, np.newaxis]
+    xv = np.dot(x, fmc.all_wts['Vol (mL)'])
+    u_ad = np.append(u_airdens, 0)
+    a_d = np.append(air_densities, 0)
+    u_v = np.array(fmc.all_wts['Vol unc (mL)'])
+    u_z = 3e-4 * np.array(fmc.all_wts['Nominal (g)']) * np.array(fmc.all_wts['u_height (mm)'])
+    ad_contr = np.outer(xv * u_ad, xv * u_ad) * 1e6
+    vol_contr = np.linalg.multi_dot([np.diag(a_d), x, np.outer(u_v, u_v) * rv, x.T, np.diag(a_d)]) * 1e6
+    height_contr = np.linalg.multi_dot([x_c, np.diag(u_z**2), x_c.T])
+    assert np.allclose(fmc.psi_y, ad_contr + vol_contr + height_contr, rtol=1e-14, atol=1e-12)
+
+    # the volume contribution of each observation depends on its own air density
+    fmc.UNC_AIR_DENS = fmc.UNC_HEIGHT = False
+    fmc.cal_psi_y(u_airdens, air_densities, rv)
+    assert np.allclose(fmc.psi_y, vol_contr, rtol=1e-14, atol=1e-12)
+    fmc.cal_psi_y(u_airdens, np.full(3, air_densities.mean()), rv)
+    assert not np.allclose(fmc.psi_y, vol_contr, rtol=1e-3, atol=0)
+
+
+def test_low_rank_psi_y(tmp_path, make_set, monkeypatch):
+    # a typical calibration of a set of 64 weights against a standard, with 98 observations and 65 unknowns
+    rng = np.random.default_rng(1)
+    ids = [f'100_{i}' for i in range(64)]
+    pairs = [(i, '100s') for i in ids] + list(zip(ids[:33], ids[1:34]))
+    inputdata = np.asarray(
+        [(p, m, d, 1.) for (p, m), d in zip(pairs, 1e-4 * rng.normal(size=len(pairs)))],
+        dtype=[('+ weight group', object), ('- weight group', object),
+               ('mass difference (g)', 'float64'), ('balance uncertainty (' + MU_STR + 'g)', 'float64')])
+    fmc = FinalMassCalc(
+        str(tmp_path), 'Client',
+        make_set('Client', ids, expansions=0., vols=list(12.5 + rng.random(64)), heights=list(20 + rng.random(64))),
+        None, make_set('Standard', ['100s'], [99.9999], expansions=0., vols=12.4, heights=30.), inputdata, nbc=False,
+    )
+    fmc.parse_inputdata_to_matrices()
+    assert (fmc.num_obs, fmc.num_unknowns) == (98, 65)
+
+    # the air density and volume contributions are of total rank 66, so psi_y isn't formed in full
+    # (with the height contribution too, the total rank would be 131, and the dense solve is quicker)
+    air_densities = 1.2 + 0.01 * rng.random(97)
+    fmc.BUOYANCY_CORR = fmc.HEIGHT_CORR = True
+    fmc.UNC_AIR_DENS = fmc.UNC_VOL = True
+    fmc.UNC_HEIGHT = False
+    fmc.apply_corrections_to_mass_differences(air_densities)
+    fmc.cal_psi_y(np.full(97, 0.001), air_densities, None)
+    psi_y = fmc.psi_y
+
+    def dense_least_squares(*args):
+        raise AssertionError('solved in full')
+
+    with monkeypatch.context() as m:
+        m.setattr(covariance, 'dense_least_squares', dense_least_squares)
+        fmc.do_least_squares()
+    b, psi_bmeas = fmc.b, fmc.psi_bmeas
+
+    # the same as the solution with the matrix in full
+    fmc.cal_psi_y(np.full(97, 0.001), air_densities, None)
+    fmc.DENSE_PSI_Y = True
+    assert np.array_equal(fmc.psi_y, psi_y)
+    fmc.do_least_squares()
+    assert np.allclose(fmc.b, b, rtol=0, atol=1e-12)
+    assert np.allclose(fmc.psi_bmeas, psi_bmeas, rtol=1e-9)
@@ -166,7 +166,7 @@ def test_least_squares():
                    abs=1e-9
                 )
 
-    assert fmc.leastsq_meta['Sum of residues squared (' + MU_STR + 'g^2)'] == 128.83941
+    assert fmc.leastsq_meta['Sum of residues squared (' + MU_STR + 'g^2)'] == 128.839407
 
     for row in range(len(collated)):
         for col in range(5):
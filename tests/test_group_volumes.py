@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from mass_circular_weighing.admin_details import AdminDetails
+from mass_circular_weighing.routines.analyse_circ_weigh import get_all_volumes, corrected_volume
+
+
+def make_cfg(make_set):
+    cfg = object.__new__(AdminDetails)
+    cfg.all_client_wts = make_set('Client', ['100a', '50a', '50b'], nominals=[100, 50, 50],
+                                  densities=[7950., 8000., 7900.], u_density=1., expansions=[45., 48., 50.])
+    cfg.all_stds = make_set('Standard', ['100s', '50s'], nominals=[100, 50], u_density=1.)
+    cfg.all_checks = make_set('Check', ['50c'], nominals=50, densities=None, u_density=1., expansions=None)
+    cfg.scheme = (['Weight groups'], [['100a 50a+50b 100s', '100', 'bal', '2'], ['50c 50s', '50', 'bal', '2']])
+    cfg._group_volumes = None
+    return cfg
+
+
+def test_group_volumes(make_set):
+    cfg = make_cfg(make_set)
+    gv = cfg.group_volumes
+    assert cfg.group_volumes is gv
+    # the first scheme entry is worked out in advance, the second has no volume for 50c
+    assert list(gv._entries) == [('100a', '50a+50b', '100s')]
+
+    wt_grps = ['100a', '50a+50b', '100s']
+    vols_20, vols_T = get_all_volumes(cfg, wt_grps, 21.5)
+    assert vols_20 == pytest.approx([100000 / 7950, 50000 / 8000 + 50000 / 7900, 100000 / 8000])
+    expected = [
+        corrected_volume(100000 / 7950, 21.5, 45.),
+        corrected_volume(50000 / 8000, 21.5, 48.) + corrected_volume(50000 / 7900, 21.5, 50.),
+        corrected_volume(100000 / 8000, 21.5, 48.),
+    ]
+    assert vols_T == pytest.approx(expected, rel=1e-14)
+
+    # the results can be changed (e.g. resized) by the caller without changing the cached volumes
+    vols_20.resize(5, refcheck=False)
+    assert get_all_volumes(cfg, wt_grps)[0] == pytest.approx(vols_20[:3])
+
+    with pytest.raises(ValueError, match='not known'):
+        get_all_volumes(cfg, ['50c', '50s'])
+    with pytest.raises(ValueError, match='1x is not in any'):
+        get_all_volumes(cfg, ['1x', '50s'])
+
+    # new weight sets give new group volumes
+    cfg.all_checks = None
+    assert cfg.group_volumes is not gv
+    assert np.isnan(cfg.group_volumes.all_wts.array('Vol (mL)')).sum() == 0
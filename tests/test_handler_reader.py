@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from msl.equipment import MSLTimeoutError
+
+from mass_circular_weighing.equip.simulator import VirtualClock, WeightHandler, MettlerSimulator, HANDLER_IDS
+from mass_circular_weighing.equip.handler_reader import HandlerReader
+
+
+def test_reply_and_deadline():
+    clock = VirtualClock(speedup=100)
+    handler = WeightHandler(clock, masses={1: 500.000012}, lift_positions=('top', 'weighing'))
+    sim = MettlerSimulator(clock, 'B987654321', handler=handler, carousel_id=HANDLER_IDS['AX1006'], timeout=5)
+    reader = HandlerReader(clock)
+
+    # the reply is posted as soon as the movement ends, with the caller free to do other things meanwhile
+    t0 = clock()
+    sim.write('MOVE3')
+    reader.expect(sim, timeout=60)
+    idle_calls = []
+    assert reader.wait(idle=lambda: idle_calls.append(clock())) == 'ready'
+    assert handler.move_time * 2 <= clock() - t0 < handler.move_time * 2 + 5
+    assert idle_calls
+
+    # no reply before the deadline
+    reader.expect(sim, timeout=12)
+    assert reader.wait() is None
+    assert not reader.is_waiting
+
+    reader.close()
+    reader._thread.join(timeout=5)
+    assert not reader._thread.is_alive()
+
+
+def test_close_while_waiting():
+    clock = VirtualClock(speedup=100)
+    handler = WeightHandler(clock, masses={1: 500.000012}, lift_positions=('top', 'weighing'))
+    sim = MettlerSimulator(clock, 'B987654321', handler=handler, carousel_id=HANDLER_IDS['AX1006'], timeout=5)
+    reader = HandlerReader(clock)
+
+    # closing releases the caller and stops the read in progress, long before the deadline
+    sim.write('MOVE3')
+    reader.expect(sim, timeout=3600)
+    replies = []
+    waiter = threading.Thread(target=lambda: replies.append(reader.wait()))
+    waiter.start()
+    reader.close()
+    waiter.join(timeout=5)
+    assert replies == [None]
+    assert not reader._thread.is_alive()
+
+
+class SlowConnection(object):
+
+    def read(self):
+        time.sleep(0.5)
+        raise MSLTimeoutError
+
+
+def test_wait_is_bounded():
+    # the wait ends at the deadline plus the grace time, even if a read of the connection takes longer
+    reader = HandlerReader(grace=0.1)
+    reader.expect(SlowConnection(), timeout=0.1)
+    t0 = time.perf_counter()
+    assert reader.wait() is None
+    assert time.perf_counter() - t0 < 0.4
+
+    # and the late read does not post a reply for the next command
+    reader.expect(SlowConnection(), timeout=0.1)
+    assert reader.wait() is None
+    reader.close()
+    assert not reader._thread.is_alive()
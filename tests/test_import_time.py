@@ -0,0 +1,75 @@
+import re
+import sys
+import subprocess
+
+import pytest
+
+# the core modules, which are used by analysis workers and batch jobs, and mustn't need Qt or the equipment
+core_modules = [
+    'mass_circular_weighing',
+    'mass_circular_weighing.routine_classes.circ_weigh_class',
+    'mass_circular_weighing.routine_classes.final_mass_calc_class',
+    'mass_circular_weighing.routines.analyse_circ_weigh',
+    'mass_circular_weighing.routines',
+]
+gui_modules = ('msl.qt', 'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'winsound', 'mass_circular_weighing.gui')
+max_import_time = 1.5  # seconds, for the modules of this package (not including numpy and msl.io)
+
+
+def import_in_subprocess(module):
+    """Imports a module in a new interpreter, and returns the modules that were loaded
+    and the import times (self, cumulative) in µs of each module of this package"""
+    code = f'import sys, {module}; print(" ".join(sorted(sys.modules)))'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        m = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)', line)
+        if m and m.group(3).startswith('mass_circular_weighing'):
+            times[m.group(3)] = int(m.group(1)), int(m.group(2))
+    return proc.stdout.split(), times
+
+
+@pytest.mark.parametrize('module', core_modules)
+def test_core_imports(module):
+    modules, times = import_in_subprocess(module)
+    assert not [m for m in modules if m.startswith(gui_modules)]
+    assert not [m for m in modules if m.startswith('mass_circular_weighing.equip')]
+    # a benchmark to guard against slow imports creeping in to the core modules
+    assert sum(t[0] for t in times.values()) < max_import_time * 1e6
+
+
+def test_equip_imports_lazily():
+    modules, times = import_in_subprocess('mass_circular_weighing.equip')
+    assert not [m for m in modules if m.startswith(gui_modules)]
+    assert [m for m in modules if m.startswith('mass_circular_weighing.equip')] == ['mass_circular_weighing.equip']
+
+    # Qt is only needed once the operator is prompted
+    for module in ['mass_circular_weighing.equip.connection_manager', 'mass_circular_weighing.equip.mdebalance']:
+        modules, times = import_in_subprocess(module)
+        assert not [m for m in modules if m.startswith(gui_modules)]
+
+
+def test_deferred_imports():
+    # openpyxl, requests and sqlite3 are imported when first used, as the admin details are usually cached
+    for module, deferred in [
+        ('mass_circular_weighing.admin_details', 'openpyxl'),
+        ('mass_circular_weighing.equip.ambient_checks', 'requests'),
+        ('mass_circular_weighing.equip.ambient_checks', 'sqlite3'),
+    ]:
+        modules, times = import_in_subprocess(module)
+        assert deferred not in modules
+
+
+def test_import_profiler():
+    code = ('from mass_circular_weighing.startup_profile import ImportProfiler; '
+            'p = ImportProfiler().install(); '
+            'import mass_circular_weighing.routines; '
+            'p.mark("imported"); p.uninstall(); '
+            'assert p.times["mass_circular_weighing.routines"][1] >= p.times["mass_circular_weighing.routines"][0]; '
+            'assert [m[0] for m in p.marks] == ["imported"]; '
+            'p.report()')
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert 'mass_circular_weighing.routines.run_circ_weigh' in proc.stderr
+    assert 'numpy' in proc.stderr
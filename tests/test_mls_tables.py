@@ -0,0 +1,107 @@
+import os
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from msl.io import Dataset, read
+
+from mass_circular_weighing.constants import MU_STR
+from mass_circular_weighing.routine_classes.final_mass_calc_class import FinalMassCalc, nominal_masses
+
+
+def make_fmc(tmp_path, make_set):
+    inputdata = np.asarray([
+        ('100a', '100s', 0.0001, 1.),
+        ('100b', '100c', -0.0002, 1.),
+        ('100c', '100s', 0.00005, 1.),
+        ('100a', '100b', 0.0003, 1.),
+    ], dtype=[('+ weight group', object), ('- weight group', object),
+              ('mass difference (g)', 'float64'), ('balance uncertainty (' + MU_STR + 'g)', 'float64')])
+    fmc = FinalMassCalc(
+        str(tmp_path), 'Client', make_set('Client', ['100a', '100b']), make_set('Check', ['100c'], [100.0001]),
+        make_set('Standard', ['100s'], [99.9999]), inputdata,
+    )
+    fmc.add_data_to_root()
+    return fmc
+
+
+def test_tables(tmp_path, make_set):
+    fmc = make_fmc(tmp_path, make_set)
+
+    res = fmc.inputdatares
+    assert res.dtype['mass difference (g)'] == float and res.dtype['residual (' + MU_STR + 'g)'] == float
+    assert list(res['+ weight group']) == ['100a', '100b', '100c', '100a', '100s']
+    assert res['- weight group'][-1] is None
+    assert np.array_equal(res['mass difference (g)'], fmc.y)
+
+    table = fmc.summarytable
+    assert list(table['Weight ID']) == ['100a', '100b', '100c', '100s']
+    assert list(table['Set ID']) == ['Client', 'Client', 'Check', 'Standard']
+    assert list(table['Nominal (g)']) == ['100'] * 4
+    assert np.array_equal(table['95% CI'], np.round(2 * fmc.std_uncert_b, 3))
+    assert all(table['Cov'] == 2)
+    assert np.isnan(table['Reference value (g)'][:2]).all() and np.isnan(table['Shift (' + MU_STR + 'g)'][:2]).all()
+    assert table['Reference value (g)'][2] == 100.0001
+    assert table['Shift (' + MU_STR + 'g)'][3] == np.round((fmc.b[3] - 99.9999) * 1e6, 3)
+
+    # the tables are saved with numeric columns, and the rows can still be read by position
+    fmc.save_to_json_file()
+    mls = read(os.path.join(str(tmp_path), 'Client_finalmasscalc.json'))['2: Matrix Least Squares Analysis']
+    saved = mls['Mass values from least squares solution']
+    assert saved.dtype == table.dtype
+    assert list(saved.metadata.get('metadata')['headers']) == list(table.dtype.names)
+    assert saved[2][1] == '100c' and saved[2][7] == 100.0001
+    residuals = mls['Input data with least squares residuals']['residual (' + MU_STR + 'g)']
+    assert np.array_equal(residuals, res['residual (' + MU_STR + 'g)'])
+
+
+class WordTable(object):
+    """Records the cells of a table added to a Word document"""
+
+    def __init__(self):
+        self.cells = {}
+        self.Range = mock.MagicMock()
+        self.Rows = mock.MagicMock()
+        self.Columns = mock.MagicMock()
+
+    def Cell(self, row, col):
+        return self.cells.setdefault((row, col), mock.MagicMock())
+
+    def text(self, row):
+        return [cell.Range.Text for (r, c), cell in sorted(self.cells.items()) if r == row]
+
+
+def test_word_table_massdata(tmp_path, make_set):
+    pytest.importorskip('msl.loadlib')
+    from mass_circular_weighing.routine_classes.results_summary_Word import WordDoc, greg_format
+
+    fmc = make_fmc(tmp_path, make_set)
+    fmc.save_to_json_file()
+    mvals = read(os.path.join(str(tmp_path), 'Client_finalmasscalc.json'))[
+        '2: Matrix Least Squares Analysis']['Mass values from least squares solution']
+
+    tables = []
+    doc = WordDoc.__new__(WordDoc)  # without starting Word
+    doc.oDoc = mock.MagicMock()
+    doc.oDoc.Tables.Add.side_effect = lambda *args: tables.append(WordTable()) or tables[-1]
+    doc.smallfont = 9
+    doc.make_table_massdata(mvals, 4)
+
+    # the reference value and shift of a client weight are nan, and are left blank
+    cells = tables[0]
+    assert cells.text(1) == list(mvals.dtype.names)
+    assert cells.text(2)[1:4] == ['100a', 'Client', greg_format(fmc.b[0])]
+    assert cells.text(2)[-2:] == ['', '']
+    assert cells.text(4)[-2:] == [str(mvals[2][7]), str(mvals[2][8])] and 'nan' not in cells.text(4)
+
+    # a single row of data
+    row = Dataset(name='row', parent=None, read_only=True, data=np.array(list(mvals[0]), dtype=object),
+                  metadata={'headers': list(mvals.dtype.names)})
+    doc.make_table_massdata(row, 4)
+    assert tables[1].text(2) == cells.text(2)
+
+
+def test_nominal_masses():
+    assert nominal_masses([1000.0002, 0.99999, 0.5001, 0.02, 0.00001, 20.5]) == \
+        ['1000', '1', '0.5', '0.02', '0', '20']
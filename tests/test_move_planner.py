@@ -0,0 +1,91 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip import move_planner
+from mass_circular_weighing.equip.move_planner import MovePlanner
+from mass_circular_weighing.equip.simulator import simulate_record
+
+
+def test_carousel_plan():
+    planner = MovePlanner(4, carousel=True)
+    assert planner.suggest(3) == (None, None)
+    # 6 s to start and stop, and 4 s per step
+    for a, b in [(1, 2), (2, 3), (3, 1)]:
+        planner.record(a, b, 6 + 4 * planner.steps(a, b))
+    assert planner.steps(4, 1) == 1 and planner.steps(1, 3) == 2
+    fixed, per_step = planner.model()
+    assert abs(fixed - 6) < 1e-9 and abs(per_step - 4) < 1e-9
+    assert abs(planner.move_time(4, 2) - 14) < 1e-9   # estimated
+
+    positions, cycle_time = planner.suggest(3)
+    assert cycle_time == 3 * 6 + 4 * 4     # any three positions need four steps around the carousel
+    assert planner.segment_times(positions) is not None
+
+
+def test_model_is_fitted_once(monkeypatch):
+    fits = []
+    polyfit = move_planner.np.polyfit
+    monkeypatch.setattr(move_planner.np, 'polyfit', lambda *args: fits.append(args) or polyfit(*args))
+
+    planner = MovePlanner(8, carousel=True)
+    planner.record(1, 2, 10)
+    planner.record(2, 4, 14)
+    planner.suggest(5)
+    planner.suggest(4)
+    assert len(fits) == 1
+
+    # until another time is recorded
+    planner.record(1, 2, 9)
+    planner.suggest(5)
+    assert len(fits) == 1
+    planner.record(4, 8, 22)
+    planner.suggest(5)
+    assert len(fits) == 2
+
+
+def test_linear_plan():
+    planner = MovePlanner(12, carousel=False)
+    assert planner.all_positions[0] == 0
+    planner.record(0, 1, 5)
+    planner.record(1, 3, 9)
+    assert planner.steps(0, 11) == 11
+    positions, cycle_time = planner.suggest(3)
+    assert sorted(positions) in [[i, i + 1, i + 2] for i in range(10)]
+    assert cycle_time == 3 * 1 + 4 * 4   # 1 s to start and stop, and 4 s per step
+
+    path = os.path.join(tempfile.mkdtemp(), 'AT106' + '_move_times.json')
+    planner.path = path
+    assert planner.save()
+    assert MovePlanner(12, carousel=False, path=path).times == planner.times
+    assert MovePlanner(10, carousel=False, path=path).times == {}
+
+
+def test_segment_padding():
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    folder = tempfile.mkdtemp()
+    record = SimpleNamespace(
+        alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+        user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 20},
+        connection=SimpleNamespace(properties={'intcaltimeout': 120, 'move_times_folder': folder}),
+    )
+    # at a lower speedup, a delay of the thread in real time is a smaller error in virtual time
+    sim_record, _ = simulate_record(record, masses={1: 500.000012, 2: 500.000062, 3: 499.99998}, speedup=200)
+    bal = AWBalCarousel(sim_record)
+    bal.identify_handler()
+    bal._positions = [1, 2, 3]
+    bal.check_loading()
+
+    # the move back from 3 to 1 is two steps, so is allowed longer than the others (by the 5 s of a step)
+    segments = [bal.segment_move_time(pos) for pos in bal.positions]
+    assert segments[0] == bal.move_time
+    assert abs(segments[1] - segments[2]) <= 2
+    assert max(segments[1:]) <= bal.move_time - 3
+
+    # the times are cached for the balance
+    assert os.path.isfile(os.path.join(folder, 'AX1006_move_times.json'))
+    bal2 = AWBalCarousel(sim_record)
+    assert bal2.move_planner.times == bal.move_planner.times
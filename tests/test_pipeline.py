@@ -0,0 +1,47 @@
+import sys
+import subprocess
+
+import numpy as np
+
+from mass_circular_weighing.constants import MU_STR
+from mass_circular_weighing.routines.pipeline import select_datasets
+
+
+data = np.empty(3, dtype=[
+    ('Nominal (g)', float), ('Scheme entry', object), ('Run #', object),
+    ('+ weight group', object), ('- weight group', object),
+    ('mass difference (g)', 'float64'), ('balance uncertainty (' + MU_STR + 'g)', 'float64'),
+    ('Acceptance met?', bool), ('residual (' + MU_STR + 'g)', 'float64'),
+])
+data['Nominal (g)'] = [1000, 1000, 500]
+data['Scheme entry'] = ['1000 1000s', '1000 1000s', '500 500s']
+data['Run #'] = ['1', '2', '1+2+3']
+data['+ weight group'] = ['1000', '1000', '500']
+data['- weight group'] = ['1000s', '1000s', '500s']
+data['mass difference (g)'] = [0.00001, 0.000011, -0.000002]
+data['balance uncertainty (' + MU_STR + 'g)'] = [1, 1, 0.5]
+data['Acceptance met?'] = [True, False, True]
+
+
+def test_select_datasets():
+    inputdata, incl = select_datasets(data)
+    assert len(inputdata) == 2
+    assert list(inputdata['mass difference (g)']) == [0.00001, -0.000002]
+    assert incl == {('1000.0', '1000 1000s', '1'),
+                    ('500.0', '500 500s', '1'), ('500.0', '500 500s', '2'), ('500.0', '500 500s', '3')}
+
+    inputdata, incl = select_datasets(data, 'all')
+    assert len(inputdata) == 3
+
+    inputdata, incl = select_datasets(data, {('1000.0', '1000 1000s', '2')})
+    assert len(inputdata) == 1
+    assert inputdata['mass difference (g)'][0] == 0.000011
+    assert inputdata.dtype.names == ('+ weight group', '- weight group', 'mass difference (g)',
+                                     'balance uncertainty (' + MU_STR + 'g)')
+
+
+def test_no_qt_import():
+    code = 'import sys; import mass_circular_weighing.routines.pipeline; ' \
+           'print(any(m.startswith(("msl.qt", "PyQt", "PySide")) for m in sys.modules))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from msl.io import JSONWriter, read
+
+from mass_circular_weighing.routines.json_circweigh_utils import save_data, read_manifest
+from mass_circular_weighing.routines.recover_backups import recover_backups
+
+SE = 'A B'
+
+
+def make_root(url, run_id, timestamp, complete=True, value=1.):
+    """A root as it would be after a weighing, with the existing content of url (if any)"""
+    root = JSONWriter()
+    if os.path.isfile(url):
+        existing = read(url)
+        existing.read_only = False
+        root.set_root(existing)
+    group = root.require_group('Circular Weighings').require_group(SE)
+    if 'measurement_' + run_id in group:
+        root.remove(group['measurement_' + run_id].name)
+    group.require_dataset('measurement_' + run_id, data=np.full((2, 2), value)).add_metadata(**{
+        'Mmt Timestamp': timestamp.strftime('%d-%m-%Y %H:%M:%S'),
+        'Weighing complete': complete,
+    })
+    return root
+
+
+def weighings(url):
+    group = read(url)['Circular Weighings'][SE]
+    return {d.name.split('/')[-1]: d.metadata['Mmt Timestamp'] for d in group.datasets()}
+
+
+def test_recover_backups(tmp_path):
+    folder = tmp_path / 'network' / 'Job'
+    folder.mkdir(parents=True)
+    url = str(folder / 'AB.json')
+    offline = str(tmp_path / 'missing' / 'Job' / 'AB.json')  # as for a network drive which is not available
+    local = str(tmp_path / 'local')
+
+    t1 = datetime(2021, 3, 4, 9, 0, 0)
+    assert save_data(make_root(url, 'run_1', t1), url, 'run_1', t1, local_backup_folder=local)
+
+    # run_2 is only saved locally, first part way through and then complete
+    t2 = datetime(2021, 3, 4, 10, 0, 0)
+    assert not save_data(make_root(url, 'run_2', t2, complete=False), offline, 'run_2', t2, local_backup_folder=local)
+    assert not save_data(make_root(url, 'run_2', t2, value=2.), offline, 'run_2', t2, local_backup_folder=local)
+
+    manifest = read_manifest(os.path.join(local, 'Job'))
+    assert manifest['AB_run_1_20210304_090000.json']['network saved'] is True
+    assert manifest['AB_run_2_20210304_100000.json']['network saved'] is False
+
+    assert recover_backups(str(folder), local_backup_folder=local, dry_run=True) == {url: [(SE, 'run_2', 'run_2')]}
+    assert 'measurement_run_2' not in weighings(url)
+
+    assert recover_backups(str(folder), local_backup_folder=local) == {url: [(SE, 'run_2', 'run_2')]}
+    merged = read(url)['Circular Weighings'][SE]['measurement_run_2']
+    assert merged.metadata['Weighing complete']
+    assert np.all(merged.data == 2.)
+    assert os.listdir(folder / 'backups') == ['AB_backup0.json']
+
+    # nothing more to merge
+    assert recover_backups(str(folder), local_backup_folder=local) == {}
+
+    # another weighing took run_2 in the network file, so the next local-only weighing (also run_2) becomes run_3
+    t3 = datetime(2021, 3, 5, 9, 0, 0)
+    assert not save_data(make_root(url, 'run_2', t3), offline, 'run_2', t3, local_backup_folder=local)
+    assert recover_backups(str(folder), local_backup_folder=local) == {url: [(SE, 'run_2', 'run_3')]}
+    assert weighings(url) == {
+        'measurement_run_1': '04-03-2021 09:00:00',
+        'measurement_run_2': '04-03-2021 10:00:00',
+        'measurement_run_3': '05-03-2021 09:00:00',
+    }
@@ -0,0 +1,54 @@
+import os
+import glob
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.simulator import simulate_record
+from mass_circular_weighing.equip.session import RecordingRecord, read_session, replay_balance, WRITE, READ
+
+masses = {1: 500.000012, 2: 500.000062}
+record = SimpleNamespace(
+    alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+    user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 20},
+    connection=SimpleNamespace(properties={'intcaltimeout': 120}),
+)
+
+
+def weigh(bal):
+    bal.identify_handler()
+    bal._positions = [1, 2]
+    bal.check_loading()
+    readings = []
+    for pos in [1, 2, 2, 1]:
+        bal.load_bal(str(pos), pos)
+        readings.append(bal.get_mass_stable(str(pos)))
+        bal.unload_bal(str(pos), pos)
+    bal.close_connection()
+    return readings
+
+
+def test_record_and_replay():
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    folder = tempfile.mkdtemp()
+    sim_record, _ = simulate_record(record, masses=masses, speedup=5000, noise=3e-7, seed=3)
+    recorded = weigh(AWBalCarousel(RecordingRecord(sim_record, folder)))
+
+    path = glob.glob(os.path.join(folder, 'AX1006_*.jsonl.gz'))[0]
+    header, events = read_session(path)
+    assert header['serial'] == 'B987654321'
+    assert header['user_defined']['weighing_mode'] == 'aw_c'
+    assert events[0][1:] == [WRITE, 'X'] and events[1][1:] == [READ, 'ES']
+    assert all(e1[0] <= e2[0] for e1, e2 in zip(events[:-1], events[1:]))
+
+    bal = replay_balance(path, speedup=5000)
+    assert weigh(bal) == recorded
+    assert bal.connection.remaining == 0
+
+    bal = replay_balance(path, speedup=5000)
+    with pytest.raises(ValueError, match='diverged'):
+        bal.get_mass_instant()
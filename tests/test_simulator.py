@@ -0,0 +1,145 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.simulator import VirtualClock, WeightHandler, MettlerSimulator, ArduinoSimulator, \
+    HANDLER_IDS, SIMULATED_AMBIENT, simulate_record
+from mass_circular_weighing.routine_classes.circ_weigh_class import CircWeigh
+
+# a simulated AX10005 with three weight groups, in g, differing by 50 µg and -30 µg from the first
+masses = {1: 1000.000012, 2: 1000.000062, 3: 999.999982}
+record = SimpleNamespace(
+    alias='AX10005', manufacturer='Mettler Toledo', model='AX10005', serial='B123456789',
+    user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 30},
+    connection=SimpleNamespace(properties={'intcaltimeout': 120}),
+)
+
+
+def test_carousel_commands():
+    clock = VirtualClock(speedup=1000)
+    handler = WeightHandler(clock, masses=masses, lift_positions=('top', 'panbraking', 'weighing', 'calibration'))
+    sim = MettlerSimulator(clock, 'B123456789', handler=handler, carousel_id=HANDLER_IDS['AX10005'],
+                           resolution=0.000001)
+
+    assert sim.query('X') == 'ES'
+    assert sim.query('I4')[6:-1] == 'B123456789'
+    assert sim.query('IDENTIFY').split(', ')[:2] == ['H10005', 'serial number #0003']
+    assert sim.query('STATUS') == '1 in top position. ready'
+    assert sim.query('LIFT') == 'ERROR: In top position already. ready'
+
+    t0 = clock()
+    assert sim.query('MOVE3') == 'ready'
+    assert clock() - t0 >= 2 * handler.move_time  # the shortest route on the carousel is two steps
+    assert sim.query('SINK') == 'ready'
+    assert sim.query('SINK') == 'ready'
+    assert sim.query('STATUS') == '3 in weighing position. ready'
+
+    m = sim.query('SI').split()
+    assert m[:2] == ['S', 'D']   # still settling
+    m = sim.query('S').split()
+    assert m[:2] == ['S', 'S'] and m[3] == 'g'
+    assert float(m[2]) == masses[3]
+
+    assert sim.query('Z') == 'Z A'
+    assert float(sim.query('SI').split()[2]) == 0
+
+
+def test_arduino_commands():
+    clock = VirtualClock(speedup=1000)
+    handler = WeightHandler(clock, masses=masses, lift_positions=('top', 'loading', 'weighing'))
+    arduino = ArduinoSimulator(clock, '95730333238351F0A011', handler, timeout=30)
+    balance = MettlerSimulator(clock, 'B123456789', handler=handler, resolution=0.000001, settle_time=0)
+
+    assert arduino.query('ArduinoID') == '95730333238351F0A011'
+    assert arduino.query('STATUS') == 'IDLE 1U'
+    assert arduino.query('MOVE TO 2W') == 'IDLE 2W'
+    assert float(balance.query('SI').split()[2]) == masses[2]
+    assert arduino.query('MOVE TO 2U') == 'IDLE 2U'
+    assert float(balance.query('SI').split()[2]) == 0
+
+
+def test_wait_for_elapse():
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    sim_record, _ = simulate_record(record, masses=masses, speedup=1000)
+    bal = AWBalCarousel(sim_record)
+    idle_calls = []
+    bal.idle = lambda: idle_calls.append(bal.clock())
+
+    # the wait sleeps in virtual time, calling the idle function in between
+    t0 = bal.clock()
+    bal.wait_for_elapse(30)
+    assert 30 <= bal.clock() - t0 < 31
+    assert len(idle_calls) > 10 and idle_calls[-1] - idle_calls[0] > 29
+
+
+def test_circular_weighing():
+    from mass_circular_weighing.equip import AWBalCarousel
+    from mass_circular_weighing.routines.json_circweigh_utils import check_for_existing_weighdata
+    from mass_circular_weighing.routines.run_circ_weigh import do_circ_weighing
+
+    se = '1000 1000MA 1000MB'
+    sim_record, _ = simulate_record(record, masses=masses, speedup=2000, drift=2e-8, noise=2e-7, seed=1)
+    bal = AWBalCarousel(sim_record)
+    bal._ambient_details = dict(SIMULATED_AMBIENT)
+    assert bal.identify_handler()
+
+    bal._positions = [1, 2, 3]
+    assert bal.check_loading()
+    assert bal.centring([1], 1)
+
+    folder = tempfile.mkdtemp()
+    url = os.path.join(folder, 'client_1000.json')
+    root = check_for_existing_weighdata(folder, url, se)
+    root = do_circ_weighing(bal, se, root, url, 'run_1', local_backup_folder=folder, **{'Unit': 'g'})
+    assert root['Circular Weighings'][se]['measurement_run_1'].metadata['Weighing complete']
+
+    data = root['Circular Weighings'][se]['measurement_run_1']
+    weighing = CircWeigh(se)
+    weighing.generate_design_matrices([])
+    drift = weighing.determine_drift(data[:, :, 1])
+    analysis = weighing.item_diff(drift)
+    assert np.allclose(analysis['mass difference'], [-0.000050, 0.000080, -0.000030], rtol=0, atol=2e-6)
+
+    # the time for each reading is divided between its phases: the AX10005 settles for stable_wait in both
+    # the panbraking and weighing positions
+    timing = root['Circular Weighings'][se]['timing_run_1']
+    assert timing.shape == (data.shape[0] * 3,)
+    assert list(timing['Position'][:3]) == [1, 2, 3]
+    assert np.all(timing['settle'] >= 60) and np.median(timing['settle']) < 62
+    assert np.all(timing['move'] > 0) and np.all(timing['read'] > 2)
+
+
+def test_circular_weighing_stopped_early():
+    from msl.io import read
+    from mass_circular_weighing.equip import AWBalCarousel
+    from mass_circular_weighing.routines.json_circweigh_utils import check_for_existing_weighdata
+    from mass_circular_weighing.routines.run_circ_weigh import do_circ_weighing
+
+    se = '1000 1000MA 1000MB'
+    sim_record, _ = simulate_record(record, masses=masses, speedup=2000, noise=2e-4, seed=1)
+    bal = AWBalCarousel(sim_record)
+    bal._ambient_details = dict(SIMULATED_AMBIENT)
+    assert bal.identify_handler()
+
+    bal._positions = [1, 2, 3]
+    assert bal.check_loading()
+
+    folder = tempfile.mkdtemp()
+    url = os.path.join(folder, 'client_1000.json')
+    root = check_for_existing_weighdata(folder, url, se)
+    root = do_circ_weighing(bal, se, root, url, 'run_1', local_backup_folder=folder, early_stop=2,
+                            **{'Unit': 'g', 'Max stdev from CircWeigh (µg)': 1})
+    data = root['Circular Weighings'][se]['measurement_run_1']
+    assert 'Stopped early' in data.metadata
+    assert not data.metadata['Weighing complete']
+
+    # only the completed cycles are saved
+    saved = read(url)['Circular Weighings'][se]['measurement_run_1']
+    assert saved.shape == (2, 3, 2)
+    assert np.array_equal(saved[:, :, :], data[:, :, :])
+    assert np.all(np.isfinite(saved[:, :, 1]))
@@ -0,0 +1,86 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.stability import SettleDetector
+from mass_circular_weighing.equip.simulator import simulate_record
+
+
+def test_settle_detector():
+    # readings in g settling exponentially onto 100 g, with a resolution of 1 µg
+    rng = np.random.default_rng(4)
+    sd = SettleDetector(0.000001, window=5, timeout=30, interval=0.5)
+    sd.reset(0)
+    stable = False
+    t = 0
+    while not stable and not sd.timed_out(t):
+        t += sd.interval
+        stable = sd.add(t, 100 + 0.0001 * np.exp(-t) + 0.0000003 * rng.standard_normal())
+    assert stable
+    assert 5 <= sd.settle_time <= 8
+    assert abs(sd.mean - 100) < 0.000002
+
+    # a steady drift of 5 µg/s is not stable
+    sd.reset(0)
+    assert not any(sd.add(t, 100 + 0.000005 * t) for t in np.arange(0, 10, 0.5))
+    assert sd.settle_time is None
+
+
+def test_from_properties():
+    assert SettleDetector.from_properties({'intcaltimeout': 30}, 0.00001) is None
+    sd = SettleDetector.from_properties({'settle_detector': 'true', 'settle_window': '4', 'settle_slope': 0.5},
+                                        0.00001)
+    assert sd.window == 4
+    assert sd.max_slope == 0.5
+    assert sd.max_stdev == 2
+
+
+def test_get_mass_stable():
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    record = SimpleNamespace(
+        alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+        user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 30},
+        connection=SimpleNamespace(properties={'settle_detector': True, 'settle_timeout': 60}),
+    )
+    sim_record, _ = simulate_record(record, masses={2: 500.000012}, speedup=500, settle_time=8, noise=2e-7, seed=5)
+    bal = AWBalCarousel(sim_record)
+    bal.identify_handler()
+    bal._positions = [2]
+    bal._move_time = 10
+
+    bal.load_bal('500', 2)
+    reading = bal.get_mass_stable('500')
+    assert abs(reading - 500.000012) < 0.000003  # within the limits of the detector
+    # the fixed wait of stable_wait is replaced by the time to reach a stable reading
+    assert 2 <= bal.settle_time < 10
+
+
+def test_get_mass_stable_timeout():
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    record = SimpleNamespace(
+        alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+        user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 30},
+        connection=SimpleNamespace(properties={'settle_detector': True, 'settle_timeout': 20}),
+    )
+    # the noise is too large for the readings to be found stable
+    sim_record, _ = simulate_record(record, masses={2: 500.000012}, speedup=500, settle_time=8, noise=2e-5, seed=5)
+    bal = AWBalCarousel(sim_record)
+    bal.identify_handler()
+    bal._positions = [2]
+    bal._move_time = 10
+
+    bal.load_bal('500', 2)
+    m, stable = bal.wait_for_stable('500')
+    assert m is not None and not stable
+    assert bal.settle_time is None
+
+    # so no mass value is returned, and the weight is lifted off the pan
+    with pytest.raises(ValueError, match='settle detector'):
+        bal.get_mass_stable('500')
+    assert bal.connection.handler.lift_pos == 'top'
@@ -0,0 +1,86 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from mass_circular_weighing.equip.simulator import simulate_record
+
+masses = {1: 500.000012, 2: 500.000062}
+
+
+def make_balance(properties, speedup=200):
+    from mass_circular_weighing.equip import AWBalCarousel
+
+    record = SimpleNamespace(
+        alias='AX1006', manufacturer='Mettler Toledo', model='AX1006', serial='B987654321',
+        user_defined={'weighing_mode': 'aw_c', 'pos': 4, 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 20},
+        connection=SimpleNamespace(properties=properties),
+    )
+    sim_record, _ = simulate_record(record, masses=masses, speedup=speedup, settle_time=5, seed=2)
+    bal = AWBalCarousel(sim_record)
+    bal.identify_handler()
+    bal._positions = [1, 2]
+    bal._move_time = 10
+    return bal
+
+
+def test_stream_readings():
+    bal = make_balance({'continuous_output': 'SIR', 'stream_buffer': 500}, speedup=20)
+    bal.load_bal('1', 1)
+    assert bal.get_mass_instant() is not None
+    stream = bal.stream
+    assert stream.is_running and bal.connection is stream
+
+    bal.wait_for_elapse(5)
+    t, line = stream.next_reading(stable=True)
+    assert line.split()[:2] == ['S', 'S']
+    assert float(line.split()[2]) == masses[1]
+    # a dense, timestamped series of readings is kept for drift analysis
+    series = stream.readings(0)
+    assert len(series) > 20
+    assert all(t1 < t2 for (t1, _), (t2, _) in zip(series[:-1], series[1:]))
+
+    # the handler replies on the same connection while the balance streams
+    bal.unload_bal('1', 1)
+    bal.load_bal('2', 2)
+    assert abs(bal.get_mass_stable('2') - masses[2]) < 1e-9
+
+    raw = stream.connection
+    bal.close_connection()
+    assert bal.stream is None and bal.connection is raw
+    assert not stream.is_running
+
+
+def test_stream_with_settle_detector():
+    bal = make_balance({'continuous_output': 'SR', 'settle_detector': True, 'settle_window': 10})
+    bal.load_bal('2', 2)
+    reading = bal.get_mass_stable('2')
+    assert abs(reading - masses[2]) < 0.000002
+    assert bal.settle_time < 10
+    bal.close_connection()
+
+
+def make_mw_balance(noise):
+    from mass_circular_weighing.equip import MettlerToledo
+
+    record = SimpleNamespace(
+        alias='AX10005', manufacturer='Mettler Toledo', model='AX10005', serial='B123456789',
+        user_defined={'weighing_mode': 'mw', 'unit': 'g', 'resolution': '0.000001 g', 'stable_wait': 10},
+        connection=SimpleNamespace(properties={'continuous_output': 'SIR'}),
+    )
+    sim_record, _ = simulate_record(record, masses={1: 100.000102}, speedup=200, settle_time=0, noise=noise, seed=3)
+    return MettlerToledo(sim_record)
+
+
+def test_stream_stable_readings_are_distinct():
+    # each of the three readings is a new reading from the stream, so noisy readings are not taken as stable
+    bal = make_mw_balance(noise=50e-6)
+    with pytest.raises(ValueError, match='three close readings'):
+        bal.get_mass_stable('100')
+    bal.close_connection()
+
+    bal = make_mw_balance(noise=2e-7)
+    assert abs(bal.get_mass_stable('100') - 100.000102) < 2e-6
+    bal.close_connection()
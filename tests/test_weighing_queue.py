@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+import subprocess
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+from mass_circular_weighing.routines import weighing_queue
+from mass_circular_weighing.routines.json_circweigh_utils import data_file_lock
+from mass_circular_weighing.routines.weighing_queue import scheme_to_entries, plan_loadings, WeighingQueue, \
+    MainThreadPrompt, serve_prompts, run_balance_queue, PENDING, RUNNING, DONE, FAILED
+
+
+header = ['Weight groups', 'Nominal mass (g)', 'Balance alias', '# runs']
+rows = [
+    ['1000 1000MA 1000MB', 1000, 'AX10005', 3],
+    ['500 500MA 500MB', 500, 'AX1006', 3],
+    ['1000 1000s', 1000, 'AX10005', 2],
+    ['500 500s', 500, 'AX1006', 2],
+    ['1000MA 1000s 1000t', 1000, 'AX10005', 2],
+    [None, None, None, None],
+]
+
+
+def test_scheme_to_entries():
+    entries = scheme_to_entries(header, rows)
+    assert len(entries) == 5
+    assert entries[0] == {
+        'row': 0, 'scheme_entry': '1000 1000MA 1000MB', 'nominal': '1000', 'bal_alias': 'AX10005', 'num_runs': '3'
+    }
+    assert entries[3]['nominal'] == '500'
+
+
+def test_plan_loadings():
+    wtgrps_list = [row[0].split() for row in rows if row[0] and row[2] == 'AX10005']
+    loadings, allocation = plan_loadings(wtgrps_list, 4)
+    assert loadings == [['1000', '1000MA', '1000MB', '1000s'], ['1000MA', '1000s', '1000t']]
+    assert allocation == [0, 0, 1]
+
+    loadings, allocation = plan_loadings(wtgrps_list, 2)
+    assert loadings == [['1000', '1000s']]
+    assert allocation == [None, 0, None]
+
+
+def test_queue_resume():
+    entries = scheme_to_entries(header, rows)
+    for entry in entries:
+        entry.update({'loading': None, 'positions': None, 'status': PENDING, 'good runs': 0})
+
+    path = os.path.join(tempfile.mkdtemp(), 'client_weighing_queue.json')
+    queue = WeighingQueue(path, entries)
+    queue.set_status(queue.entries[0], DONE, 3)
+    queue.set_status(queue.entries[1], RUNNING)
+    with open(path) as fp:
+        assert json.load(fp)['Entries'][1]['status'] == RUNNING
+
+    # an interrupted entry is weighed again when the same queue is resumed
+    resumed = WeighingQueue(path, scheme_to_entries(header, rows))
+    assert resumed.entries[0]['status'] == DONE
+    assert resumed.entries[0]['good runs'] == 3
+    assert [e['scheme_entry'] for e in resumed.pending()] == [e['scheme_entry'] for e in entries[1:]]
+
+    # a changed scheme starts a new queue
+    new = WeighingQueue(path, entries[:2])
+    assert len(new.entries) == 2
+
+
+def test_data_file_lock():
+    folder = tempfile.mkdtemp()
+    lock = data_file_lock(os.path.join(folder, 'client_1000.json'))
+    assert lock is data_file_lock(os.path.join(folder, '.', 'client_1000.json'))
+    assert lock is not data_file_lock(os.path.join(folder, 'client_500.json'))
+
+    assert lock.acquire(blocking=False)
+    assert not data_file_lock(os.path.join(folder, 'client_1000.json')).acquire(blocking=False)
+    assert not lock.acquire(timeout=0.2)
+
+    # the lock is also held against other processes, e.g. the weighing window of the GUI
+    code = ('import sys; from mass_circular_weighing.routines.json_circweigh_utils import data_file_lock; '
+            'print(data_file_lock(sys.argv[1]).acquire(blocking=False))')
+    other = [sys.executable, '-c', code, os.path.join(folder, 'client_1000.json')]
+    assert subprocess.run(other, capture_output=True, text=True).stdout.strip() == 'False'
+    lock.release()
+    assert subprocess.run(other, capture_output=True, text=True).stdout.strip() == 'True'
+
+    with lock:
+        assert lock.locked()
+    assert not lock.locked()
+
+
+def test_queue_threads():
+    entries = scheme_to_entries(header, rows)
+    for entry in entries:
+        entry.update({'loading': None, 'positions': None, 'status': PENDING, 'good runs': 0})
+    queue = WeighingQueue(os.path.join(tempfile.mkdtemp(), 'client_weighing_queue.json'), entries)
+    assert queue.balances() == ['AX10005', 'AX1006']
+    assert len(queue.pending('AX1006')) == 2
+
+    def worker(alias):
+        for entry in queue.pending(alias):
+            queue.set_status(entry, DONE, int(entry['num_runs']))
+
+    threads = [threading.Thread(target=worker, args=(alias,)) for alias in queue.balances()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not queue.pending()
+    with open(queue.path) as fp:
+        assert all(e['status'] == DONE for e in json.load(fp)['Entries'])
+
+
+def test_prompts_in_main_thread(monkeypatch):
+    shown = []
+
+    class PromptThread(object):
+        reply = None
+
+        def prompt(self, args, kwargs):
+            shown.append((threading.current_thread(), args))
+            self.reply = True
+
+    monkeypatch.setitem(sys.modules, 'mass_circular_weighing.gui.threads.prompt_thread',
+                        SimpleNamespace(PromptThread=PromptThread))
+
+    requests = Queue()
+    replies = []
+
+    def worker():
+        pt = MainThreadPrompt(requests)
+        for pos in [1, 2]:
+            pt.show('ok_cancel', f'Please place weight in position {pos}')
+            replies.append(pt.wait_for_prompt_reply())
+
+    workers = [threading.Thread(target=worker) for i in range(2)]
+    for w in workers:
+        w.start()
+    serve_prompts(requests, workers)
+    for w in workers:
+        w.join()
+
+    assert replies == [True] * 4
+    assert len(shown) == 4
+    assert all(thread is threading.main_thread() for thread, args in shown)
+
+
+def test_balance_released_on_error(monkeypatch):
+    from mass_circular_weighing.equip import connections
+
+    entries = scheme_to_entries(header, rows)
+    for entry in entries:
+        entry.update({'loading': ['1000', '1000MA', '1000MB'], 'positions': None, 'status': PENDING, 'good runs': 0})
+    folder = tempfile.mkdtemp()
+    queue = WeighingQueue(os.path.join(folder, 'client_weighing_queue.json'), entries)
+    cfg = SimpleNamespace(folder=folder, client='client')
+    bal = SimpleNamespace(want_abort=False)
+
+    def load_entry(bal, entry, same_loading=False):
+        raise ConnectionError('lost connection to the weight handler')
+
+    released = []
+    monkeypatch.setattr(weighing_queue, 'load_entry', load_entry)
+    monkeypatch.setattr(connections, 'release', released.append)
+
+    with pytest.raises(ConnectionError):
+        run_balance_queue(cfg, queue, 'AX10005', bal=bal)
+
+    # the entry is not left running, and both its data file and the balance are released
+    assert queue.entries[0]['status'] == FAILED
+    assert [e['status'] for e in queue.pending('AX10005')] == [PENDING, PENDING]
+    lock = data_file_lock(os.path.join(folder, 'client_1000.json'))
+    assert lock.acquire(blocking=False)
+    lock.release()
+    assert released == [bal]
@@ -0,0 +1,77 @@
+import pickle
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from mass_circular_weighing.weight_set import WeightSet
+from mass_circular_weighing.admin_details import add_volumes
+from mass_circular_weighing.routines.analyse_circ_weigh import corrected_volume
+from mass_circular_weighing.routine_classes.final_mass_calc_class import filter_mass_set
+
+
+def test_volumes(make_set):
+    ws = make_set('Client', ['100a', '100b'])
+    ws['Density (kg/m3)'] = [8000., None]
+    add_volumes(ws)
+    assert ws['Vol (mL)'] == [12.5, None]
+    assert ws['Vol unc (mL)'][0] == pytest.approx(10 / 8000 * 12.5)
+    assert ws['Vol unc (mL)'][1] is None
+    assert ws.corrected_volumes(21.)[0] == corrected_volume(12.5, 21., 48.)
+    assert np.isnan(ws.corrected_volumes(21.)[1])
+
+
+def test_index_subset_union(make_set):
+    client = make_set('Client', ['100a', '100b', '100c'])
+    stds = make_set('Standard', ['100s', '100t'], densities=7950.)
+
+    assert client.index == {'100a': 0, '100b': 1, '100c': 2}
+    assert client.includes('100b') and not client.includes('100s')
+    assert list(client.positions(['100c', '100a'])) == [2, 0]
+    with pytest.raises(ValueError, match='100s is not in any'):
+        client.position('100s')
+
+    # a subset keeps the order of the set, and ignores Weight IDs from other sets
+    subset = client.subset(['100c', '100s', '100a'])
+    assert subset['Weight ID'] == ['100a', '100c']
+    assert subset['Vol (mL)'] == [12.5, 12.5]
+    assert subset['Num weights'] == 2
+    assert subset['Set type'] == 'Client'
+    assert client['Weight ID'] == ['100a', '100b', '100c']
+
+    union = WeightSet.union(client, None, stds, keys=['Vol (mL)', 'Container'])
+    assert list(union) == ['Weight ID', 'Vol (mL)', 'Set']
+    assert union['Weight ID'] == ['100a', '100b', '100c', '100s', '100t']
+    assert union['Set'] == ['Client'] * 3 + ['Standard'] * 2
+    assert union.position('100t') == 4
+    assert union.array('Vol (mL)')[3] == pytest.approx(100000 / 7950)
+    # the sets are unchanged
+    assert client['Weight ID'] == ['100a', '100b', '100c']
+    assert len(stds['Vol (mL)']) == 2
+
+    # replacing a column updates the index and arrays
+    union['Weight ID'] = ['a', 'b', 'c', 'd', 'e']
+    union['Vol (mL)'] = [1., 2., 3., 4., 5.]
+    assert union.position('e') == 4
+    assert union.array('Vol (mL)')[4] == 5.
+
+    for copy in [deepcopy(client), pickle.loads(pickle.dumps(client))]:
+        assert isinstance(copy, WeightSet)
+        assert copy == client
+        assert copy.position('100c') == 2
+
+
+def test_filter_mass_set(make_set):
+    client = make_set('Client', ['100a', '100b', '100c'])
+    dtype = [('+ weight group', object), ('- weight group', object),
+             ('mass difference (g)', 'float64'), ('balance uncertainty (ug)', 'float64')]
+    inputdata = np.asarray([('100a+100b', '100c', 0.1, 1.)], dtype=dtype)
+    assert filter_mass_set(client, inputdata)['Weight ID'] == ['100a', '100b', '100c']
+    inputdata = np.asarray([('100c', '100s', 0.1, 1.)], dtype=dtype)
+    filtered = filter_mass_set(dict(client), inputdata)
+    assert isinstance(filtered, WeightSet)
+    assert filtered['Weight ID'] == ['100c']
+
+    client['Set type'] = 'Other'
+    with pytest.raises(ValueError):
+        filter_mass_set(client, inputdata)
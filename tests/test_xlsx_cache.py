@@ -0,0 +1,109 @@
+import os
+import shutil
+
+from openpyxl import load_workbook
+
+from mass_circular_weighing import admin_details
+from mass_circular_weighing.admin_details import AdminDetails
+from mass_circular_weighing.utils import xlsx_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+massref_for_test = os.path.join(ROOT_DIR, 'tests', 'samples', 'MASSREF4tests.xlsx')
+
+
+def make_admin(massref_path):
+    admin = object.__new__(AdminDetails)
+    admin.massref_path = massref_path
+    admin.std_set = 'Mettler A'
+    admin.check_set_text = 'Mettler B'
+    return admin
+
+
+def test_massref_cache(tmp_path, monkeypatch):
+    massref = str(tmp_path / 'MASSREF.xlsx')
+    shutil.copy(massref_for_test, massref)
+    cache_folder = tmp_path / 'cache'
+    monkeypatch.setattr(xlsx_cache, 'xlsx_cache_folder', str(cache_folder))
+    xlsx_cache.clear_memory()
+
+    opened = []
+
+    def counting_load_workbook(*args, **kwargs):
+        opened.append(args)
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(admin_details, 'load_workbook', counting_load_workbook)
+
+    admin = make_admin(massref)
+    admin.init_ref_mass_sets()
+    assert len(opened) == 1  # once for both sets
+    assert len(os.listdir(cache_folder)) == 2
+    stds, checks = admin.all_stds, admin.all_checks
+    assert stds['Set type'] == 'Standard' and checks['Set type'] == 'Check'
+    assert stds['Num weights'] == len(stds['Weight ID']) == 22
+    assert stds['Weight ID'][0] == '10KMA'
+    assert stds['Nominal (g)'][0] == 10000
+
+    # from the cache in this process, and then from the cache files in a new process
+    for clear in [False, True]:
+        if clear:
+            xlsx_cache.clear_memory()
+        admin = make_admin(massref)
+        admin.init_ref_mass_sets()
+        assert len(opened) == 1
+        assert admin.all_stds == stds
+        assert admin.all_checks == checks
+
+    # changes to a cached set don't change the cache
+    admin.all_stds['Weight ID'].append('extra')
+    admin = make_admin(massref)
+    admin.init_ref_mass_sets()
+    assert admin.all_stds == stds
+
+    # the MASSREF file is parsed again once it has changed
+    os.utime(massref, (0, 0))
+    admin = make_admin(massref)
+    admin.init_ref_mass_sets()
+    assert len(opened) == 2
+    assert admin.all_stds == stds
+
+
+def test_admin_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(xlsx_cache, 'xlsx_cache_folder', str(tmp_path / 'cache'))
+    xlsx_cache.clear_memory()
+
+    # a copy of the test Admin file with paths that exist here
+    wb = load_workbook(os.path.join(ROOT_DIR, 'tests', 'samples', 'admin_for_testing.xlsx'))
+    wb['Admin']['B3'] = None
+    wb['Admin']['B5'] = str(tmp_path)
+    wb['Admin']['B9'] = massref_for_test
+    wb['Admin']['E11'] = os.path.join(ROOT_DIR, 'tests', 'samples', 'config_for_testing.xml')
+    admin_path = str(tmp_path / 'Admin.xlsx')
+    wb.save(admin_path)
+
+    opened = []
+
+    def counting_load_workbook(*args, **kwargs):
+        opened.append(kwargs.get('read_only', False))
+        return load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(admin_details, 'load_workbook', counting_load_workbook)
+
+    admin = AdminDetails(admin_path)
+    assert opened == [True]  # one read-only pass for the admin details, client weights and scheme
+    assert admin.client == 'Client'
+    assert admin.std_set == 'Mettler A'
+    assert len(admin.client_wt_IDs) == 25
+    header, rows = admin.scheme
+    assert header[0] == 'Weight groups'
+
+    admin = AdminDetails(admin_path)
+    assert opened == [True]  # from the cache
+    assert admin.all_client_wts['Num weights'] == 25
+
+    # the workbook is loaded in full only when needed, with the values updated in memory
+    assert admin.ds['B2'].value == 'MCW'
+    assert opened == [True, False]
+    assert admin.ds['B3'].value == 'Client'
+    admin.save_admin()
+    assert load_workbook(admin.path)['Admin']['B3'].value == 'Client'